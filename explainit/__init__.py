@@ -11,6 +11,26 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from explainit.analyzer.reference_profile import ReferenceProfile
 from explainit.app import build
+from explainit.app import create_app
+from explainit.app import serve
+from explainit.monitor import ProductionMonitor
+from explainit.report import compute_report
+from explainit.report import Report
+from explainit.serving import create_server
+from explainit.serving import load_bundle
+from explainit.serving import save_bundle
 
-__all__ = ["build"]
+__all__ = [
+    "build",
+    "compute_report",
+    "create_app",
+    "create_server",
+    "load_bundle",
+    "ProductionMonitor",
+    "ReferenceProfile",
+    "Report",
+    "save_bundle",
+    "serve",
+]
@@ -0,0 +1,345 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from explainit.stattests.sketches import DEFAULT_K
+from explainit.stattests.sketches import DEFAULT_PRECISION
+from explainit.stattests.sketches import HyperLogLog
+from explainit.stattests.sketches import KLLSketch
+
+PERCENTILES = [25, 50, 75]
+# Most frequent values a `ColumnSketch` keeps.
+DEFAULT_TOP_VALUES = 64
+# Rows profiled at a time in approximate mode.
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+class ColumnProfile:
+    """Every statistic the data and feature summaries need from one column.
+
+    ``value_counts`` is ``value_counts(dropna=False)`` of the column, most frequent
+    first; counts of missing, present and distinct values are read from it.
+    Numerical columns also carry ``numeric``: infinite count, min, max, mean,
+    standard deviation and quartiles as pandas computes them.
+
+    Profiles made by a `ColumnSketch` are approximate: ``value_counts`` only holds
+    the most frequent values, ``distinct`` is estimated and ``errors`` gives the
+    bound of every approximate statistic.
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        value_counts: pd.Series,
+        numeric: Optional[Dict[str, float]] = None,
+        distinct: Optional[int] = None,
+        errors: Optional[Dict[str, float]] = None,
+    ):
+        self.rows = rows
+        self.value_counts = value_counts
+        self.numeric = numeric
+        self.distinct = distinct
+        self.errors = errors or {}
+
+    @property
+    def missing(self) -> int:
+        return int(self.value_counts[self.value_counts.index.isnull()].sum())
+
+    @property
+    def count(self) -> int:
+        return self.rows - self.missing
+
+    @property
+    def unique_count(self) -> int:
+        if self.distinct is not None:
+            return self.distinct
+        return len(self.value_counts) - int(self.value_counts.index.hasnans)
+
+    @property
+    def cleaned_size(self) -> int:
+        """Values left once missing, and infinite numerical, values are dropped."""
+        infinite = self.numeric["infinite"] if self.numeric is not None else 0
+        return int(self.count - infinite)
+
+    def cleaned_distinct(self) -> pd.Index:
+        """Distinct values left once missing and infinite values are dropped."""
+        distinct = self.value_counts.index
+        distinct = distinct[~distinct.isnull()]
+        if self.numeric is not None:
+            distinct = distinct[~np.isinf(distinct.to_numpy(dtype=np.float64))]
+        return distinct
+
+    @property
+    def cleaned_unique_count(self) -> int:
+        tracked = self.value_counts.index
+        dropped = len(tracked) - int(tracked.hasnans) - len(self.cleaned_distinct())
+        return self.unique_count - dropped
+
+
+def _numeric_stats(values: npt.NDArray[Any]) -> Dict[str, npt.NDArray[Any]]:
+    """Infinite count, mean, standard deviation and quartiles of every column of a
+    2D float block, as pandas computes them.
+    """
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(present, values, 0.0).sum(axis=0) / count
+        squares = np.where(present, (values - mean) ** 2, 0.0).sum(axis=0)
+        std = np.where(count > 1, np.sqrt(squares / (count - 1)), np.nan)
+    percentiles = np.full((len(PERCENTILES), values.shape[1]), np.nan)
+    for column in np.flatnonzero(count):
+        percentiles[:, column] = np.percentile(
+            values[present[:, column], column], PERCENTILES
+        )
+    return {
+        "infinite": np.isinf(values).sum(axis=0),
+        "mean": mean,
+        "std": std,
+        "percentiles": percentiles,
+    }
+
+
+def _add_numeric(
+    profiles: Dict[str, ColumnProfile], block: npt.NDArray[Any], columns: List[str]
+):
+    stats = _numeric_stats(block)
+    for i, column in enumerate(columns):
+        profile = profiles[column]
+        # The distinct values give the extremes in the column's own type.
+        distinct = profile.value_counts.index
+        profile.numeric = {
+            "infinite": int(stats["infinite"][i]),
+            "min": distinct.min(),
+            "max": distinct.max(),
+            "mean": stats["mean"][i],
+            "std": stats["std"][i],
+            "percentile_25": stats["percentiles"][0, i],
+            "percentile_50": stats["percentiles"][1, i],
+            "percentile_75": stats["percentiles"][2, i],
+        }
+
+
+def sketch_numeric_stats(
+    sketch: KLLSketch, pos_inf: int = 0, neg_inf: int = 0
+) -> Dict[str, Any]:
+    """Numerical stats of a column from the quantile sketch of its finite values.
+
+    Infinite values shift the extremes and the mean as they do in pandas. The
+    quartiles are approximate, within ``sketch.rank_error`` in rank.
+    Args:
+        sketch: sketch of the finite values.
+        pos_inf: count of ``inf`` values.
+        neg_inf: count of ``-inf`` values.
+    Returns:
+        numeric: the ``numeric`` entry of a `ColumnProfile`.
+    """
+    n = sketch.count
+    std = sketch.std * np.sqrt(n / (n - 1)) if n > 1 else np.nan
+    mean = sketch.mean
+    if pos_inf or neg_inf:
+        std = np.nan
+        mean = np.nan if pos_inf and neg_inf else (np.inf if pos_inf else -np.inf)
+    percentiles = (
+        sketch.quantile(np.array(PERCENTILES) / 100) if n else np.full(3, np.nan)
+    )
+    return {
+        "infinite": pos_inf + neg_inf,
+        "min": -np.inf if neg_inf else (sketch.min if n else np.nan),
+        "max": np.inf if pos_inf else (sketch.max if n else np.nan),
+        "mean": mean,
+        "std": std,
+        "percentile_25": percentiles[0],
+        "percentile_50": percentiles[1],
+        "percentile_75": percentiles[2],
+    }
+
+
+class ColumnSketch:
+    """Approximate, mergeable profile of one column, built a chunk at a time.
+
+    Memory stays bounded whatever the number of rows: distinct values are counted
+    by a `HyperLogLog`, quartiles by a `KLLSketch`, and the most frequent values
+    by a Misra-Gries summary of ``top_values`` counters, whose counts are low by
+    at most ``top_error``. Row, missing and infinite counts, extremes, mean and
+    standard deviation stay exact. Sketches of disjoint chunks `merge` into the
+    sketch of their union.
+    """
+
+    def __init__(
+        self,
+        feature_type: str,
+        k: int = DEFAULT_K,
+        precision: int = DEFAULT_PRECISION,
+        top_values: int = DEFAULT_TOP_VALUES,
+        seed: Optional[int] = None,
+    ):
+        self.feature_type = feature_type
+        self.top_values = top_values
+        self.rows = 0
+        self.missing = 0
+        self.pos_inf = 0
+        self.neg_inf = 0
+        self.top = pd.Series(dtype=np.int64)
+        self.top_error = 0
+        self.distinct = HyperLogLog(precision)
+        self.quantiles = KLLSketch(k, seed) if feature_type == "num" else None
+
+    def update(self, values: pd.Series) -> "ColumnSketch":
+        """Add a chunk of the column."""
+        present = values.dropna()
+        self.rows += len(values)
+        self.missing += len(values) - len(present)
+        if self.quantiles is not None:
+            floats = present.to_numpy(dtype=np.float64)
+            self.pos_inf += int(np.sum(floats == np.inf))
+            self.neg_inf += int(np.sum(floats == -np.inf))
+            self.quantiles.update(floats)
+        self.distinct.update(present)
+        self._add_top(present.value_counts(), 0)
+        return self
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        """Fold the sketch of other rows of the same column into this one."""
+        self.rows += other.rows
+        self.missing += other.missing
+        self.pos_inf += other.pos_inf
+        self.neg_inf += other.neg_inf
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self._add_top(other.top, other.top_error)
+        return self
+
+    def _add_top(self, counts: pd.Series, error: int):
+        # Mergeable Misra-Gries (Agarwal et al., 2012): add, then drop the
+        # (top_values + 1)-th largest count from every counter.
+        top = self.top.add(counts, fill_value=0).astype(np.int64)
+        self.top_error += error
+        if len(top) > self.top_values:
+            cut = int(top.nlargest(self.top_values + 1).iloc[-1])
+            top = top[top > cut] - cut
+            self.top_error += cut
+        self.top = top
+
+    def profile(self) -> ColumnProfile:
+        value_counts = self.top
+        if self.missing:
+            value_counts = pd.concat(
+                [value_counts, pd.Series([self.missing], index=[np.nan])]
+            )
+        value_counts = value_counts.sort_values(ascending=False, kind="stable")
+        errors: Dict[str, float] = {"most_common": self.top_error}
+        if self.top_error:
+            # Some values were dropped from the counters, so the count is estimated.
+            distinct = max(self.distinct.count(), len(self.top))
+            errors["unique_count"] = self.distinct.relative_error
+        else:
+            distinct = len(self.top)
+        numeric = None
+        if self.quantiles is not None:
+            numeric = sketch_numeric_stats(self.quantiles, self.pos_inf, self.neg_inf)
+            errors["percentiles"] = self.quantiles.rank_error
+        return ColumnProfile(self.rows, value_counts, numeric, distinct, errors)
+
+
+def sketch_profiles(
+    chunks: Iterable[pd.DataFrame],
+    num_feature_names: Iterable[str] = (),
+    **sketch_options: Any,
+) -> Dict[str, ColumnSketch]:
+    """Stream dataframe chunks into one `ColumnSketch` per column.
+    Args:
+        chunks: iterable of dataframes, e.g. ``pd.read_csv(..., chunksize=...)``.
+        num_feature_names: columns that also get numerical statistics.
+        sketch_options: ``k``, ``precision``, ``top_values`` or ``seed`` of the
+            sketches.
+    Returns:
+        sketches: mapping of column name to its sketch; ``sketch.profile()`` gives
+            the approximate `ColumnProfile`.
+    """
+    num_feature_names = set(num_feature_names)
+    sketches: Dict[str, ColumnSketch] = {}
+    for chunk in chunks:
+        for column in chunk.columns:
+            if column not in sketches:
+                feature_type = "num" if column in num_feature_names else "cat"
+                sketches[column] = ColumnSketch(feature_type, **sketch_options)
+            sketches[column].update(chunk[column])
+    return sketches
+
+
+def profile_column(
+    feature: pd.Series, feature_type: str, approximate: bool = False
+) -> ColumnProfile:
+    """Profile one column, see `profile_columns`."""
+    if approximate:
+        return ColumnSketch(feature_type).update(feature).profile()
+    profile = ColumnProfile(feature.shape[0], feature.value_counts(dropna=False))
+    if feature_type == "num":
+        values = feature.to_numpy(dtype=np.float64, na_value=np.nan)
+        _add_numeric({"feature": profile}, values[:, None], ["feature"])
+    return profile
+
+
+def _chunks(data: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, max(data.shape[0], 1), chunk_rows):
+        stop = start + chunk_rows
+        yield data.iloc[start:stop]
+
+
+def profile_columns(
+    data: pd.DataFrame,
+    num_feature_names: Iterable[str] = (),
+    approximate: bool = False,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Dict[str, ColumnProfile]:
+    """Profile every column of a dataframe in a single pass per column.
+
+    Each column is hashed once by ``value_counts``; the numerical columns are then
+    converted to one float block whose statistics are computed for all of them at
+    once. With ``approximate`` the columns are sketched ``chunk_rows`` rows at a
+    time instead, see `ColumnSketch`.
+    Args:
+        data: the data to profile.
+        num_feature_names: columns that also get numerical statistics.
+        approximate: estimate distinct counts, quartiles and frequent values with
+            bounded memory.
+        chunk_rows: rows sketched at a time in approximate mode.
+    Returns:
+        profiles: mapping of column name to its `ColumnProfile`.
+    """
+    if approximate:
+        sketches = sketch_profiles(_chunks(data, chunk_rows), num_feature_names)
+        return {column: sketches[column].profile() for column in data.columns}
+
+    rows = data.shape[0]
+    profiles = {
+        column: ColumnProfile(rows, data[column].value_counts(dropna=False))
+        for column in data.columns
+    }
+    num_feature_names = [column for column in num_feature_names if column in profiles]
+    if num_feature_names:
+        block = np.asfortranarray(
+            data[num_feature_names].to_numpy(dtype=np.float64, na_value=np.nan)
+        )
+        _add_numeric(profiles, block, num_feature_names)
+    return profiles
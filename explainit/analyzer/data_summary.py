@@ -17,20 +17,36 @@ from typing import Union
 
 import numpy as np
 import pandas as pd
+from explainit.analyzer.column_profile import ColumnProfile
+from explainit.analyzer.column_profile import profile_columns
 
 
 def data_summary_stats(data: pd.DataFrame, target_column=None, date_column=None):
+    return data_summary_from_profiles(
+        profile_columns(data), data.shape[0], target_column, date_column
+    )
+
+
+def data_summary_from_profiles(
+    profiles: Dict[str, ColumnProfile],
+    rows: int,
+    target_column=None,
+    date_column=None,
+) -> Dict[str, Any]:
+    """Data summary of a dataframe whose columns were profiled by `profile_columns`."""
     result: Dict[str, Any] = {}
 
     def get_percentage_from_all_values(value: Union[int, float]):
-        all_values_count = data.shape[0]
-        return np.round(100 * value / all_values_count, 2)
+        return np.round(100 * value / rows, 2)
 
     result["target column"] = target_column
     result["date column"] = date_column
-    result["number of variables"] = len(data.columns)
-    result["number of observations"] = data.shape[0]
-    missing_cells = data.isnull().sum().sum()
+    result["number of variables"] = len(profiles)
+    result["number of observations"] = rows
+    missing = pd.Series(
+        [profile.missing for profile in profiles.values()], dtype=np.int64
+    )
+    missing_cells = missing.sum()
     missing_cells_percentage = np.round(
         missing_cells
         / (result["number of variables"] * result["number of observations"]),
@@ -40,13 +56,13 @@ def data_summary_stats(data: pd.DataFrame, target_column=None, date_column=None)
 
     constant_values = pd.Series(
         [
-            get_percentage_from_all_values(data[x].value_counts(dropna=False).iloc[0])
-            for x in data.columns
+            get_percentage_from_all_values(profile.value_counts.iloc[0])
+            if len(profile.value_counts)
+            else 0
+            for profile in profiles.values()
         ]
     )
-    empty_values = pd.Series(
-        [data[x].isnull().sum() / data.shape[0] * 100 for x in data.columns]
-    )
+    empty_values = missing / rows * 100
     result["constant features"] = (constant_values == 100).sum()
     result["empty features"] = (empty_values == 100).sum()
     result["almost constant features"] = (constant_values >= 95).sum()
@@ -13,56 +13,110 @@
 # limitations under the License.
 from typing import Any
 from typing import Dict
+from typing import Tuple
 from typing import Union
 
 import numpy as np
 import pandas as pd
+from explainit.analyzer.column_profile import ColumnProfile
+from explainit.analyzer.column_profile import profile_column
+from explainit.encoding import CategoricalEncoding
 
 
-def feature_summary_stats(feature: pd.Series, feature_type: str) -> Dict[str, Any]:
+def feature_summary_stats(
+    feature: pd.Series, feature_type: str, approximate: bool = False
+) -> Dict[str, Any]:
+    return feature_summary_from_profile(
+        profile_column(feature, feature_type, approximate)
+    )
+
+
+def feature_summary_from_profile(profile: ColumnProfile) -> Dict[str, Any]:
+    """Feature summary of a column profiled by `profile_columns`."""
     result: Dict[str, Any] = {}
 
     def get_percentage_from_all_values(value: Union[int, float]):
-        all_values_count = feature.shape[0]
-        return np.round(100 * value / all_values_count, 2)
+        return np.round(100 * value / profile.rows, 2)
 
-    missing_count = int(feature.isnull().sum())
-    value_counts = feature.value_counts(dropna=False)
-    missing_percentage = np.round(100 * missing_count / feature.shape[0], 2)
-    result["count"] = int(feature.count())
+    missing_count = profile.missing
+    value_counts = profile.value_counts
+    missing_percentage = np.round(100 * missing_count / profile.rows, 2)
+    result["count"] = profile.count
     result["missing"] = f"{missing_count} ({missing_percentage}%)"
-    result["unique_count"] = feature.nunique()
-    result["unique_count (%)"] = f"{get_percentage_from_all_values(feature.nunique())}%"
-    most_common_value = value_counts.index[0]
+    result["unique_count"] = profile.unique_count
     result[
-        "most_common"
-    ] = f"{most_common_value} ({get_percentage_from_all_values(value_counts.iloc[0])}%)"
-
-    if result["count"] > 0 and pd.isnull(most_common_value):
+        "unique_count (%)"
+    ] = f"{get_percentage_from_all_values(profile.unique_count)}%"
+    # A sketch keeps no value when none stands out from its error bound.
+    if len(value_counts):
+        most_common_value = value_counts.index[0]
         result[
-            "2nd_most_common"
-        ] = f"{value_counts.index[1]} ({get_percentage_from_all_values(value_counts.iloc[1])}%)"
-
-    if feature_type == "num":
-        # round most common feature value for numeric features to 1e-5
-        if not np.issubdtype(feature, np.number):
-            feature = feature.astype(float)
-        infinite_count = int(np.sum(np.isinf(feature)))
+            "most_common"
+        ] = f"{most_common_value} ({get_percentage_from_all_values(value_counts.iloc[0])}%)"
+
+        if (
+            result["count"] > 0
+            and pd.isnull(most_common_value)
+            and len(value_counts) > 1
+        ):
+            result[
+                "2nd_most_common"
+            ] = f"{value_counts.index[1]} ({get_percentage_from_all_values(value_counts.iloc[1])}%)"
+
+    if profile.numeric is not None:
+        stats = profile.numeric
+        infinite_count = stats["infinite"]
         infinite_percentage = get_percentage_from_all_values(infinite_count)
         result["infinite"] = f"{infinite_count} ({infinite_percentage}%)"
-        result["max"] = np.round(feature.max(), 4)
-        result["min"] = np.round(feature.min(), 4)
-        common_stats = dict(feature.describe())
-        result["std"] = np.round(common_stats["std"], 4)
-        result["mean"] = np.round(common_stats["mean"], 4)
-        result["percentile_25"] = np.round(common_stats["25%"], 4)
-        result["percentile_50"] = np.round(common_stats["50%"], 4)
-        result["percentile_75"] = np.round(common_stats["75%"], 4)
+        for name in [
+            "max",
+            "min",
+            "std",
+            "mean",
+            "percentile_25",
+            "percentile_50",
+            "percentile_75",
+        ]:
+            result[name] = np.round(stats[name], 4)
+
+    # Approximate profiles show how far each estimate can be off.
+    errors = profile.errors
+    if "unique_count" in errors:
+        result["unique_count error"] = f"±{np.round(100 * errors['unique_count'], 2)}%"
+    if errors.get("most_common"):
+        result[
+            "most_common error"
+        ] = f"-{errors['most_common']} ({get_percentage_from_all_values(errors['most_common'])}%)"
+    if "percentiles" in errors:
+        result[
+            "percentile rank error"
+        ] = f"±{np.round(100 * errors['percentiles'], 2)}%"
 
     # TODO: Add categorical properties
     return result
 
 
+def new_and_unused_counts(encoding: CategoricalEncoding) -> Tuple[int, int]:
+    """Values new in production and reference values unused in production.
+
+    Missing values count as one more value, as in `additional_cat_stats`.
+    Args:
+        encoding: shared encoding of the reference and production values.
+    Returns:
+        new_in_production_values_count, unused_in_production_values_count
+    """
+    in_reference = encoding.ref_counts > 0
+    in_production = encoding.prod_counts > 0
+    ref_missing = bool((encoding.ref_codes < 0).any())
+    prod_missing = bool((encoding.prod_codes < 0).any())
+    return (
+        int(np.count_nonzero(in_production & ~in_reference))
+        + int(prod_missing and not ref_missing),
+        int(np.count_nonzero(in_reference & ~in_production))
+        + int(ref_missing and not prod_missing),
+    )
+
+
 def additional_cat_stats(
     ref_feature_data: pd.Series,
     prod_feature_data: pd.Series,
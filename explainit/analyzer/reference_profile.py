@@ -0,0 +1,313 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+from explainit.analyzer.column_profile import DEFAULT_CHUNK_ROWS
+from explainit.analyzer.column_profile import profile_columns
+from explainit.analyzer.data_summary import data_summary_from_profiles
+from explainit.analyzer.feature_summary import feature_summary_from_profile
+from explainit.correlations.correlations import calculate_correlations
+from explainit.correlations.correlations import select_features_for_corr
+from explainit.encoding import EncodingCache
+from explainit.stattests.sketches import HyperLogLog
+from explainit.stattests.stat_test import select_stattest
+from explainit.stattests.stat_test import STATTEST_MAX_DISTINCT
+from explainit.utils import array_to_column
+from explainit.utils import column_to_array
+
+PROFILE_FORMAT_VERSION = 1
+CORRELATION_KINDS = ["pearson", "spearman", "kendall", "cramer_v"]
+
+
+def split_feature_names(
+    data: pd.DataFrame, datetime_col_name: Optional[str] = ""
+) -> Dict[str, List[str]]:
+    """Split columns into sorted numerical and categorical feature names."""
+    num_feature_names: List[str] = sorted(
+        list(set(data.select_dtypes([np.number]).columns))
+    )
+    cat_feature_names: List[str] = sorted(
+        list(
+            set(data.select_dtypes(exclude=[np.number, "datetime"]).columns)
+            - set(num_feature_names)
+        )
+    )
+    if datetime_col_name and datetime_col_name in cat_feature_names:
+        cat_feature_names.remove(datetime_col_name)
+    return {"num": num_feature_names, "cat": cat_feature_names}
+
+
+def clean_feature(feature: pd.Series, feature_type: str) -> pd.Series:
+    """Drop missing values, and infinite ones for numerical features."""
+    if feature_type == "num":
+        return feature.replace([-np.inf, np.inf], np.nan).dropna()
+    return feature.dropna()
+
+
+def _to_builtin(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot store value of type {type(value).__name__} in a profile")
+
+
+class ReferenceProfile:
+    """Everything explainit needs to know about the reference data, computed once.
+
+    The profile keeps the reference columns in compact columnar form together with
+    their feature summaries, data summary, correlation matrices and the facts used to
+    pick a statistical test. Pass it to `build` in place of ``reference_data`` so that
+    each production batch only pays for the production side.
+    """
+
+    def __init__(
+        self,
+        reference_data: pd.DataFrame,
+        target_col_name: str,
+        num_feature_names: List[str],
+        cat_feature_names: List[str],
+        feature_stats: Dict[str, Dict[str, Any]],
+        data_summary: Dict[str, Any],
+        correlations: Dict[str, pd.DataFrame],
+        stattest_info: Dict[str, Dict[str, Any]],
+    ):
+        self.reference_data = reference_data
+        self.target_col_name = target_col_name
+        self.num_feature_names = num_feature_names
+        self.cat_feature_names = cat_feature_names
+        self.feature_stats = feature_stats
+        self.data_summary = data_summary
+        self.correlations = correlations
+        self.stattest_info = stattest_info
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.num_feature_names + self.cat_feature_names
+
+    def feature_type(self, feature: str) -> str:
+        return "num" if feature in self.num_feature_names else "cat"
+
+    @classmethod
+    def from_frame(
+        cls,
+        reference_data: pd.DataFrame,
+        target_col_name: str,
+        datetime_col_name: Optional[str] = "",
+        approximate: bool = False,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        correlate: Optional[
+            Callable[[pd.DataFrame, List[str], List[str], str], pd.DataFrame]
+        ] = None,
+    ) -> "ReferenceProfile":
+        """Profile a reference dataframe.
+        Args:
+            reference_data: reference dataset.
+            target_col_name: target column name.
+            datetime_col_name: optional datetime column, excluded from the features.
+            approximate: sketch distinct counts, quartiles and frequent values of
+                the feature summaries, see `ColumnSketch`.
+            chunk_rows: rows sketched at a time with ``approximate``.
+            correlate: computes one kind of correlation matrix from the data and
+                the numerical and categorical features, in place of
+                `calculate_correlations`, e.g. `sketch_correlator`.
+        Returns:
+            The reference profile.
+        """
+        names = split_feature_names(reference_data, datetime_col_name)
+        total_columns = names["num"] + names["cat"]
+        if target_col_name not in total_columns:
+            raise ValueError(
+                f"Given target column name {Style.BRIGHT + Fore.RED}{target_col_name}{Style.RESET_ALL} does not exist in the data."
+            )
+        # Selecting columns copies them, so leave a frame that already fits alone.
+        if set(reference_data.columns) != set(total_columns):
+            reference_data = reference_data[total_columns]
+
+        # One pass over every column serves the feature and data summaries.
+        profiles = profile_columns(
+            reference_data, names["num"], approximate, chunk_rows=chunk_rows
+        )
+        feature_stats: Dict[str, Dict[str, Any]] = {}
+        stattest_info: Dict[str, Dict[str, Any]] = {}
+        for feature_type, features in names.items():
+            for feature in features:
+                profile = profiles[feature]
+                feature_stats[feature] = feature_summary_from_profile(profile)
+                nunique = profile.cleaned_unique_count
+                stattest_info[feature] = {
+                    "size": profile.cleaned_size,
+                    "nunique": nunique,
+                    # Beyond STATTEST_MAX_DISTINCT values the union size no longer matters.
+                    "distinct": profile.cleaned_distinct().tolist()
+                    if nunique <= STATTEST_MAX_DISTINCT
+                    else None,
+                }
+
+        data_summary = data_summary_from_profiles(
+            profiles, reference_data.shape[0], target_column=target_col_name
+        )
+        data_summary["categorical features"] = len(names["cat"])
+        data_summary["numeric features"] = len(names["num"])
+
+        num_for_corr, cat_for_corr = select_features_for_corr(
+            names["num"], names["cat"], feature_stats
+        )
+        if correlate is None:
+            cat_codes = EncodingCache(reference_data).ref_codes(cat_for_corr)
+            correlations = {
+                kind: calculate_correlations(
+                    reference_data, num_for_corr, cat_for_corr, kind, cat_codes
+                )
+                for kind in CORRELATION_KINDS
+            }
+        else:
+            correlations = {
+                kind: correlate(reference_data, num_for_corr, cat_for_corr, kind)
+                for kind in CORRELATION_KINDS
+            }
+        return cls(
+            reference_data,
+            target_col_name,
+            names["num"],
+            names["cat"],
+            feature_stats,
+            data_summary,
+            correlations,
+            stattest_info,
+        )
+
+    def features_for_corr(self) -> List[List[str]]:
+        return select_features_for_corr(
+            self.num_feature_names, self.cat_feature_names, self.feature_stats
+        )
+
+    def stattest(
+        self, feature: str, prod_feature: pd.Series, approximate: bool = False
+    ) -> str:
+        """Choose the statistical test for a feature against cleaned production values.
+
+        With ``approximate`` the distinct values are counted by a `HyperLogLog`.
+        """
+        info = self.stattest_info[feature]
+        if info["distinct"] is None:
+            n_values = info["nunique"]
+        elif approximate:
+            n_values = (
+                HyperLogLog().update(pd.Series(info["distinct"])).update(prod_feature)
+            ).count()
+        else:
+            n_values = len(set(info["distinct"]) | set(prod_feature.unique().tolist()))
+        return select_stattest(self.feature_type(feature), info["size"], n_values)
+
+    def feature_tests(
+        self, production_data: pd.DataFrame, approximate: bool = False
+    ) -> Dict[str, List[str]]:
+        """Map every feature to [stattest, feature_type] for this production batch."""
+        feature_test: Dict[str, List[str]] = {}
+        for feature in self.feature_names:
+            feature_type = self.feature_type(feature)
+            feature_test[feature] = [
+                self.stattest(
+                    feature,
+                    clean_feature(production_data[feature], feature_type),
+                    approximate,
+                ),
+                feature_type,
+            ]
+        return feature_test
+
+    def save(self, path: str):
+        """Write the profile to a compressed ``.npz`` file without any pickled objects."""
+        arrays: Dict[str, npt.NDArray[Any]] = {}
+        layouts = []
+        for i, feature in enumerate(self.feature_names):
+            values, layout = column_to_array(self.reference_data[feature])
+            arrays[f"column_{i}"] = values
+            for key in ("uniques", "categories"):
+                if key in layout:
+                    table = layout.pop(key).tolist()
+                    if len({type(value) for value in table}) > 1:
+                        raise TypeError(
+                            f"Column {feature} mixes value types; cast it to one type before saving the profile"
+                        )
+                    arrays[f"{key}_{i}"] = np.array(table)
+            layouts.append(layout)
+        for kind, matrix in self.correlations.items():
+            arrays[f"corr_{kind}"] = matrix.to_numpy()
+
+        metadata = {
+            "version": PROFILE_FORMAT_VERSION,
+            "target_col_name": self.target_col_name,
+            "num_feature_names": self.num_feature_names,
+            "cat_feature_names": self.cat_feature_names,
+            "layouts": layouts,
+            "column_order": self.reference_data.columns.tolist(),
+            "feature_stats": self.feature_stats,
+            "data_summary": self.data_summary,
+            "correlation_columns": {
+                kind: matrix.columns.tolist()
+                for kind, matrix in self.correlations.items()
+            },
+            "stattest_info": self.stattest_info,
+        }
+        arrays["metadata"] = np.frombuffer(
+            json.dumps(metadata, default=_to_builtin).encode("utf-8"), dtype=np.uint8
+        )
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "ReferenceProfile":
+        """Read a profile written by `ReferenceProfile.save`."""
+        with np.load(path, allow_pickle=False) as arrays:
+            metadata = json.loads(arrays["metadata"].tobytes().decode("utf-8"))
+            if metadata["version"] != PROFILE_FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported profile format version {metadata['version']}"
+                )
+            feature_names = (
+                metadata["num_feature_names"] + metadata["cat_feature_names"]
+            )
+            columns = {}
+            for i, (feature, layout) in enumerate(
+                zip(feature_names, metadata["layouts"])
+            ):
+                for key in ("uniques", "categories"):
+                    if f"{key}_{i}" in arrays:
+                        layout[key] = arrays[f"{key}_{i}"]
+                columns[feature] = array_to_column(arrays[f"column_{i}"], layout)
+            correlations = {
+                kind: pd.DataFrame(arrays[f"corr_{kind}"], columns=names, index=names)
+                if names
+                else pd.DataFrame()
+                for kind, names in metadata["correlation_columns"].items()
+            }
+        return cls(
+            pd.DataFrame(columns, columns=metadata.get("column_order", feature_names)),
+            metadata["target_col_name"],
+            metadata["num_feature_names"],
+            metadata["cat_feature_names"],
+            metadata["feature_stats"],
+            metadata["data_summary"],
+            correlations,
+            metadata["stattest_info"],
+        )
@@ -11,22 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import copy
-import json
 import logging
 import os
 import warnings
-from typing import Any
-from typing import Dict
 from typing import List
 from typing import Optional
-from typing import Tuple
+from typing import Union
 
 import dash
-import numpy as np
-import pandas as pd
-import plotly
-import plotly.express as px
+import flask
 from colorama import Fore
 from colorama import Style
 from dash import dash_table
@@ -34,53 +27,113 @@ from dash import dcc
 from dash import html
 from dash.dependencies import Input
 from dash.dependencies import Output
-from explainit.analyzer.data_summary import data_summary_stats
-from explainit.analyzer.feature_summary import additional_cat_stats
-from explainit.analyzer.feature_summary import feature_summary_stats
-from explainit.analyzer.feature_summary import make_feature_stats_dataframe
+from dash.dependencies import State
+from explainit.analyzer.reference_profile import ReferenceProfile
 from explainit.banner import build_banner
 from explainit.banner import generate_section_banner
 from explainit.correlation import correlation_data_table
-from explainit.correlations.correlation_heatmaps import plot_correlation_figure
-from explainit.correlations.correlation_table import make_metrics
-from explainit.correlations.correlations import calculate_correlations
-from explainit.graphs.additional_cat_graphs import generate_additional_graph_cat_feature
-from explainit.graphs.additional_num_graphs import fig_to_json
-from explainit.graphs.additional_num_graphs import generate_additional_graph_num_feature
-from explainit.graphs.cat_target_plot import cat_target_main_graph
-from explainit.graphs.feature_stats_plots import plot_feature_stats
-from explainit.graphs.num_target_plot import num_target_main_graph
-from explainit.graphs.numerical_target_behaviour import (
-    numerical_target_behaviour_on_features,
-)
+from explainit.graphs.downsampling import DEFAULT_MAX_POINTS
+from explainit.graphs.figure_cache import DEFAULT_MAX_FIGURE_MB
+from explainit.graphs.figure_cache import DEFAULT_MAX_FIGURES
 from explainit.header import generate_metric_list_header
 from explainit.header import generate_metric_row_helper
-from explainit.stattests.stat_test import get_statistical_info
-from explainit.stattests.stat_test import get_stattest
+from explainit.report import compute_report
+from explainit.report import Report
+from explainit.report import REPORT_STAGES
+from explainit.sources import DataSource
+from explainit.stattests.slice_test import top_drifted_slices
 from explainit.tabs import build_tabs
 from explainit.tabs import data_quality_tabs
+from explainit.tabs import generate_approximation_notes
+from explainit.tabs import generate_stage_progress
 from explainit.workflow import generate_modal
 from explainit.workflow import generate_workflow
-from plotly.graph_objects import Figure
 
 warnings.filterwarnings("ignore")
 
+# How often an open page checks for report stages finished in the background.
+STAGE_POLL_INTERVAL_MS = 2000
+# Report stages each tab shows; a tab fills in once they are all done.
+TAB_STAGES = {
+    "tab1": ["drift", "windows", "slices"],
+    "tab2": ["drift", "target"],
+    "tab3": [],
+}
+# Stages whose results each tab shows, flagged when the memory budget made them
+# approximate.
+TAB_APPROXIMATIONS = {
+    "tab1": ["drift", "figures"],
+    "tab2": ["drift", "figures"],
+    "quality-tab1": ["summary"],
+    "quality-tab2": ["summary", "figures"],
+    "quality-tab3": ["correlations"],
+}
+# Slices listed in the drift tab, most drifted first.
+TOP_SLICES = 10
+QUALITY_TAB_STAGES = {
+    "quality-tab1": ["summary"],
+    "quality-tab2": ["summary"],
+    "quality-tab3": ["correlations"],
+}
+
+# Route serving cached figures as JSON, under the app's path prefix.
+FIGURE_ROUTE = "_explainit/figures/<kind>/<path:key>"
+# Fetches a figure from `FIGURE_ROUTE` once per page; later calls reuse it. The
+# base64 typed arrays of `encode_figure` are turned into JavaScript typed arrays.
+FETCH_FIGURE_JS = """
+            const cache = (window.explainitFigures = window.explainitFigures || {});
+            const TYPED_ARRAYS = {i4: Int32Array, f8: Float64Array};
+            function unpack(value) {
+                if (Array.isArray(value)) {
+                    return value.map(unpack);
+                }
+                if (value === null || typeof value !== "object") {
+                    return value;
+                }
+                if (typeof value.bdata === "string" && value.dtype in TYPED_ARRAYS) {
+                    const binary = atob(value.bdata);
+                    const bytes = new Uint8Array(binary.length);
+                    for (let i = 0; i < binary.length; i++) {
+                        bytes[i] = binary.charCodeAt(i);
+                    }
+                    return new TYPED_ARRAYS[value.dtype](bytes.buffer);
+                }
+                for (const key in value) {
+                    value[key] = unpack(value[key]);
+                }
+                return value;
+            }
+            function fetchFigure(base, kind, key) {
+                const url = base + kind + "/" + encodeURIComponent(key);
+                if (!(url in cache)) {
+                    cache[url] = fetch(url).then((response) => {
+                        if (!response.ok) {
+                            delete cache[url];
+                            throw new Error(url + ": " + response.status);
+                        }
+                        return response.json().then(unpack);
+                    });
+                }
+                return cache[url];
+            }
+"""
+
 log = logging.getLogger("werkzeug")
 log.setLevel(logging.ERROR)
 
 
-def build(
-    reference_data: pd.DataFrame,
-    production_data: pd.DataFrame,
-    target_col_name: str,
-    target_col_type: str,
-    datetime_col_name: Optional[str] = "",
-    host: str = "0.0.0.0",
-    port: int = 8050,
-):
+def create_app(report: Report) -> dash.Dash:
+    """Create the dashboard for a computed report without starting it.
+    Args:
+        report: report from `compute_report` or `Report.load`.
+    Returns:
+        The Dash application.
+    """
     app = dash.Dash(
         __name__,
         url_base_pathname=os.getenv("ROUTE") or "/",
+        # Figures, callbacks and assets are sent gzip or brotli compressed.
+        compress=True,
         meta_tags=[
             {"name": "viewport", "content": "width=device-width, initial-scale=1"}
         ],
@@ -90,408 +143,177 @@ def build(
     app.server
     app.config["suppress_callback_exceptions"] = True
 
-    # reference_data.rename(columns={target_col_name: "target"}, inplace=True)
-    # production_data.rename(columns={target_col_name: "target"}, inplace=True)
-
-    # ref_data_columns = reference_data.columns.to_list()
-    # prod_data_columns = production_data.columns.to_list()
-    # if functools.reduce(
-    #     lambda x, y: x and y,
-    #     map(lambda p, q: p == q, sorted(ref_data_columns), sorted(prod_data_columns)),
-    #     True,
-    # ):
-    #     print("The lists prod_data_columns and ref_data_columns are the same")
-    # else:
-    #     print("ERROR: The lists prod_data_columns and ref_data_columns are not the same")
-
-    print(f"Initiating {Style.BRIGHT + Fore.GREEN}Explainit App{Style.RESET_ALL}...")
-
-    num_feature_names: List[str] = sorted(
-        list(set(reference_data.select_dtypes([np.number]).columns))
-    )
-    cat_feature_names: List[str] = sorted(
-        list(
-            set(reference_data.select_dtypes(exclude=[np.number, "datetime"]).columns)
-            - set(num_feature_names)
-        )
-    )
-    cat_feature_names.remove(
-        datetime_col_name
-    ) if datetime_col_name else cat_feature_names
-    total_columns = num_feature_names + cat_feature_names
-    reference_data = reference_data[total_columns]
-    production_data = production_data[total_columns]
-    if target_col_name not in total_columns:
-        raise ValueError(
-            f"Given target column name {Style.BRIGHT + Fore.RED}{target_col_name}{Style.RESET_ALL} does not exist in the data."
-        )
-
-    # Finding appropriate Statistical test for Individual feature.
-    num_feature_test: Dict[str, List[str]] = {}
-
-    for num_feature_name in num_feature_names:
-        feature_type = "num"
-        ref_feature = (
-            reference_data[num_feature_name].replace([-np.inf, np.inf], np.nan).dropna()
-        )
-        prod_feature = (
-            production_data[num_feature_name]
-            .replace([-np.inf, np.inf], np.nan)
-            .dropna()
-        )
-        num_feature_test[num_feature_name] = [
-            get_stattest(
-                feature_type=feature_type,
-                ref_feature=ref_feature,
-                prod_feature=prod_feature,
-            ),
-            feature_type,
-        ]
-
-    cat_feature_test: Dict[str, List[str]] = {}
-
-    for cat_feature_name in cat_feature_names:
-        feature_type = "cat"
-        ref_feature = reference_data[cat_feature_name].dropna()
-        prod_feature = production_data[cat_feature_name].dropna()
-        cat_feature_test[cat_feature_name] = [
-            get_stattest(
-                feature_type=feature_type,
-                ref_feature=ref_feature,
-                prod_feature=prod_feature,
-            ),
-            feature_type,
-        ]
-
-    feature_test = {**num_feature_test, **cat_feature_test}
-
-    # Statistical Information
-    statstical_data = get_statistical_info(
-        feature_test, reference_data, production_data
+    # The report may still be computing, so its parts are read when they are shown.
+    target_col_name = report.target_col_name
+    figures = report.figures
+
+    # Figures are sent as the JSON they were cached as, never copied or re-encoded.
+    @app.server.route(f"{app.config.routes_pathname_prefix}{FIGURE_ROUTE}")
+    def serve_figure(kind, key):
+        try:
+            blob = figures.get_json(kind, key)
+        except KeyError:
+            flask.abort(404)
+        return flask.Response(blob, mimetype="application/json")
+
+    figure_url = f"{app.config.requests_pathname_prefix}{FIGURE_ROUTE.split('<')[0]}"
+
+    # Creates the Distribution and Drift graphs of the chosen feature. The figures
+    # are fetched once per page, and the standard deviation band is then resized in
+    # the browser on a shallow copy of the drift figure's shapes.
+    app.clientside_callback(
+        """
+        async function(feature, std) {
+            const no_update = window.dash_clientside.no_update;
+            if (!feature) {
+                return [no_update, no_update];
+            }
+            %s
+            const figures = await fetchFigure("%s", "additional", feature);
+            const drift = figures[1];
+            const shapes = drift.layout.shapes;
+            if (!shapes || shapes.length !== 2 || shapes[0].type !== "rect") {
+                return [figures[0], drift];
+            }
+            const mean = shapes[1].y0;
+            const width = (mean - shapes[0].y0) * Number(std);
+            const band = {...shapes[0], y0: mean + width, y1: mean - width};
+            return [
+                figures[0],
+                {...drift, layout: {...drift.layout, shapes: [band, shapes[1]]}},
+            ];
+        }
+        """
+        % (FETCH_FIGURE_JS, figure_url),
+        Output("graph1", "figure"),
+        Output("graph2", "figure"),
+        Input("feature", "value"),
+        Input("std-dropdown", "value"),
     )
-    target_drift_title = f"""
-                        Target Drift: {"Detected" if statstical_data[target_col_name]["drift"] == True else "Not Detected"},
-                        drift score={round(statstical_data[target_col_name]["p_value"], 4)}
-                        ({statstical_data[target_col_name]["stattest"][0]})"""
-
-    # Additional Feature Graphs
-    additional_graphs_data: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
-    for feature in feature_test:
-        # plot distributions
-        if feature_test[feature][1] == "num":
-            additional_graphs_data[feature] = generate_additional_graph_num_feature(
-                feature,
-                reference_data[feature].dropna(),
-                production_data[feature].dropna(),
-            )
-        elif feature_test[feature][1] == "cat":
-            additional_graphs_data[feature] = generate_additional_graph_cat_feature(
-                feature,
-                reference_data[feature].dropna(),
-                production_data[feature].dropna(),
-            )
-
-    # Categorical Target Main Graph.
-
-    if target_col_type == "cat":
-
-        categorical_target_main_figure_data = cat_target_main_graph(
-            reference_data[target_col_name], production_data[target_col_name]
-        )
 
-        # Categorical target behaviour based on individual features
-        reference_data_copy = reference_data.copy()
-        reference_data_copy["dataset"] = "Reference"
-
-        production_data_copy = production_data.copy()
-        production_data_copy["dataset"] = "Production"
-
-        merged_data = pd.concat([reference_data_copy, production_data_copy])
-        cat_target_behaviour_graphs = {
-            feature: fig_to_json(
-                px.histogram(
-                    merged_data,
-                    x=feature,
-                    color=target_col_name,
-                    # color_discrete_sequence=["goldenrod", "magenta"],
-                    facet_col="dataset",
-                    barmode="overlay",
-                    category_orders={"dataset": ["Reference", "Production"]},
-                )
-            )
-            for feature in list(feature_test.keys())
+    # Behaviour of the target column for the chosen feature, in both datasets.
+    app.clientside_callback(
+        """
+        async function(feature) {
+            if (!feature) {
+                return window.dash_clientside.no_update;
+            }
+            %s
+            return await fetchFigure("%s", "target_behaviour", feature);
         }
+        """
+        % (FETCH_FIGURE_JS, figure_url),
+        Output("target-behaviour-graph", "figure"),
+        Input("my_dropdown", "value"),
+    )
 
-    if target_col_type == "num":
-        reference_data_to_plot = reference_data[target_col_name].tolist()
-        production_data_to_plot = production_data[target_col_name].tolist()
-
-        numerical_target_main_figure_data = num_target_main_graph(
-            reference_data_to_plot, production_data_to_plot
-        )
-
-        # Numerical target behaviour based on individual features
-        reference_data_copy = reference_data.copy()
-        production_data_copy = production_data.copy()
-        num_target_behaviour_graphs = {
-            feature: numerical_target_behaviour_on_features(
-                reference_data[feature],
-                production_data[feature],
-                reference_data[target_col_name],
-                production_data[target_col_name],
-            )
-            for feature in total_columns
+    # Distribution of the chosen feature, next to its summary table.
+    app.clientside_callback(
+        """
+        async function(feature) {
+            if (!feature) {
+                return window.dash_clientside.no_update;
+            }
+            %s
+            return await fetchFigure("%s", "feature_stats", feature);
         }
-
-    # Data Summary
-
-    reference_data_summary = data_summary_stats(
-        reference_data, target_column=target_col_name
+        """
+        % (FETCH_FIGURE_JS, figure_url),
+        Output("basic-interactions", "figure"),
+        Input("feature-dropdown", "value"),
     )
-    reference_data_summary["categorical features"] = len(cat_feature_names)
-    reference_data_summary["numeric features"] = len(num_feature_names)
 
-    production_data_summary = data_summary_stats(
-        production_data, target_column=target_col_name
+    # Correlation heatmaps of both datasets for the chosen correlation type.
+    app.clientside_callback(
+        """
+        async function(kind) {
+            if (!kind) {
+                return window.dash_clientside.no_update;
+            }
+            %s
+            return await fetchFigure("%s", "correlation", kind.toLowerCase());
+        }
+        """
+        % (FETCH_FIGURE_JS, figure_url),
+        Output("correlation-id", "figure"),
+        Input("correlation-radio-button", "value"),
     )
-    production_data_summary["categorical features"] = len(cat_feature_names)
-    production_data_summary["numeric features"] = len(num_feature_names)
-
-    data_summary_df = pd.concat(
-        [
-            pd.DataFrame(reference_data_summary, index=[0]),
-            pd.DataFrame(production_data_summary, index=[0]),
-        ]
-    ).T
-    data_summary_df.columns = ["Reference", "Production"]
-    data_summary_df.reset_index(inplace=True)
-
-    # Feature Summary
-    prod_cat_feature_stats: Dict[str, Dict[str, Any]] = {}
-    ref_cat_feature_stats: Dict[str, Dict[str, Any]] = {}
-    for feature in cat_feature_names:
-        feature_type = "cat"
-        prod_cat_feature_stats[feature] = feature_summary_stats(
-            production_data[feature], feature_type
-        )
-        ref_cat_feature_stats[feature] = feature_summary_stats(
-            reference_data[feature], feature_type
-        )
-
-    prod_num_feature_stats: Dict[str, Dict[str, Any]] = {}
-    ref_num_feature_stats: Dict[str, Dict[str, Any]] = {}
-    for feature in num_feature_names:
-        feature_type = "num"
-        prod_num_feature_stats[feature] = feature_summary_stats(
-            production_data[feature], feature_type
-        )
-        ref_num_feature_stats[feature] = feature_summary_stats(
-            reference_data[feature], feature_type
-        )
 
-    for feature in cat_feature_names:
-        prod_cat_feature_stats[feature] = additional_cat_stats(
-            reference_data[feature], production_data[feature], prod_cat_feature_stats
-        )
-        ref_cat_feature_stats[feature] = additional_cat_stats(
-            reference_data[feature], production_data[feature], ref_cat_feature_stats
+    def serve_layout():
+        # Built on every page load so that a new page starts from the current stages.
+        return html.Div(
+            id="big-app-container",
+            children=[
+                build_banner(),
+                html.Div(
+                    id="app-container",
+                    children=[
+                        build_tabs(),
+                        # html.Hr(),
+                        html.Div(id="app-content"),
+                        generate_workflow(),
+                        generate_modal(),
+                        dcc.Store(
+                            id="stage-status",
+                            data={"finished": report.finished_stages(), "changed": []},
+                        ),
+                        dcc.Interval(
+                            id="stage-poll",
+                            interval=STAGE_POLL_INTERVAL_MS,
+                            disabled=len(report.finished_stages())
+                            == len(REPORT_STAGES),
+                        ),
+                    ],
+                ),
+            ],
         )
 
-    feature_stats_dataframes = {
-        feature: make_feature_stats_dataframe(
-            feature,
-            prod_cat_feature_stats,
-            prod_num_feature_stats,
-            ref_cat_feature_stats,
-            ref_num_feature_stats,
-        )
-        for feature in list(feature_test.keys())
-    }
-
-    # Feature Summary Graphs.
-    feature_stats_graphs = {
-        **{
-            feature: plot_feature_stats(reference_data, production_data, feature, "cat")
-            for feature in cat_feature_names
-        },
-        **{
-            feature: plot_feature_stats(reference_data, production_data, feature, "num")
-            for feature in num_feature_names
-        },
-    }
-
-    # Correlations
-
-    reference_feature_stats = {**ref_cat_feature_stats, **ref_num_feature_stats}
-
-    num_for_corr = []
-    for feature in num_feature_names:
-        if reference_feature_stats[feature]["unique_count"] > 1:
-            num_for_corr.append(feature)
-
-    cat_for_corr = []
-    for feature in cat_feature_names:
-        if reference_feature_stats[feature]["unique_count"] > 1:
-            cat_for_corr.append(feature)
-
-    reference_correlations = {}
-    production_correlations = {}
-    for kind in ["pearson", "spearman", "kendall", "cramer_v"]:
-        reference_correlations[kind] = calculate_correlations(
-            reference_data, num_for_corr, cat_for_corr, kind
+    app.layout = serve_layout
+
+    def stage_placeholder(stages):
+        """Progress shown instead of a tab until its stages are done, else None."""
+        if report.ready(*stages):
+            return None
+        errors = [report.stage_error(stage) for stage in stages]
+        return generate_stage_progress(
+            stages,
+            len(report.finished_stages()),
+            len(REPORT_STAGES),
+            error=next((error for error in errors if error is not None), None),
         )
-        if production_data is not None:
-            production_correlations[kind] = calculate_correlations(
-                production_data, num_for_corr, cat_for_corr, kind
-            )
 
-    metrics = make_metrics(reference_correlations, production_correlations)
-    metrics_values_headers = [
-        "top 5 correlation diff category (Cramer_V)",
-        "value train",
-        "value test",
-        "difference",
-        "top 5 correlation diff numerical (Spearman)",
-        "value train",
-        "value test",
-        "difference",
-    ]
-
-    # Correlations Dataframe
-    correlations_df = pd.DataFrame(columns=metrics_values_headers)
-    for metric in metrics:
-        a_series = pd.Series(metric["values"], index=correlations_df.columns)
-        correlations_df = correlations_df.append(a_series, ignore_index=True)
-
-    # Correlations Heatmaps.
-    correlation_graphs = {}
-    parts = {}
-    for kind in ["pearson", "spearman", "kendall", "cramer_v"]:
-        if reference_correlations[kind].shape[0] > 1:
-            correlation_figure = plot_correlation_figure(
-                kind, reference_correlations, production_correlations
-            )
-            correlation_graphs[kind] = {
-                "data": correlation_figure["data"],
-                "layout": correlation_figure["layout"],
-            }
-            parts.update({"title": kind, "id": kind})
+    def keeps_content(stages, stage_status):
+        """Whether a stage update leaves a tab that is already filled in untouched."""
+        if not report.ready(*stages) or set(stages) & set(stage_status["changed"]):
+            return False
+        triggers = [trigger["prop_id"] for trigger in dash.callback_context.triggered]
+        return triggers == ["stage-status.data"]
 
     @app.callback(
-        Output("graph1", "figure"),
-        Output("graph2", "figure"),
-        Input("feature", "value"),
-        Input("std-dropdown", "value"),
+        Output("stage-status", "data"),
+        Output("stage-poll", "disabled"),
+        Input("stage-poll", "n_intervals"),
+        State("stage-status", "data"),
     )
-    def generate_graph(item, std_dropdown):
+    def poll_stages(n_intervals, stage_status):
         """
-        Creates Drift Graph and Distribution graph for the choosen column.
-
-        This method uses the distr_graph_data and drift_graph_data in order to create graphs.
-        It will be interactive and updates the graph if you changes the std_dropdown value.
+        Checks which report stages have finished since the last poll.
 
         Args:
-            item: A String column which will be generated from the dropdown.
-            std_dropdown: Standard deviation value choosen from the dropdown.
-        Return:
-            Returns a Graph which contains a Drift graph and a Distribution graph for the choosen feature based on production Data.
-        """
-
-        fig1: Figure
-        fig2: Figure
-
-        # Distribution Plot
-        graph_data_distr = copy.deepcopy(additional_graphs_data[item][0])
-        json_object = json.dumps(graph_data_distr)
-        fig1 = plotly.io.from_json(json_object)
-
-        # Drift plot
-        if item in num_feature_names:
-            graph_data = copy.deepcopy(additional_graphs_data[item][1])
-            mean = graph_data["layout"]["shapes"][1]["y0"]
-            std = mean - graph_data["layout"]["shapes"][0]["y0"]
-            graph_data["layout"]["shapes"][0]["y0"] = mean + (float(std_dropdown) * std)
-            graph_data["layout"]["shapes"][0]["y1"] = mean - (float(std_dropdown) * std)
-
-            json_object = json.dumps(graph_data)
-            fig2 = plotly.io.from_json(json_object)
-            fig2.update_layout(
-                title={
-                    "text": f"{item} Drift".upper(),
-                    "y": 0.9,
-                    "x": 0.5,
-                    "xanchor": "center",
-                    "yanchor": "top",
-                }
-            )
-        if item in cat_feature_names:
-            pie_chart_graph = copy.deepcopy(additional_graphs_data[item][1])
-            json_object = json.dumps(pie_chart_graph)
-            fig2 = plotly.io.from_json(json_object)
-            fig2.update_layout(
-                title={
-                    "text": f"{item} Pie Chart".upper(),
-                    "y": 0.9,
-                    "x": 0.5,
-                    "xanchor": "center",
-                    "yanchor": "top",
-                }
-            )
-        return fig1, fig2
-
-    @app.callback(
-        Output("graph-content", "children"),
-        Input("my_dropdown", "value"),
-    )
-    def generategraph(dropdown):
-        """Method which will generate the behaviour of the target column based on the choosen feature from the dropdown.
+            n_intervals: number of polls so far.
+            stage_status: stages finished at the previous poll.
 
-        Args:
-            my_dropdown: Column name which will be generated when you change the dropdown.
         Returns:
-            Returns a graph which contains the target behaviour based on the choosen feature for both Reference and production data.
+            The finished stages, with the ones new since the last poll, and whether to stop polling.
         """
-        feature_data = (
-            copy.deepcopy(cat_target_behaviour_graphs[dropdown])
-            if target_col_type == "cat"
-            else copy.deepcopy(num_target_behaviour_graphs[dropdown])
-        )
-        if target_col_type == "cat":
-            if len(feature_data["data"]) == 4:
-                for i in range(4):
-                    feature_data["data"][i]["x"] = feature_data["data"][i]["x"].tolist()
-            if len(feature_data["data"]) == 6:
-                for i in range(6):
-                    feature_data["data"][i]["x"] = feature_data["data"][i]["x"].tolist()
-        json_object = json.dumps(feature_data)
-        json_object = json_object.replace("#636efa", "#00BFFF")
-        json_object = json_object.replace("#EF553B", "#FF1493")
-        json_object = json.loads(json_object)
-        return html.Div(
-            dcc.Graph(
-                id="basic-interactions",
-                figure=json_object,
-                config={"displayModeBar": False},
-            ),
+        finished = report.finished_stages()
+        if finished == stage_status["finished"]:
+            return dash.no_update, dash.no_update
+        changed = [stage for stage in finished if stage not in stage_status["finished"]]
+        return {"finished": finished, "changed": changed}, len(finished) == len(
+            REPORT_STAGES
         )
 
-    app.layout = html.Div(
-        id="big-app-container",
-        children=[
-            build_banner(),
-            html.Div(
-                id="app-container",
-                children=[
-                    build_tabs(),
-                    # html.Hr(),
-                    html.Div(id="app-content"),
-                    generate_workflow(),
-                    generate_modal(),
-                ],
-            ),
-        ],
-    )
-
     @app.callback(
         Output("markdown2", "style"),
         [Input("how-it-works", "n_clicks"), Input("workflow_close", "n_clicks")],
@@ -552,10 +374,11 @@ def build(
             feature_summary_dropdown: Feature name will be generated from the dropdown.
 
         Returns:
-            Provides two types of info in the summary. Feature summary as a data table and a graph which contains the distribution of the choosen feature.
+            Provides two types of info in the summary. Feature summary as a data table and a graph of the distribution of the choosen feature,
+            which the browser fetches from `FIGURE_ROUTE`.
         """
 
-        feature_df = feature_stats_dataframes[feature_summary_dropdown]
+        feature_df = report.feature_summaries[feature_summary_dropdown]
         feature_df = feature_df.reset_index()
         return [
             html.Div(
@@ -612,7 +435,6 @@ def build(
                         children=[
                             dcc.Graph(
                                 id="basic-interactions",
-                                figure=feature_stats_graphs[feature_summary_dropdown],
                                 config={"displayModeBar": False},
                                 style={"width": "110vh", "height": "70vh"},
                             )
@@ -658,9 +480,8 @@ def build(
             correlation-radio-button: value of the choosen correlation type.
 
         Returns:
-            Heatmap which contains the correlation information of the Reference and production data for the selected correlation type.
+            Graph for the Heatmap of the Reference and production data for the selected correlation type, which the browser fetches from `FIGURE_ROUTE`.
         """
-        correlation_graph_data = correlation_graphs[radio_item.lower()]
         return html.Div(
             children=[
                 html.H6(
@@ -669,28 +490,45 @@ def build(
                 ),
                 dcc.Graph(
                     id="correlation-id",
-                    figure=correlation_graph_data,
                     style={"width": "180vh", "height": "100vh"},
                     config={"displayModeBar": False},
                 ),
             ]
         )
 
-    @app.callback(Output("quality-content", "children"), Input("quality-tabs", "value"))
-    def render_quality_content(quality_tab_switch):
+    @app.callback(
+        Output("quality-content", "children"),
+        Input("quality-tabs", "value"),
+        Input("stage-status", "data"),
+    )
+    def render_quality_content(quality_tab_switch, stage_status):
         """
         Renders the tab content with the selected tab value.
 
         Args:
             quality_tab_switch: value of the tab switch which will be generated when user selected the tab from the application UI.
+            stage_status: report stages finished so far, the tab fills in once its own are done.
 
         Returns:
             renders the tab content based on the user selected tab value.
         """
+        stages = QUALITY_TAB_STAGES.get(quality_tab_switch, ["summary"])
+        if keeps_content(stages, stage_status):
+            return dash.no_update
+        placeholder = stage_placeholder(stages)
+        if placeholder is not None:
+            return placeholder
+
+        notes = generate_approximation_notes(
+            report.approximation_notes(
+                *TAB_APPROXIMATIONS.get(quality_tab_switch, ["summary"])
+            )
+        )
         if quality_tab_switch == "quality-tab2":
             return (
                 html.Div(
                     children=[
+                        *notes,
                         html.H5(
                             "Select Feature",
                             style={"font-size": "18px", "font-weight": "bold"},
@@ -698,8 +536,8 @@ def build(
                         html.Div(
                             dcc.Dropdown(
                                 id="feature-dropdown",
-                                options=sorted(total_columns),
-                                value=sorted(total_columns)[0],
+                                options=sorted(report.feature_names),
+                                value=sorted(report.feature_names)[0],
                                 placeholder="Choose data",
                                 clearable=False,
                                 searchable=True,
@@ -717,9 +555,10 @@ def build(
         if quality_tab_switch == "quality-tab3":
 
             return [
+                *notes,
                 html.Div(
                     id="correlation-data-table",
-                    children=correlation_data_table(correlations_df),
+                    children=correlation_data_table(report.correlation_table),
                     style={
                         "margin-top": "25px",
                         "margin-right": "35px",
@@ -737,10 +576,11 @@ def build(
                 html.Div(id="correlation-graph"),
             ]
         return [
+            *notes,
             html.Div(
                 dash_table.DataTable(
-                    data=data_summary_df.to_dict("records"),
-                    columns=[{"name": i, "id": i} for i in data_summary_df.columns],
+                    data=report.data_summary.to_dict("records"),
+                    columns=[{"name": i, "id": i} for i in report.data_summary.columns],
                     style_cell={"textAlign": "left"},
                     style_as_list_view=True,
                     style_cell_conditional=[
@@ -770,26 +610,77 @@ def build(
                     "margin-right": "35px",
                     "margin-left": "35px",
                 },
-            )
+            ),
+        ]
+
+    def window_drift_content():
+        if not report.window_drift_figure:
+            return []
+        return [
+            generate_section_banner("Drift over Time"),
+            dcc.Graph(
+                id="window-drift-graph",
+                figure=report.window_drift_figure,
+                config={"displayModeBar": False},
+            ),
+            html.Hr(),
+        ]
+
+    def slice_drift_content():
+        if report.slice_drift.empty:
+            return []
+        top_slices = top_drifted_slices(report.slice_drift, TOP_SLICES)
+        return [
+            generate_section_banner("Most Drifted Slices"),
+            dash_table.DataTable(
+                data=top_slices.round(4).to_dict("records"),
+                columns=[
+                    {"id": column, "name": column.replace("_", " ")}
+                    for column in top_slices.columns
+                ],
+                style_cell={"textAlign": "left"},
+                style_header={
+                    "border": "1px solid black",
+                    "backgroundColor": "black",
+                    "color": "white",
+                    "fontWeight": "bold",
+                },
+            ),
+            html.Hr(),
         ]
 
-    @app.callback(Output("app-content", "children"), Input("app-tabs", "value"))
-    def render_tab_content(tab_switch):
+    @app.callback(
+        Output("app-content", "children"),
+        Input("app-tabs", "value"),
+        Input("stage-status", "data"),
+    )
+    def render_tab_content(tab_switch, stage_status):
         """
         Renders the tab content for the main tabs in the Application.
 
         Args:
             tab_switch: value of the tab switch which will be generated when user selected the tab from the application UI.
+            stage_status: report stages finished so far, the tab fills in once its own are done.
 
         Returns:
             renders the tab content based on the user selected tab value.
 
         """
-
+        stages = TAB_STAGES.get(tab_switch, [])
+        if keeps_content(stages, stage_status):
+            return dash.no_update
+        placeholder = stage_placeholder(stages)
+        if placeholder is not None:
+            return placeholder
+
+        notes = generate_approximation_notes(
+            report.approximation_notes(*TAB_APPROXIMATIONS.get(tab_switch, []))
+        )
         if tab_switch == "tab1":
             return [
                 html.Div(
                     children=[
+                        *notes,
                         generate_section_banner("Drift Info. for Every Feature"),
                         generate_metric_list_header(),
                         html.Div(
@@ -797,12 +688,14 @@ def build(
                             children=[
                                 generate_metric_row_helper(
                                     key,
-                                    statstical_data,
+                                    report.statistical_data,
                                 )
-                                for key in list(statstical_data.keys())
+                                for key in list(report.statistical_data.keys())
                             ],
                         ),
                         html.Hr(),
+                        *window_drift_content(),
+                        *slice_drift_content(),
                         html.Div(
                             className="row",
                             children=[
@@ -843,8 +736,8 @@ def build(
                                     children=[
                                         dcc.Dropdown(
                                             id="feature",
-                                            options=sorted(total_columns),
-                                            value=sorted(total_columns)[0],
+                                            options=sorted(report.feature_names),
+                                            value=sorted(report.feature_names)[0],
                                             placeholder="Choose feature",
                                             clearable=False,
                                             searchable=True,
@@ -896,18 +789,22 @@ def build(
             ]
 
         if tab_switch == "tab2":
+            target_drift = report.target_drift
+            target_drift_title = f"""
+                        Target Drift: {"Detected" if target_drift["drift"] == True else "Not Detected"},
+                        drift score={round(target_drift["p_value"], 4)}
+                        ({target_drift["stattest"][0]})"""
 
             return [
                 html.Div(
                     id="target-drift-content",
                     children=[
+                        *notes,
                         html.H6(target_drift_title),
                         html.Div(
                             dcc.Graph(
                                 id="target-main-graph",
-                                figure=categorical_target_main_figure_data
-                                if target_col_type == "cat"
-                                else numerical_target_main_figure_data,
+                                figure=report.target_figure,
                                 config={"displayModeBar": False},
                             ),
                             style={
@@ -930,14 +827,20 @@ def build(
                                 ),
                                 dcc.Dropdown(
                                     id="my_dropdown",
-                                    options=sorted(total_columns),
-                                    value=sorted(total_columns)[0],
+                                    options=sorted(report.feature_names),
+                                    value=sorted(report.feature_names)[0],
                                     multi=False,
                                     clearable=True,
                                     style={"width": "50%"},
                                 ),
                                 html.Div(id="target-feature-title"),
-                                html.Div(id="graph-content"),
+                                html.Div(
+                                    id="graph-content",
+                                    children=dcc.Graph(
+                                        id="target-behaviour-graph",
+                                        config={"displayModeBar": False},
+                                    ),
+                                ),
                             ]
                         ),
                     ],
@@ -947,4 +850,51 @@ def build(
         if tab_switch == "tab3":
             return [data_quality_tabs(), html.Div(id="quality-content")]
 
+    return app
+
+
+def serve(report: Report, host: str = "0.0.0.0", port: int = 8050):
+    """Serve a computed report on the given host and port."""
+    app = create_app(report)
     app.run_server(debug=False, host=host, port=port)
+
+
+def build(
+    reference_data: Union[DataSource, ReferenceProfile],
+    production_data: DataSource,
+    target_col_name: str,
+    target_col_type: str,
+    datetime_col_name: Optional[str] = "",
+    host: str = "0.0.0.0",
+    port: int = 8050,
+    n_jobs: int = 1,
+    max_cached_figures: int = DEFAULT_MAX_FIGURES,
+    figure_cache_mb: float = DEFAULT_MAX_FIGURE_MB,
+    max_points: int = DEFAULT_MAX_POINTS,
+    background: bool = True,
+    approximate: bool = False,
+    drift_window: Optional[str] = None,
+    slice_columns: Optional[List[str]] = None,
+    compact: Optional[str] = None,
+    memory_budget_mb: Optional[float] = None,
+):
+    print(f"Initiating {Style.BRIGHT + Fore.GREEN}Explainit App{Style.RESET_ALL}...")
+
+    report = compute_report(
+        reference_data,
+        production_data,
+        target_col_name,
+        target_col_type,
+        datetime_col_name=datetime_col_name,
+        n_jobs=n_jobs,
+        max_cached_figures=max_cached_figures,
+        figure_cache_mb=figure_cache_mb,
+        max_points=max_points,
+        background=background,
+        approximate=approximate,
+        drift_window=drift_window,
+        slice_columns=slice_columns,
+        compact=compact,
+        memory_budget_mb=memory_budget_mb,
+    )
+    serve(report, host=host, port=port)
@@ -0,0 +1,393 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from explainit.analyzer.column_profile import ColumnProfile
+from explainit.analyzer.column_profile import sketch_numeric_stats
+from explainit.binning import HIST_BINS
+from explainit.correlations.correlations import cramer_v_from_counts
+from explainit.correlations.correlations import one_hot_columns
+from explainit.encoding import CategoricalEncoding
+from explainit.stattests.sketches import DEFAULT_K
+from explainit.stattests.sketches import HyperLogLog
+from explainit.stattests.sketches import KLLSketch
+from scipy import sparse
+
+# Distinct values counted exactly per column; beyond it only the most frequent stay.
+MAX_TRACKED_VALUES = 100_000
+# Rows kept for the rank correlations, which do not decompose over partitions.
+DEFAULT_SAMPLE_ROWS = 100_000
+
+
+def _float_values(values: pd.Series) -> npt.NDArray[Any]:
+    return np.asarray(values.to_numpy(dtype=np.float64, na_value=np.nan))
+
+
+class ColumnAggregate:
+    """Partial aggregate of one column over some of its rows.
+
+    Holds the row, missing and infinite counts, the count of every distinct value
+    and, for numerical columns, a `KLLSketch` with exact moments and approximate
+    quantiles. Aggregates of disjoint row sets `merge` into the aggregate of their
+    union. Past `MAX_TRACKED_VALUES` distinct values only the most frequent ones are
+    kept and ``truncated`` is set: the distinct count then comes from a
+    `HyperLogLog` of every value seen, and the kept counts may be low by at most
+    ``truncation_error``, the sum of the largest count dropped at each truncation.
+    `profile` reports both error bounds.
+    """
+
+    def __init__(self, feature_type: str, k: int = DEFAULT_K, seed: Any = None):
+        self.feature_type = feature_type
+        self.rows = 0
+        self.missing = 0
+        self.pos_inf = 0
+        self.neg_inf = 0
+        self.value_counts = pd.Series(dtype=np.int64)
+        self.truncated = False
+        self.truncation_error = 0
+        self.distinct = HyperLogLog()
+        self.sketch = KLLSketch(k, seed) if feature_type == "num" else None
+
+    @classmethod
+    def from_series(
+        cls, values: pd.Series, feature_type: str, k: int = DEFAULT_K, seed: Any = None
+    ) -> "ColumnAggregate":
+        aggregate = cls(feature_type, k, seed)
+        aggregate.rows = len(values)
+        aggregate.missing = int(values.isnull().sum())
+        aggregate.value_counts = values.value_counts()
+        aggregate.distinct.update(aggregate.value_counts.index)
+        if aggregate.sketch is not None:
+            floats = _float_values(values)
+            aggregate.pos_inf = int(np.sum(floats == np.inf))
+            aggregate.neg_inf = int(np.sum(floats == -np.inf))
+            aggregate.sketch.update(floats)
+        aggregate._truncate()
+        return aggregate
+
+    def merge(self, other: "ColumnAggregate") -> "ColumnAggregate":
+        self.rows += other.rows
+        self.missing += other.missing
+        self.pos_inf += other.pos_inf
+        self.neg_inf += other.neg_inf
+        self.value_counts = self.value_counts.add(
+            other.value_counts, fill_value=0
+        ).astype(np.int64)
+        self.truncated = self.truncated or other.truncated
+        self.truncation_error += other.truncation_error
+        self.distinct.merge(other.distinct)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+        self._truncate()
+        return self
+
+    def _truncate(self):
+        if len(self.value_counts) > MAX_TRACKED_VALUES:
+            kept = self.value_counts.nlargest(MAX_TRACKED_VALUES)
+            # A dropped value may come back in a later merge, short of this count.
+            self.truncation_error += int(self.value_counts.drop(kept.index).max())
+            self.value_counts = kept
+            self.truncated = True
+
+    @property
+    def quantiles(self) -> KLLSketch:
+        """The quantile sketch of a numerical column."""
+        if self.sketch is None:
+            raise TypeError(f"A {self.feature_type} column has no quantile sketch.")
+        return self.sketch
+
+    @property
+    def non_null(self) -> int:
+        return self.rows - self.missing
+
+    @property
+    def cleaned_size(self) -> int:
+        """Values left once missing, and infinite numerical, values are dropped."""
+        return self.non_null - self.pos_inf - self.neg_inf
+
+    def profile(self) -> ColumnProfile:
+        """The column's `ColumnProfile`; quartiles come from the sketch, and past
+        `MAX_TRACKED_VALUES` distinct values the distinct count and most common
+        values are estimated, with their error bounds.
+        """
+        value_counts = self.value_counts
+        if self.missing:
+            value_counts = pd.concat(
+                [value_counts, pd.Series([self.missing], index=[np.nan])]
+            )
+        numeric, distinct, errors = None, None, {}
+        if self.truncated:
+            distinct = max(self.distinct.count(), len(self.value_counts))
+            errors["unique_count"] = self.distinct.relative_error
+            errors["most_common"] = self.truncation_error
+        if self.sketch is not None:
+            numeric = sketch_numeric_stats(self.sketch, self.pos_inf, self.neg_inf)
+            errors["percentiles"] = self.sketch.rank_error
+        return ColumnProfile(
+            self.rows,
+            value_counts.sort_values(ascending=False, kind="stable"),
+            numeric,
+            distinct,
+            errors,
+        )
+
+    def finite_counts(self) -> pd.Series:
+        """Counts of the values that remain after cleaning, sorted by value."""
+        counts = self.value_counts
+        if self.feature_type == "num":
+            counts = counts[np.isfinite(counts.index.to_numpy(dtype=np.float64))]
+        return counts[counts > 0].sort_index()
+
+
+def hist_edges(column: ColumnAggregate) -> npt.NDArray[Any]:
+    """The edges ``np.histogram(values, bins=HIST_BINS)`` uses, from the extremes."""
+    sketch = column.quantiles
+    extremes = [sketch.min, sketch.max] if sketch.count else []
+    return np.histogram_bin_edges(extremes, HIST_BINS)
+
+
+def sturges_edges(
+    reference: ColumnAggregate, production: ColumnAggregate
+) -> npt.NDArray[Any]:
+    """``np.histogram_bin_edges(..., bins="sturges")`` of both samples pooled."""
+    low = min(reference.quantiles.min, production.quantiles.min)
+    high = max(reference.quantiles.max, production.quantiles.max)
+    width = (high - low) / (
+        np.log2(reference.cleaned_size + production.cleaned_size) + 1.0
+    )
+    return np.linspace(low, high, int(np.ceil((high - low) / width)) + 1)
+
+
+def aggregate_encoding(
+    reference: ColumnAggregate, production: ColumnAggregate
+) -> CategoricalEncoding:
+    """Counts of both aggregates on their pooled categories, as the exact tests take them."""
+    ref_counts, prod_counts = reference.finite_counts(), production.finite_counts()
+    categories = ref_counts.index.union(prod_counts.index)
+    return CategoricalEncoding.from_counts(
+        np.asarray(categories),
+        ref_counts.reindex(categories, fill_value=0).to_numpy(),
+        prod_counts.reindex(categories, fill_value=0).to_numpy(),
+    )
+
+
+class CoMoments:
+    """Pairwise-complete co-moments of numerical columns, for Pearson correlation.
+
+    Entry ``[i, j]`` of every matrix covers the rows where both column ``i`` and
+    column ``j`` are finite, as in ``DataFrame.corr``: their count, the mean and sum
+    of squared deviations of column ``i`` over them, and the co-moment of the pair.
+    Merging uses the pairwise update of Chan et al., so no sum of raw squares is
+    ever formed.
+    """
+
+    def __init__(self, columns: List[str]):
+        K = len(columns)
+        self.columns = columns
+        self.n = np.zeros((K, K))
+        self.mean = np.zeros((K, K))
+        self.m2 = np.zeros((K, K))
+        self.comoment = np.zeros((K, K))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, columns: List[str]) -> "CoMoments":
+        moments = cls(columns)
+        if not columns:
+            return moments
+        values = frame[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        mask = np.isfinite(values)
+        # Centre every column first so that the sums below stay small.
+        finite = mask.sum(axis=0)
+        shift = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(finite, 1)
+        centred = np.where(mask, values - shift, 0.0)
+        both = mask.astype(np.float64)
+        n = both.T @ both
+        sums = centred.T @ both
+        squares = (centred**2).T @ both
+        products = centred.T @ centred
+        with np.errstate(invalid="ignore", divide="ignore"):
+            local_mean = np.where(n > 0, sums / n, 0.0)
+            moments.m2 = squares - local_mean * sums
+            moments.comoment = products - local_mean * sums.T
+        moments.n = n
+        moments.mean = local_mean + shift[:, None]
+        return moments
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            self.mean = np.where(n > 0, self.mean + delta * other.n / n, 0.0)
+        self.m2 = self.m2 + other.m2 + delta**2 * weight
+        self.comoment = self.comoment + other.comoment + delta * delta.T * weight
+        self.n = n
+        return self
+
+    def pearson(self, columns: List[str]) -> pd.DataFrame:
+        if not columns:
+            return pd.DataFrame()
+        index = [self.columns.index(column) for column in columns]
+        grid = np.ix_(index, index)
+        m2 = self.m2[grid]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment[grid] / np.sqrt(m2 * m2.T)
+        corr = np.where(self.n[grid] > 0, np.clip(corr, -1.0, 1.0), np.nan)
+        return pd.DataFrame(corr, columns=columns, index=columns)
+
+
+class CoOccurrence:
+    """Co-occurrence counts of every pair of categories, for Cramér's V.
+
+    Categories are labelled ``(column position, value)`` so that counts taken on
+    different partitions line up when merged.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.labels: List[Tuple[int, Any]] = []
+        self.counts = sparse.csr_matrix((0, 0))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, columns: List[str]) -> "CoOccurrence":
+        occurrence = cls(columns)
+        if not columns:
+            return occurrence
+        codes = {}
+        for position, column in enumerate(columns):
+            codes[column], uniques = pd.factorize(frame[column])
+            occurrence.labels.extend((position, value) for value in uniques.tolist())
+        one_hot, _ = one_hot_columns(pd.DataFrame(codes, columns=columns))
+        occurrence.counts = (one_hot.T @ one_hot).tocsr()
+        return occurrence
+
+    def merge(self, other: "CoOccurrence") -> "CoOccurrence":
+        index = {label: i for i, label in enumerate(self.labels)}
+        for label in other.labels:
+            if label not in index:
+                index[label] = len(self.labels)
+                self.labels.append(label)
+        size = len(self.labels)
+        remap = np.array([index[label] for label in other.labels], dtype=np.int64)
+        own = sparse.coo_matrix(self.counts)
+        theirs = sparse.coo_matrix(other.counts)
+        self.counts = sparse.csr_matrix(
+            (
+                np.concatenate([own.data, theirs.data]),
+                (
+                    np.concatenate([own.row, remap[theirs.row]]),
+                    np.concatenate([own.col, remap[theirs.col]]),
+                ),
+            ),
+            shape=(size, size),
+        )
+        return self
+
+    def cramer_v(self, columns: List[str]) -> pd.DataFrame:
+        if len(columns) <= 1:
+            return pd.DataFrame()
+        positions = {self.columns.index(column): i for i, column in enumerate(columns)}
+        keep = np.array(
+            [i for i, (position, _) in enumerate(self.labels) if position in positions],
+            dtype=np.int64,
+        )
+        owner = np.array([positions[self.labels[i][0]] for i in keep], dtype=np.int64)
+        return cramer_v_from_counts(self.counts[keep][:, keep], owner, columns)
+
+
+class RowSample:
+    """Uniform sample of rows, merged by keeping the rows with the smallest keys."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.keys = np.empty(0)
+        self.rows = pd.DataFrame()
+
+    @classmethod
+    def from_frame(
+        cls, frame: pd.DataFrame, columns: List[str], size: int, seed: Any = None
+    ) -> "RowSample":
+        sample = cls(size)
+        keys = np.random.default_rng(seed).random(len(frame))
+        keep = np.argsort(keys, kind="stable")[:size]
+        sample.keys = keys[keep]
+        sample.rows = frame[columns].iloc[keep].reset_index(drop=True)
+        return sample
+
+    def merge(self, other: "RowSample") -> "RowSample":
+        keys = np.concatenate([self.keys, other.keys])
+        rows = pd.concat([self.rows, other.rows], ignore_index=True)
+        keep = np.argsort(keys, kind="stable")[: self.size]
+        self.keys = keys[keep]
+        self.rows = rows.iloc[keep].reset_index(drop=True)
+        return self
+
+
+class FrameAggregate:
+    """Every partial aggregate explainit needs from one partition of a dataset."""
+
+    def __init__(
+        self,
+        feature_types: Dict[str, str],
+        columns: Dict[str, ColumnAggregate],
+        co_moments: CoMoments,
+        co_occurrence: CoOccurrence,
+        sample: RowSample,
+    ):
+        self.feature_types = feature_types
+        self.columns = columns
+        self.co_moments = co_moments
+        self.co_occurrence = co_occurrence
+        self.sample = sample
+
+    @classmethod
+    def from_frame(
+        cls,
+        frame: pd.DataFrame,
+        feature_types: Dict[str, str],
+        k: int = DEFAULT_K,
+        sample_rows: int = DEFAULT_SAMPLE_ROWS,
+        seed: Optional[Any] = None,
+    ) -> "FrameAggregate":
+        num = [feature for feature, kind in feature_types.items() if kind == "num"]
+        cat = [feature for feature, kind in feature_types.items() if kind == "cat"]
+        return cls(
+            feature_types,
+            {
+                feature: ColumnAggregate.from_series(frame[feature], kind, k, seed)
+                for feature, kind in feature_types.items()
+            },
+            CoMoments.from_frame(frame, num),
+            CoOccurrence.from_frame(frame, cat),
+            RowSample.from_frame(frame, num, sample_rows, seed),
+        )
+
+    @property
+    def rows(self) -> int:
+        return next(iter(self.columns.values())).rows if self.columns else 0
+
+    def merge(self, other: "FrameAggregate") -> "FrameAggregate":
+        for feature, aggregate in self.columns.items():
+            aggregate.merge(other.columns[feature])
+        self.co_moments.merge(other.co_moments)
+        self.co_occurrence.merge(other.co_occurrence)
+        self.sample.merge(other.sample)
+        return self
@@ -0,0 +1,231 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from abc import ABC
+from abc import abstractmethod
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+from explainit.analyzer.data_summary import data_summary_stats
+from explainit.analyzer.feature_summary import feature_summary_stats
+from explainit.analyzer.reference_profile import clean_feature
+from explainit.analyzer.reference_profile import CORRELATION_KINDS
+from explainit.analyzer.reference_profile import split_feature_names
+from explainit.correlations.correlations import calculate_correlations
+from explainit.correlations.correlations import select_features_for_corr
+from explainit.sources import read_source
+from explainit.stattests.stat_test import get_statistical_info
+from explainit.stattests.stat_test import get_stattest
+
+
+class Backend(ABC):
+    """Where the statistics of a dataset are computed.
+
+    A backend wraps the functions behind the statistics of a report:
+    `get_statistical_info`, `feature_summary_stats`, `data_summary_stats` and
+    `calculate_correlations`. `PandasBackend` calls them on in-memory dataframes;
+    `explainit.backends.partitioned.PartitionedBackend` computes the same values
+    from partial aggregates of each partition of a dataset.
+    """
+
+    @abstractmethod
+    def prepare(self, data: Any, columns: Optional[List[str]] = None) -> Any:
+        """The backend's handle on a data source, limited to ``columns``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def feature_types(
+        self, data: Any, datetime_col_name: Optional[str] = ""
+    ) -> Dict[str, List[str]]:
+        """Sorted numerical and categorical feature names, see `split_feature_names`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def feature_tests(
+        self, reference: Any, production: Any, feature_names: Dict[str, List[str]]
+    ) -> Dict[str, List[str]]:
+        """Map every feature to [stattest, feature_type]."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def statistical_info(
+        self, feature_test: Dict[str, List[str]], reference: Any, production: Any
+    ) -> Dict[str, Dict[str, Any]]:
+        """Drift results and histograms, as `get_statistical_info`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def feature_summary_stats(
+        self, data: Any, feature: str, feature_type: str
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def data_summary_stats(
+        self, data: Any, target_column: Optional[str] = None
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def calculate_correlations(
+        self, data: Any, num_for_corr: List[str], cat_for_corr: List[str], kind: str
+    ) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class PandasBackend(Backend):
+    """Computes everything on whole dataframes in this process."""
+
+    def __init__(self, n_jobs: int = 1):
+        self.n_jobs = n_jobs
+
+    def prepare(self, data: Any, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return read_source(data, columns=columns)
+
+    def feature_types(
+        self, data: pd.DataFrame, datetime_col_name: Optional[str] = ""
+    ) -> Dict[str, List[str]]:
+        return split_feature_names(data, datetime_col_name)
+
+    def feature_tests(
+        self,
+        reference: pd.DataFrame,
+        production: pd.DataFrame,
+        feature_names: Dict[str, List[str]],
+    ) -> Dict[str, List[str]]:
+        return {
+            feature: [
+                get_stattest(
+                    feature_type,
+                    clean_feature(reference[feature], feature_type),
+                    clean_feature(production[feature], feature_type),
+                ),
+                feature_type,
+            ]
+            for feature_type, features in feature_names.items()
+            for feature in features
+        }
+
+    def statistical_info(
+        self,
+        feature_test: Dict[str, List[str]],
+        reference: pd.DataFrame,
+        production: pd.DataFrame,
+    ) -> Dict[str, Dict[str, Any]]:
+        statistical_info: Dict[str, Dict[str, Any]] = get_statistical_info(
+            feature_test, reference, production, n_jobs=self.n_jobs
+        )
+        return statistical_info
+
+    def feature_summary_stats(
+        self, data: pd.DataFrame, feature: str, feature_type: str
+    ) -> Dict[str, Any]:
+        return feature_summary_stats(data[feature], feature_type)
+
+    def data_summary_stats(
+        self, data: pd.DataFrame, target_column: Optional[str] = None
+    ) -> Dict[str, Any]:
+        summary: Dict[str, Any] = data_summary_stats(data, target_column=target_column)
+        return summary
+
+    def calculate_correlations(
+        self,
+        data: pd.DataFrame,
+        num_for_corr: List[str],
+        cat_for_corr: List[str],
+        kind: str,
+    ) -> pd.DataFrame:
+        return calculate_correlations(
+            data, num_for_corr, cat_for_corr, kind, n_jobs=self.n_jobs
+        )
+
+
+def compute_statistics(
+    reference_data: Any,
+    production_data: Any,
+    target_col_name: str,
+    datetime_col_name: Optional[str] = "",
+    backend: Optional[Backend] = None,
+) -> Dict[str, Any]:
+    """Compute drift, feature and data summaries and correlations with a backend.
+
+    These are the numbers behind a report, without its figures.
+    Args:
+        reference_data: reference dataset, in a form ``backend`` accepts.
+        production_data: production dataset, in a form ``backend`` accepts.
+        target_col_name: target column name.
+        datetime_col_name: optional datetime column, excluded from the features.
+        backend: where to compute, a `PandasBackend` when omitted.
+    Returns:
+        statistics: ``feature_test``, ``statistical_data`` and, keyed by
+            ``"reference"`` and ``"production"``, ``feature_stats``,
+            ``data_summary`` and ``correlations``.
+    """
+    backend = PandasBackend() if backend is None else backend
+    reference = backend.prepare(reference_data)
+    feature_names = backend.feature_types(reference, datetime_col_name)
+    columns = feature_names["num"] + feature_names["cat"]
+    if target_col_name not in columns:
+        raise ValueError(
+            f"Given target column name {Style.BRIGHT + Fore.RED}{target_col_name}{Style.RESET_ALL} does not exist in the data."
+        )
+    frames = {
+        "reference": backend.prepare(reference, columns),
+        "production": backend.prepare(production_data, columns),
+    }
+
+    feature_test = backend.feature_tests(
+        frames["reference"], frames["production"], feature_names
+    )
+    statistical_data = backend.statistical_info(
+        feature_test, frames["reference"], frames["production"]
+    )
+
+    feature_stats: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    data_summary: Dict[str, Dict[str, Any]] = {}
+    for side, frame in frames.items():
+        feature_stats[side] = {
+            feature: backend.feature_summary_stats(frame, feature, feature_type)
+            for feature_type, features in feature_names.items()
+            for feature in features
+        }
+        data_summary[side] = backend.data_summary_stats(
+            frame, target_column=target_col_name
+        )
+        data_summary[side]["categorical features"] = len(feature_names["cat"])
+        data_summary[side]["numeric features"] = len(feature_names["num"])
+
+    num_for_corr, cat_for_corr = select_features_for_corr(
+        feature_names["num"], feature_names["cat"], feature_stats["reference"]
+    )
+    correlations = {
+        side: {
+            kind: backend.calculate_correlations(
+                frame, num_for_corr, cat_for_corr, kind
+            )
+            for kind in CORRELATION_KINDS
+        }
+        for side, frame in frames.items()
+    }
+    return {
+        "feature_test": feature_test,
+        "statistical_data": statistical_data,
+        "feature_stats": feature_stats,
+        "data_summary": data_summary,
+        "correlations": correlations,
+    }
@@ -0,0 +1,94 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from explainit.stattests.parallel import resolve_n_jobs
+
+
+class LocalExecutor:
+    """Runs partition tasks in this process, on a thread pool when ``n_jobs > 1``."""
+
+    def __init__(self, n_jobs: int = 1):
+        self.n_workers = resolve_n_jobs(n_jobs)
+
+    def map(self, function: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        if self.n_workers <= 1 or len(items) <= 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            return list(executor.map(function, items))
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> "LocalExecutor":
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
+
+
+class DaskExecutor:
+    """Runs partition tasks on a Dask cluster, a local one unless a client is given.
+
+    Items may be dataframes, file paths or the delayed partitions of a Dask
+    dataframe (``ddf.to_delayed()``); delayed partitions are loaded on the workers.
+    Only the partial aggregates travel back to this process.
+    """
+
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        n_workers: Optional[int] = None,
+        threads_per_worker: int = 1,
+    ):
+        try:
+            import dask
+            from dask.distributed import Client
+            from dask.distributed import LocalCluster
+        except ImportError as error:
+            raise ImportError(
+                "The Dask executor needs dask[distributed], install it with `pip install explainit[dask]`."
+            ) from error
+        self._dask = dask
+        self._owns_client = client is None
+        if client is None:
+            client = Client(
+                LocalCluster(
+                    n_workers=n_workers,
+                    threads_per_worker=threads_per_worker,
+                    processes=True,
+                )
+            )
+        self.client = client
+
+    def map(self, function: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        tasks = [self._dask.delayed(function, pure=False)(item) for item in items]
+        return list(self.client.gather(self.client.compute(tasks)))
+
+    def close(self):
+        if self._owns_client:
+            cluster = self.client.cluster
+            self.client.close()
+            cluster.close()
+
+    def __enter__(self) -> "DaskExecutor":
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
@@ -0,0 +1,407 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+from functools import partial
+from functools import reduce
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from explainit.analyzer.data_summary import data_summary_from_profiles
+from explainit.analyzer.feature_summary import feature_summary_from_profile
+from explainit.analyzer.reference_profile import split_feature_names
+from explainit.backends.aggregates import aggregate_encoding
+from explainit.backends.aggregates import ColumnAggregate
+from explainit.backends.aggregates import DEFAULT_SAMPLE_ROWS
+from explainit.backends.aggregates import FrameAggregate
+from explainit.backends.aggregates import hist_edges
+from explainit.backends.aggregates import sturges_edges
+from explainit.backends.base import Backend
+from explainit.backends.executors import LocalExecutor
+from explainit.binning import hist_data
+from explainit.encoding import CategoricalEncoding
+from explainit.sources import read_source
+from explainit.sources import resolve_paths
+from explainit.sources import source_schema
+from explainit.stattests.chi2_test import chi_stat_test_from_counts
+from explainit.stattests.ks_test import ks_sketch_stat_test
+from explainit.stattests.sketches import DEFAULT_K
+from explainit.stattests.stat_test import select_stattest
+from explainit.stattests.wasserstein_distance_test import (
+    wasserstein_distance_sketch_stat_test,
+)
+from explainit.stattests.z_test import z_stat_test_from_counts
+from scipy.spatial import distance
+
+# Rows per partition when a single dataframe is split up.
+DEFAULT_PARTITION_ROWS = 1_000_000
+# Numerical features with more distinct reference values get binned Jensen-Shannon.
+JS_MAX_DISTINCT = 20
+
+
+class PartitionedFrame:
+    """A dataset made of partitions that are only loaded by the tasks using them.
+
+    A partition is a dataframe, the path of a Parquet or CSV file, a callable
+    returning a dataframe or a delayed Dask partition. ``schema`` is an empty
+    dataframe with the column names and types of every partition.
+    """
+
+    def __init__(
+        self,
+        partitions: Sequence[Any],
+        schema: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+    ):
+        self.partitions = list(partitions)
+        self.schema = schema
+        self.columns = schema.columns.tolist() if columns is None else list(columns)
+        self.aggregate: Optional[FrameAggregate] = None
+
+    @classmethod
+    def from_source(
+        cls, source: Any, partition_rows: int = DEFAULT_PARTITION_ROWS
+    ) -> "PartitionedFrame":
+        """Partition a dataframe, a Dask dataframe, or Parquet or CSV files.
+        Args:
+            source: a dataframe, split every ``partition_rows`` rows; a Dask
+                dataframe, one partition per Dask partition; or the path, glob or
+                list of paths of Parquet or CSV files, one partition per file.
+            partition_rows: rows per partition of a dataframe.
+        Returns:
+            The partitioned frame.
+        """
+        if isinstance(source, PartitionedFrame):
+            return source
+        if isinstance(source, pd.DataFrame):
+            n_partitions = max(int(np.ceil(len(source) / partition_rows)), 1)
+            bounds = np.linspace(0, len(source), n_partitions + 1).astype(int)
+            return cls(
+                [source.iloc[start:stop] for start, stop in zip(bounds, bounds[1:])],
+                source.iloc[:0],
+            )
+        if hasattr(source, "to_delayed") and hasattr(source, "_meta"):
+            return cls(source.to_delayed(), source._meta)
+        paths = resolve_paths(source)
+        return cls(paths, source_schema(paths[0]))
+
+    def select(self, columns: List[str]) -> "PartitionedFrame":
+        return PartitionedFrame(self.partitions, self.schema, columns)
+
+    @property
+    def n_partitions(self) -> int:
+        return len(self.partitions)
+
+
+def _load_partition(partition: Any, columns: List[str]) -> pd.DataFrame:
+    if isinstance(partition, (str, os.PathLike)):
+        return read_source(partition, columns=columns)
+    if callable(partition):
+        partition = partition()
+    return partition
+
+
+def _aggregate_partition(
+    item: Tuple[int, Any],
+    columns: List[str],
+    feature_types: Dict[str, str],
+    k: int,
+    sample_rows: int,
+    seed: int,
+) -> FrameAggregate:
+    index, partition = item
+    return FrameAggregate.from_frame(
+        _load_partition(partition, columns),
+        feature_types,
+        k=k,
+        sample_rows=sample_rows,
+        seed=(seed, index),
+    )
+
+
+def _histogram_partition(
+    item: Tuple[int, Any],
+    columns: List[str],
+    edges: Dict[str, Dict[str, npt.NDArray[Any]]],
+) -> Dict[str, Dict[str, npt.NDArray[Any]]]:
+    _, partition = item
+    frame = _load_partition(partition, columns)
+    counts = {}
+    for feature, feature_edges in edges.items():
+        values = frame[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[np.isfinite(values)]
+        counts[feature] = {
+            name: np.histogram(values, bins)[0] for name, bins in feature_edges.items()
+        }
+    return counts
+
+
+def _merge_histograms(left, right):
+    for feature, histograms in right.items():
+        for name, counts in histograms.items():
+            left[feature][name] = left[feature][name] + counts
+    return left
+
+
+def select_aggregate_stattest(
+    feature_type: str, reference: ColumnAggregate, production: ColumnAggregate
+) -> str:
+    """`select_stattest` on the distinct values counted by the aggregates."""
+    n_values = len(
+        reference.finite_counts().index.union(production.finite_counts().index)
+    )
+    return select_stattest(feature_type, reference.cleaned_size, n_values)
+
+
+def aggregate_stat_test(
+    stattest: str,
+    reference: ColumnAggregate,
+    production: ColumnAggregate,
+    encoding: Optional[CategoricalEncoding] = None,
+    binned: Optional[Tuple[npt.NDArray[Any], npt.NDArray[Any]]] = None,
+) -> Tuple[float, bool, float]:
+    """Run a drift test on the aggregates of a feature.
+    Args:
+        stattest: name of the test, see `select_stattest`.
+        reference: aggregate of the reference values.
+        production: aggregate of the production values.
+        encoding: shared counts of both sides, built from the aggregates if omitted.
+        binned: reference and production counts on common bins, which binned
+            Jensen-Shannon uses in place of the distinct value counts.
+    Returns:
+        p_value, drift, threshold
+    """
+    threshold = 0.05
+    if stattest == "ks_stat_test":
+        return ks_sketch_stat_test(
+            reference.quantiles, production.quantiles, threshold=threshold
+        )
+    if stattest == "wasserstein_stat_test":
+        return wasserstein_distance_sketch_stat_test(
+            reference.quantiles, production.quantiles, threshold=threshold
+        )
+    encoding = (
+        aggregate_encoding(reference, production) if encoding is None else encoding
+    )
+    if stattest == "z_stat_test":
+        return z_stat_test_from_counts(encoding, threshold=threshold)
+    if stattest == "chi_stat_test":
+        return chi_stat_test_from_counts(
+            encoding.ref_counts, encoding.prod_counts, threshold=threshold
+        )
+    if binned is not None:
+        ref_counts, prod_counts = binned
+    else:
+        present = encoding.present
+        ref_counts = encoding.ref_counts[present]
+        prod_counts = encoding.prod_counts[present]
+    p_value = distance.jensenshannon(
+        ref_counts / reference.cleaned_size, prod_counts / production.cleaned_size
+    )
+    return p_value, p_value <= threshold, threshold
+
+
+class PartitionedBackend(Backend):
+    """Computes the statistics of partitioned data with a map-reduce over partitions.
+
+    Each partition is reduced to a `FrameAggregate` (counts, moments, quantile
+    sketches, co-moment and co-occurrence matrices and a row sample) on an
+    executor, and the aggregates are merged here. A second pass counts the drift
+    histograms once their bin edges are known. Only these aggregates leave the
+    workers. Counts, chi-square, z-test, Jensen-Shannon, histograms, means,
+    Pearson and Cramér's V match the pandas results; Kolmogorov-Smirnov,
+    Wasserstein and percentiles come from the sketches and are approximate, and
+    Spearman and Kendall are computed on a uniform sample of ``sample_rows`` rows.
+    Columns past `MAX_TRACKED_VALUES` distinct values get estimated distinct counts
+    and most common values, with error bounds, see `ColumnAggregate`.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Any] = None,
+        partition_rows: int = DEFAULT_PARTITION_ROWS,
+        k: int = DEFAULT_K,
+        sample_rows: int = DEFAULT_SAMPLE_ROWS,
+        seed: int = 0,
+    ):
+        self.executor = LocalExecutor() if executor is None else executor
+        self.partition_rows = partition_rows
+        self.k = k
+        self.sample_rows = sample_rows
+        self.seed = seed
+
+    def prepare(
+        self, data: Any, columns: Optional[List[str]] = None
+    ) -> PartitionedFrame:
+        frame = PartitionedFrame.from_source(data, self.partition_rows)
+        return frame if columns is None else frame.select(columns)
+
+    def feature_types(
+        self, data: PartitionedFrame, datetime_col_name: Optional[str] = ""
+    ) -> Dict[str, List[str]]:
+        return split_feature_names(data.schema[data.columns], datetime_col_name)
+
+    def _aggregate(self, data: PartitionedFrame) -> FrameAggregate:
+        if data.aggregate is None:
+            names = self.feature_types(data)
+            feature_types = {
+                feature: feature_type
+                for feature_type, features in names.items()
+                for feature in features
+            }
+            task = partial(
+                _aggregate_partition,
+                columns=data.columns,
+                feature_types=feature_types,
+                k=self.k,
+                sample_rows=self.sample_rows,
+                seed=self.seed,
+            )
+            aggregates = self.executor.map(task, list(enumerate(data.partitions)))
+            data.aggregate = reduce(FrameAggregate.merge, aggregates)
+        return data.aggregate
+
+    def _histograms(
+        self, data: PartitionedFrame, edges: Dict[str, Dict[str, npt.NDArray[Any]]]
+    ) -> Dict[str, Dict[str, npt.NDArray[Any]]]:
+        if not edges:
+            return {}
+        task = partial(_histogram_partition, columns=list(edges), edges=edges)
+        counts = self.executor.map(task, list(enumerate(data.partitions)))
+        return reduce(_merge_histograms, counts)
+
+    def feature_tests(
+        self,
+        reference: PartitionedFrame,
+        production: PartitionedFrame,
+        feature_names: Dict[str, List[str]],
+    ) -> Dict[str, List[str]]:
+        ref_columns = self._aggregate(reference).columns
+        prod_columns = self._aggregate(production).columns
+        feature_test = {}
+        for feature_type, features in feature_names.items():
+            for feature in features:
+                feature_test[feature] = [
+                    select_aggregate_stattest(
+                        feature_type, ref_columns[feature], prod_columns[feature]
+                    ),
+                    feature_type,
+                ]
+        return feature_test
+
+    def statistical_info(
+        self,
+        feature_test: Dict[str, List[str]],
+        reference: PartitionedFrame,
+        production: PartitionedFrame,
+    ) -> Dict[str, Dict[str, Any]]:
+        ref_columns = self._aggregate(reference).columns
+        prod_columns = self._aggregate(production).columns
+
+        # Bin edges first, as `np.histogram` would pick them on the whole data.
+        ref_edges: Dict[str, Dict[str, npt.NDArray[Any]]] = {}
+        prod_edges: Dict[str, Dict[str, npt.NDArray[Any]]] = {}
+        for feature, (stattest, feature_type) in feature_test.items():
+            if feature_type != "num":
+                continue
+            ref, prod = ref_columns[feature], prod_columns[feature]
+            ref_edges[feature] = {"hist": hist_edges(ref)}
+            prod_edges[feature] = {"hist": hist_edges(prod)}
+            if (
+                stattest == "jensenshannon_stat_test"
+                and len(ref.finite_counts()) > JS_MAX_DISTINCT
+            ):
+                ref_edges[feature]["js"] = prod_edges[feature]["js"] = sturges_edges(
+                    ref, prod
+                )
+        ref_histograms = self._histograms(reference, ref_edges)
+        prod_histograms = self._histograms(production, prod_edges)
+
+        test_info = {}
+        for feature, (stattest, feature_type) in feature_test.items():
+            ref, prod = ref_columns[feature], prod_columns[feature]
+            encoding = aggregate_encoding(ref, prod)
+            if "js" in ref_edges.get(feature, {}):
+                binned = (
+                    ref_histograms[feature]["js"],
+                    prod_histograms[feature]["js"],
+                )
+            else:
+                binned = None
+            p_value, drift, threshold = aggregate_stat_test(
+                stattest, ref, prod, encoding, binned
+            )
+            test_info[feature] = {
+                "feature_name": feature,
+                "threshold": threshold,
+                "stattest": feature_test[feature],
+                "p_value": p_value,
+                "drift": drift,
+            }
+            if feature_type == "num":
+                test_info[feature]["prod_hist_data"] = (
+                    hist_data(
+                        prod_histograms[feature]["hist"], prod_edges[feature]["hist"]
+                    ),
+                )
+                test_info[feature]["ref_hist_data"] = hist_data(
+                    ref_histograms[feature]["hist"], ref_edges[feature]["hist"]
+                )
+            else:
+                test_info[feature]["ref_hist_data"] = encoding.hist_data(
+                    encoding.ref_counts
+                )
+                test_info[feature]["prod_hist_data"] = encoding.hist_data(
+                    encoding.prod_counts
+                )
+        return test_info
+
+    def feature_summary_stats(
+        self, data: PartitionedFrame, feature: str, feature_type: str
+    ) -> Dict[str, Any]:
+        """Feature summary as `feature_summary_stats`, quartiles from the sketch."""
+        return feature_summary_from_profile(
+            self._aggregate(data).columns[feature].profile()
+        )
+
+    def data_summary_stats(
+        self, data: PartitionedFrame, target_column: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Data summary as `data_summary_stats`, from the column aggregates."""
+        aggregate = self._aggregate(data)
+        return data_summary_from_profiles(
+            {column: aggregate.columns[column].profile() for column in data.columns},
+            aggregate.rows,
+            target_column=target_column,
+        )
+
+    def calculate_correlations(
+        self,
+        data: PartitionedFrame,
+        num_for_corr: List[str],
+        cat_for_corr: List[str],
+        kind: str,
+    ) -> pd.DataFrame:
+        aggregate = self._aggregate(data)
+        if kind == "cramer_v":
+            return aggregate.co_occurrence.cramer_v(cat_for_corr)
+        if kind == "pearson":
+            return aggregate.co_moments.pearson(num_for_corr)
+        return aggregate.sample.rows[num_for_corr].corr(kind)
@@ -0,0 +1,180 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from explainit.graphs.histograms import finite_values
+from explainit.graphs.histograms import nice_bin_edges
+
+# Equal-width bins of the ``ref_hist_data`` and ``prod_hist_data`` histograms.
+HIST_BINS = 10
+
+
+def hist_data(counts: npt.NDArray[Any], edges: npt.NDArray[Any]) -> List[List[float]]:
+    """[densities, edges], as ``np.histogram(values, edges, density=True)``."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        density = counts / np.diff(edges).astype(float) / counts.sum()
+    return [density.tolist(), edges.tolist()]
+
+
+def bin_codes(values: npt.NDArray[Any], edges: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    """Bin of every value over ``edges``, as `np.histogram` assigns it; -1 for
+    values outside the edges and for missing or infinite ones.
+    """
+    codes = np.searchsorted(edges, values, side="right") - 1
+    codes[values == edges[-1]] = len(edges) - 2
+    codes[~np.isfinite(values) | (codes >= len(edges) - 1)] = -1
+    return codes
+
+
+class FeatureHistogram:
+    """Counts of the reference and production values of a feature on one edge set.
+
+    A side is None when the edges were fitted to the other side alone.
+    """
+
+    def __init__(
+        self,
+        edges: npt.NDArray[Any],
+        ref_counts: Optional[npt.NDArray[Any]] = None,
+        prod_counts: Optional[npt.NDArray[Any]] = None,
+    ):
+        self.edges = edges
+        self.ref_counts = ref_counts
+        self.prod_counts = prod_counts
+
+    def counts(self, side: str) -> npt.NDArray[Any]:
+        """Counts of ``side``, ``"reference"`` or ``"production"``."""
+        counts = self.ref_counts if side == "reference" else self.prod_counts
+        if counts is None:
+            raise ValueError(f"The {side} values are not counted on these edges.")
+        return counts
+
+
+def _equal_width(ref: npt.NDArray[Any], prod: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    return np.histogram_bin_edges(np.concatenate([ref, prod]), HIST_BINS)
+
+
+def _sturges(ref: npt.NDArray[Any], prod: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    return np.histogram_bin_edges(np.concatenate([ref, prod]), "sturges")
+
+
+def _nice(ref: npt.NDArray[Any], prod: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    return nice_bin_edges([ref, prod])
+
+
+def _nice_ten(ref: npt.NDArray[Any], prod: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    return nice_bin_edges([ref, prod], n_bins=HIST_BINS)
+
+
+# Edge rule of every kind of histogram: (rule, whether it is fitted to log10 values,
+# the sides it counts).
+EDGE_RULES: Dict[
+    str,
+    Tuple[
+        Callable[[npt.NDArray[Any], npt.NDArray[Any]], npt.NDArray[Any]],
+        bool,
+        Tuple[str, ...],
+    ],
+] = {
+    # ``ref_hist_data`` and ``prod_hist_data``: `HIST_BINS` bins over each side.
+    "reference": (_equal_width, False, ("reference",)),
+    "production": (_equal_width, False, ("production",)),
+    # Binned Jensen-Shannon: Sturges' rule on the pooled values.
+    "sturges": (_sturges, False, ("reference", "production")),
+    # Distribution figure: about `HIST_BINS` plotly-style bins.
+    "distribution": (_nice_ten, False, ("reference", "production")),
+    # Feature summary figure, on linear and on log scale.
+    "summary": (_nice, False, ("reference", "production")),
+    "summary_log": (_nice, True, ("reference", "production")),
+}
+
+
+class HistogramCache:
+    """Lazily built histograms of the numerical features of a reference/production pair.
+
+    Every edge set of `EDGE_RULES` is computed, and both sides counted on it, once.
+    Only the edges and counts are kept: the finite values of a feature are
+    extracted for binning and dropped right after, so the cache stays small
+    whatever the number of rows. Drift tests, ``ref_hist_data``/``prod_hist_data``
+    and the histogram figures all read their bins from here, so no histogram is
+    binned twice, nor re-binned by plotly.
+    """
+
+    def __init__(
+        self,
+        reference_data: pd.DataFrame,
+        production_data: Optional[pd.DataFrame] = None,
+    ):
+        self.reference_data = reference_data
+        self.production_data = production_data
+        self._histograms: Dict[Tuple[str, str], FeatureHistogram] = {}
+        # Report stages running side by side share the cache.
+        self._lock = threading.RLock()
+
+    def values(
+        self, feature: str, log: bool = False
+    ) -> Tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+        """Finite reference and production values of ``feature``, or the log10 of
+        the positive ones; production values are empty without production data.
+        They are extracted anew on every call, never cached.
+        """
+        ref = finite_values(self.reference_data[feature])
+        prod = (
+            finite_values(self.production_data[feature])
+            if self.production_data is not None
+            else np.empty(0)
+        )
+        if log:
+            return np.log10(ref[ref > 0]), np.log10(prod[prod > 0])
+        return ref, prod
+
+    def built(self, features: List[str]) -> Dict[Tuple[str, str], FeatureHistogram]:
+        """Histograms of ``features`` built so far, keyed by (feature, kind)."""
+        with self._lock:
+            return {
+                key: histogram
+                for key, histogram in self._histograms.items()
+                if key[0] in features
+            }
+
+    def update(self, histograms: Dict[Tuple[str, str], FeatureHistogram]) -> None:
+        """Add histograms built elsewhere, see `built`."""
+        with self._lock:
+            self._histograms.update(histograms)
+
+    def histogram(self, feature: str, kind: str) -> FeatureHistogram:
+        """The ``kind`` histogram of ``feature``, see `EDGE_RULES`."""
+        with self._lock:
+            if (feature, kind) not in self._histograms:
+                rule, log, sides = EDGE_RULES[kind]
+                ref, prod = self.values(feature, log)
+                # Edges fitted to one side ignore the values of the other.
+                ref = ref if "reference" in sides else ref[:0]
+                prod = prod if "production" in sides else prod[:0]
+                edges = rule(ref, prod)
+                self._histograms[feature, kind] = FeatureHistogram(
+                    edges,
+                    np.histogram(ref, edges)[0] if "reference" in sides else None,
+                    np.histogram(prod, edges)[0] if "production" in sides else None,
+                )
+            return self._histograms[feature, kind]
@@ -0,0 +1,280 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+from explainit.analyzer.column_profile import DEFAULT_CHUNK_ROWS
+from explainit.backends.aggregates import DEFAULT_SAMPLE_ROWS
+from explainit.backends.partitioned import DEFAULT_PARTITION_ROWS
+from explainit.backends.partitioned import PartitionedBackend
+from explainit.stattests.batch_test import DEFAULT_BLOCK_SIZE
+from explainit.stattests.parallel import resolve_n_jobs
+
+MB = 2**20
+# Bytes assumed per value of an object column: the pointer and a short string.
+OBJECT_VALUE_BYTES = 64
+# Float64 copies of every value that each exact computation holds at its peak:
+# the sorted, pooled and ranked blocks of the drift tests, the numerical block of
+# the summaries, the matrices behind the correlations and the figure traces.
+DRIFT_COPIES = 6
+SUMMARY_COPIES = 2
+CORRELATION_COPIES = 4
+FIGURE_COPIES = 6
+# Float64 copies of a partition held while it is reduced to sketches.
+SKETCH_COPIES = 4
+# Fewest rows a downgraded stage works on, whatever the budget.
+MIN_ROWS = 10_000
+# Report stages the budget plans, see `MemoryBudget.plan`.
+BUDGET_STAGES = ("drift", "summary", "correlations", "figures")
+
+# What the dashboard says about a stage computed approximately.
+STAGE_NOTES = {
+    "drift": "Drift tests are approximate: Kolmogorov-Smirnov and Wasserstein "
+    "distances come from quantile sketches of {rows:,}-row partitions.",
+    "summary": "Feature summaries are approximate: distinct counts, quartiles and "
+    "most common values come from sketches of {rows:,}-row chunks.",
+    "correlations": "Correlations are approximate: both datasets are read in "
+    "{rows:,}-row partitions, and Spearman and Kendall are computed on a uniform "
+    f"sample of {DEFAULT_SAMPLE_ROWS:,} of their rows. Pearson and Cramér's V are "
+    "exact.",
+    "figures": "Figures are drawn from a stratified sample of {rows:,} rows of "
+    "each dataset.",
+}
+
+
+def value_bytes(dtype: Any) -> int:
+    """Bytes of one value of ``dtype``; `OBJECT_VALUE_BYTES` for strings and objects."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Codes of the narrowest integer type numbering every category.
+        n_categories = len(dtype.categories)
+        return 1 if n_categories < 2**7 else 2 if n_categories < 2**15 else 4
+    if dtype == object or pd.api.types.is_string_dtype(dtype):
+        return OBJECT_VALUE_BYTES
+    return np.dtype(dtype).itemsize
+
+
+def frame_bytes(data: pd.DataFrame) -> int:
+    """Bytes ``data`` is expected to hold, from its dtypes and row count alone."""
+    return len(data) * sum(value_bytes(dtype) for dtype in data.dtypes)
+
+
+class StagePlan:
+    """How one report stage runs under a memory budget.
+
+    Attributes:
+        stage: the stage, one of `BUDGET_STAGES`.
+        mode: ``"exact"``; ``"sketch"`` to reduce partitions of ``rows`` rows to
+            mergeable sketches; or ``"sample"`` to work on ``rows`` sampled rows.
+        estimated_mb: estimated peak memory of the exact computation.
+        available_mb: memory of the budget left beside the data.
+        rows: rows per partition or sample, None when exact.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        mode: str,
+        estimated_mb: float,
+        available_mb: float,
+        rows: Optional[int] = None,
+    ):
+        self.stage = stage
+        self.mode = mode
+        self.estimated_mb = estimated_mb
+        self.available_mb = available_mb
+        self.rows = rows
+
+    @property
+    def approximate(self) -> bool:
+        return self.mode != "exact"
+
+    def note(self) -> str:
+        """Why and how the stage is approximate, as the dashboard shows it."""
+        return (
+            STAGE_NOTES[self.stage].format(rows=self.rows)
+            + f" Exact results would need about {self.estimated_mb:,.0f} MB, with"
+            f" {max(self.available_mb, 0):,.0f} MB of the memory budget left."
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class MemoryBudget:
+    """Plans the report stages so their estimated peak memory stays within a budget.
+
+    The peak of every stage of `BUDGET_STAGES` is estimated from the row counts,
+    feature counts and dtypes of the data, before the stage runs, and compared with
+    the budget left once the data itself is held. A stage that would not fit runs
+    approximately instead: drift tests and correlations from the sketches of a
+    `PartitionedBackend`, summaries from `ColumnSketch` chunks, and figures from a
+    `stratified_sample`; partitions, chunks and samples are sized to fit. Stages
+    running side by side are planned each on their own.
+
+    Partitions, chunks and samples hold at least `MIN_ROWS` rows, below which the
+    sketches and samples lose their accuracy. A budget too small even for those is
+    exceeded, after a warning.
+    """
+
+    def __init__(self, budget_mb: float, n_jobs: int = 1):
+        self.budget_mb = budget_mb
+        self.n_workers = resolve_n_jobs(n_jobs)
+
+    def available_mb(self, frames: Sequence[pd.DataFrame]) -> float:
+        """Megabytes of the budget left beside ``frames``."""
+        return self.budget_mb - sum(frame_bytes(data) for data in frames) / MB
+
+    def estimate_mb(
+        self, stage: str, frames: Sequence[pd.DataFrame], feature_types: Dict[str, str]
+    ) -> float:
+        """Estimated peak memory of the exact ``stage`` beside the data, in megabytes.
+        Args:
+            stage: one of `BUDGET_STAGES`.
+            frames: reference and production data.
+            feature_types: mapping of feature name to ``"num"`` or ``"cat"``.
+        Returns:
+            estimate: megabytes.
+        """
+        num = [feature for feature, kind in feature_types.items() if kind == "num"]
+        cat = [feature for feature, kind in feature_types.items() if kind == "cat"]
+        # Drift tests and figures pool both datasets; the other stages take them in turn.
+        rows = sum(len(data) for data in frames)
+        side_rows = max(len(data) for data in frames)
+        widest = max(
+            [value_bytes(data[feature].dtype) for data in frames for feature in cat]
+            or [0]
+        )
+        if stage == "drift":
+            # Cached numerical values and categorical codes of every feature, then
+            # one block of numerical features, or one factorized column, per worker.
+            cached = rows * 8 * len(feature_types)
+            block = rows * 8 * DRIFT_COPIES * min(len(num), DEFAULT_BLOCK_SIZE)
+            factorized = rows * 2 * (widest + 8) if cat else 0
+            # Workers read every feature column from one shared copy.
+            shared = (
+                sum(
+                    len(data) * value_bytes(data[feature].dtype)
+                    for data in frames
+                    for feature in feature_types
+                )
+                if self.n_workers > 1
+                else 0
+            )
+            peak = cached + shared + self.n_workers * max(block, factorized)
+        elif stage == "summary":
+            # The numerical block and the value counts of the widest column.
+            peak = side_rows * (8 * SUMMARY_COPIES * len(num) + widest + 16)
+        elif stage == "correlations":
+            # Float, ranked and centred numerical matrices, and the stacked one-hot
+            # encodings of the categorical codes with their transpose.
+            peak = side_rows * 8 * (CORRELATION_COPIES * len(num) + 4 * len(cat))
+        else:
+            # The traces of one figure and the cached values of every histogram.
+            peak = rows * 8 * (FIGURE_COPIES + len(num))
+        return peak / MB
+
+    def _fitting_rows(
+        self, stage: str, available_mb: float, bytes_per_row: float
+    ) -> int:
+        rows = int(available_mb * MB / max(bytes_per_row, 1))
+        if rows < MIN_ROWS:
+            print(
+                f"{Style.BRIGHT + Fore.YELLOW}Warning:{Style.RESET_ALL} the {stage} "
+                f"stage needs about {MIN_ROWS * bytes_per_row / MB:,.1f} MB for "
+                f"{MIN_ROWS:,} rows at a time, the fewest it works on, while "
+                f"{max(available_mb, 0):,.1f} MB of the memory budget of "
+                f"{self.budget_mb:,.1f} MB are left beside the data, so it will "
+                "exceed the budget.",
+                file=sys.stderr,
+            )
+        return max(rows, MIN_ROWS)
+
+    def plan(
+        self, stage: str, frames: Sequence[pd.DataFrame], feature_types: Dict[str, str]
+    ) -> StagePlan:
+        """Whether ``stage`` fits the budget exactly, and how it runs otherwise."""
+        estimated_mb = self.estimate_mb(stage, frames, feature_types)
+        available_mb = self.available_mb(frames)
+        if estimated_mb <= available_mb:
+            return StagePlan(stage, "exact", estimated_mb, available_mb)
+        n_features = max(len(feature_types), 1)
+        if stage == "figures":
+            n_num = sum(kind == "num" for kind in feature_types.values())
+            rows = self._fitting_rows(
+                stage, available_mb, 2 * 8 * (FIGURE_COPIES + n_num)
+            )
+            return StagePlan(stage, "sample", estimated_mb, available_mb, rows)
+        limit = DEFAULT_CHUNK_ROWS if stage == "summary" else DEFAULT_PARTITION_ROWS
+        rows = self._fitting_rows(stage, available_mb, 8 * SKETCH_COPIES * n_features)
+        return StagePlan(stage, "sketch", estimated_mb, available_mb, min(rows, limit))
+
+
+def stratified_sample(
+    data: pd.DataFrame, n_rows: int, strata: Optional[str] = None, seed: int = 0
+) -> pd.DataFrame:
+    """About ``n_rows`` rows of ``data`` drawn without replacement, in their order.
+
+    With ``strata`` every value of that column, missing values included, keeps its
+    share of the rows, and at least one of them.
+    """
+    if len(data) <= n_rows:
+        return data
+    rng = np.random.default_rng(seed)
+    if strata is None:
+        return data.iloc[np.sort(rng.choice(len(data), n_rows, replace=False))]
+    codes = pd.factorize(data[strata])[0]
+    fraction = n_rows / len(data)
+    keep: List[npt.NDArray[Any]] = []
+    for code in np.unique(codes):
+        rows = np.flatnonzero(codes == code)
+        size = max(int(round(len(rows) * fraction)), 1)
+        keep.append(rng.choice(rows, size, replace=False))
+    return data.iloc[np.sort(np.concatenate(keep))]
+
+
+def sketch_correlator(
+    partition_rows: int,
+) -> Callable[[pd.DataFrame, List[str], List[str], str], pd.DataFrame]:
+    """A `calculate_correlations` of one dataset that reads the sketches of
+    ``partition_rows``-row partitions, see `PartitionedBackend.calculate_correlations`.
+
+    The dataset is reduced once, on the first call, whichever kinds of correlation
+    are asked for; every dataset needs a correlator of its own.
+    """
+    backend = PartitionedBackend(partition_rows=partition_rows)
+    # The dataset and its partitions, set by the first call.
+    prepared: List[Any] = []
+
+    def correlate(
+        data: pd.DataFrame, num_for_corr: List[str], cat_for_corr: List[str], kind: str
+    ) -> pd.DataFrame:
+        if not prepared:
+            prepared.extend([data, backend.prepare(data, num_for_corr + cat_for_corr)])
+        elif prepared[0] is not data:
+            raise ValueError("A sketch correlator reads a single dataset.")
+        return backend.calculate_correlations(
+            prepared[1], num_for_corr, cat_for_corr, kind
+        )
+
+    return correlate
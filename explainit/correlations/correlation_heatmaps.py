@@ -11,7 +11,6 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import json
 from typing import Dict
 
 import numpy as np
@@ -62,4 +61,4 @@ def plot_correlation_figure(
         )
         fig.append_trace(trace, 1, 2)
     fig.update_layout(coloraxis={"colorscale": "RdBu_r"})
-    return json.loads(fig.to_json())  # Correlation Graph Data
+    return fig.to_plotly_json()  # Correlation Graph Data
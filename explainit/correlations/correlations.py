@@ -11,13 +11,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from typing import Callable
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Tuple
 from typing import Union
 
 import numpy as np
+import numpy.typing as npt
 import pandas as pd
+from explainit.stattests.parallel import resolve_n_jobs
+from scipy import sparse
 from scipy.stats import chi2_contingency
 
 
@@ -49,15 +56,23 @@ def select_features_for_corr(
     return [num_for_corr, cat_for_corr]
 
 
-def cramer_v(x: pd.Series, y: pd.Series) -> Union[float, Any]:
-    """Calculate Cramér's V: a measure of association between two nominal variables.
+def cramer_v_codes(x: npt.NDArray[Any], y: npt.NDArray[Any]) -> Union[float, Any]:
+    """Calculate Cramér's V from two integer-coded nominal variables.
     Args:
-        x: The array of observed values.
-        y: The array of observed values.
+        x: codes of the observed values, -1 for missing.
+        y: codes of the observed values, -1 for missing.
     Returns:
         Value of the Cramér's V
     """
-    arr = pd.crosstab(x, y).values
+    x = np.asarray(x)
+    y = np.asarray(y)
+    both = (x >= 0) & (y >= 0)
+    x, y = x[both], y[both]
+    n_x = int(x.max(initial=-1)) + 1
+    n_y = int(y.max(initial=-1)) + 1
+    arr = np.bincount(x * n_y + y, minlength=n_x * n_y).reshape(n_x, n_y)
+    # Like a crosstab, keep only the categories observed in complete pairs.
+    arr = arr[arr.any(axis=1)][:, arr.any(axis=0)]
     chi2_stat = chi2_contingency(arr, correction=False)
     phi2 = chi2_stat[0] / arr.sum()
     n_rows, n_cols = arr.shape
@@ -68,6 +83,112 @@ def cramer_v(x: pd.Series, y: pd.Series) -> Union[float, Any]:
     )
 
 
+def cramer_v(x: pd.Series, y: pd.Series) -> Union[float, Any]:
+    """Calculate Cramér's V: a measure of association between two nominal variables.
+    Args:
+        x: The array of observed values.
+        y: The array of observed values.
+    Returns:
+        Value of the Cramér's V
+    """
+    return cramer_v_codes(pd.factorize(x)[0], pd.factorize(y)[0])
+
+
+def one_hot_columns(codes: pd.DataFrame) -> Tuple[sparse.csc_matrix, npt.NDArray[Any]]:
+    """Stack the one-hot encodings of all coded columns; missing rows stay empty.
+    Args:
+        codes: integer codes of every column, -1 for missing values.
+    Returns:
+        one_hot: rows by one-hot columns of every code of every column.
+        owner: index in ``codes`` of the column behind every one-hot column.
+    """
+    values = codes.to_numpy(dtype=np.int64)
+    widths = np.maximum(values.max(axis=0, initial=-1) + 1, 0)
+    offsets = np.concatenate([[0], np.cumsum(widths)])
+    rows, cols = np.nonzero(values >= 0)
+    one_hot = sparse.csc_matrix(
+        (
+            np.ones(len(rows)),
+            (rows, values[rows, cols] + offsets[cols]),
+        ),
+        shape=(values.shape[0], offsets[-1]),
+    )
+    owner = np.repeat(np.arange(values.shape[1]), widths)
+    return one_hot, owner
+
+
+def cramer_v_matrix(codes: pd.DataFrame, n_jobs: int = 1) -> pd.DataFrame:
+    """Cramér's V for every pair of integer-coded columns at once.
+
+    All pairwise contingency tables come from one sparse product of the stacked
+    one-hot encodings, ``X.T @ X``. The chi-square statistic of each table is then
+    ``N * (sum(O**2 / (row_total * col_total)) - 1)`` over its cells, using the
+    totals of rows observed in both columns, exactly as `cramer_v` computes it per
+    pair from a crosstab.
+    Args:
+        codes: one column of codes per feature, -1 for missing values.
+        n_jobs: threads sharing the product for very wide inputs, -1 for all cores.
+    Returns:
+        Correlation matrix.
+    """
+    K = codes.shape[1]
+    if K <= 1:
+        return pd.DataFrame()
+
+    one_hot, owner = one_hot_columns(codes)
+    n_workers = min(resolve_n_jobs(n_jobs), one_hot.shape[1])
+    one_hot_t = one_hot.T.tocsr()
+    if n_workers <= 1:
+        counts = one_hot_t @ one_hot
+    else:
+        blocks = np.array_split(np.arange(one_hot.shape[1]), n_workers)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            counts = sparse.hstack(
+                list(executor.map(lambda block: one_hot_t @ one_hot[:, block], blocks))
+            )
+    return cramer_v_from_counts(counts, owner, codes.columns)
+
+
+def cramer_v_from_counts(
+    counts: sparse.spmatrix, owner: npt.NDArray[Any], columns: Any
+) -> pd.DataFrame:
+    """Cramér's V matrix from the co-occurrence counts of the stacked categories.
+    Args:
+        counts: ``X.T @ X`` of the stacked one-hot encodings, one row and column per
+            category.
+        owner: position in ``columns`` of the column each category belongs to.
+        columns: feature names.
+    Returns:
+        Correlation matrix.
+    """
+    K = len(columns)
+    counts = sparse.csr_matrix(counts)
+    counts.eliminate_zeros()
+    counts = counts.tocoo()
+
+    # totals[a, j]: rows holding category a that are also observed in column j.
+    membership = sparse.csr_matrix(
+        (np.ones(len(owner)), (np.arange(len(owner)), owner)), shape=(len(owner), K)
+    )
+    totals = np.asarray((counts @ membership).todense())
+    cell_i, cell_j = owner[counts.row], owner[counts.col]
+    ratio = np.bincount(
+        cell_i * K + cell_j,
+        weights=counts.data**2
+        / (totals[counts.row, cell_j] * totals[counts.col, cell_i]),
+        minlength=K * K,
+    ).reshape(K, K)
+    observed = np.asarray((membership.T @ (totals > 0)).astype(np.int64))
+    dof = np.minimum(observed, observed.T) - 1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr_array = np.where(
+            dof > 0, np.sqrt(np.maximum(ratio - 1, 0) / np.maximum(dof, 1)), np.nan
+        )
+    np.fill_diagonal(corr_array, 1.0)
+    return pd.DataFrame(data=corr_array, columns=columns, index=columns)
+
+
 def corr_matrix(
     df: pd.Series, func: Callable[[pd.Series, pd.Series], float]
 ) -> pd.DataFrame:
@@ -95,7 +216,12 @@ def corr_matrix(
 
 
 def calculate_correlations(
-    df: pd.DataFrame, num_for_corr: List[str], cat_for_corr: List[str], kind: str
+    df: pd.DataFrame,
+    num_for_corr: List[str],
+    cat_for_corr: List[str],
+    kind: str,
+    cat_codes: Optional[Dict[str, npt.NDArray[Any]]] = None,
+    n_jobs: int = 1,
 ):
     """Calculate correlation matrix depending on the kind parameter
     Args:
@@ -107,11 +233,23 @@ def calculate_correlations(
             - kendall - Kendall Tau correlation coefficient
             - spearman - Spearman rank correlation
             - cramer_v - Cramer’s V measure of association
+        cat_codes: optional integer codes of the categorical features of ``df``,
+            e.g. from an `EncodingCache`, so they are not factorized again.
+        n_jobs: threads used by `cramer_v_matrix`, -1 for all cores.
     Returns:
         Correlation matrix.
     """
     if kind == "cramer_v":
-        return corr_matrix(df[cat_for_corr], cramer_v)
+        codes = pd.DataFrame(
+            {
+                feature: pd.factorize(df[feature])[0]
+                if cat_codes is None
+                else cat_codes[feature]
+                for feature in cat_for_corr
+            },
+            columns=cat_for_corr,
+        )
+        return cramer_v_matrix(codes, n_jobs)
     elif kind == "kendall":
         return df[num_for_corr].corr("kendall")
     elif kind == "pearson":
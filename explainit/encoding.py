@@ -0,0 +1,167 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+
+def _missing_mask(values: npt.NDArray[Any]) -> npt.NDArray[np.bool_]:
+    if values.dtype.kind == "f":
+        return np.asarray(~np.isfinite(values))
+    return np.asarray(pd.isnull(values))
+
+
+class CategoricalEncoding:
+    """A column factorized once into integer codes over reference and production values.
+
+    Both samples share one table of categories, so code ``i`` means the same value on
+    either side. Missing values, and infinite ones in float columns, get code -1 and
+    are left out of the counts. Tests, histograms and correlations read the cached
+    counts instead of hashing the raw values again.
+    """
+
+    def __init__(
+        self,
+        categories: npt.NDArray[Any],
+        ref_codes: npt.NDArray[Any],
+        prod_codes: Optional[npt.NDArray[Any]] = None,
+    ):
+        self.categories = categories
+        self.ref_codes = ref_codes
+        # Without production values the production sample is empty.
+        self.prod_codes = (
+            prod_codes if prod_codes is not None else np.empty(0, dtype=np.int64)
+        )
+        n_categories = len(categories)
+        self.ref_counts = np.bincount(ref_codes[ref_codes >= 0], minlength=n_categories)
+        self.prod_counts = np.bincount(
+            self.prod_codes[self.prod_codes >= 0], minlength=n_categories
+        )
+
+    @classmethod
+    def from_counts(
+        cls,
+        categories: npt.NDArray[Any],
+        ref_counts: npt.NDArray[Any],
+        prod_counts: npt.NDArray[Any],
+    ) -> "CategoricalEncoding":
+        """Encoding known only through its counts, e.g. merged from partitions."""
+        encoding = cls(categories, np.empty(0, dtype=np.int64))
+        encoding.ref_counts = np.asarray(ref_counts, dtype=np.int64)
+        encoding.prod_counts = np.asarray(prod_counts, dtype=np.int64)
+        return encoding
+
+    @classmethod
+    def from_series(
+        cls, reference: pd.Series, production: Optional[pd.Series] = None
+    ) -> "CategoricalEncoding":
+        """Factorize the reference and, when given, production values in one pass."""
+        ref_values = reference.to_numpy()
+        values = ref_values
+        if production is not None:
+            prod_values = production.to_numpy()
+            if ref_values.dtype != prod_values.dtype:
+                ref_values = ref_values.astype(object)
+                prod_values = prod_values.astype(object)
+            values = np.concatenate([ref_values, prod_values])
+        codes, categories = pd.factorize(values)
+        codes[_missing_mask(values)] = -1
+        if production is None:
+            return cls(np.asarray(categories), codes)
+        n_ref = len(reference)
+        return cls(np.asarray(categories), codes[:n_ref], codes[n_ref:])
+
+    @property
+    def present(self) -> npt.NDArray[Any]:
+        """Indices of the categories observed in either sample."""
+        return np.flatnonzero((self.ref_counts > 0) | (self.prod_counts > 0))
+
+    def _by_value(self, index: npt.NDArray[Any]) -> List[int]:
+        return sorted(index.tolist(), key=lambda i: self.categories[i])
+
+    def sorted_present(self) -> List[int]:
+        """Observed category indices ordered by category value."""
+        return self._by_value(self.present)
+
+    def hist_data(self, counts: npt.NDArray[Any]) -> List[List[Any]]:
+        """[counts, values] over the categories of either sample, sorted by value."""
+        order = self.sorted_present()
+        return [counts[order].tolist(), self.categories[order].tolist()]
+
+    def sorted_counts(self, counts: npt.NDArray[Any]) -> List[List[Any]]:
+        """[counts, values] over the categories seen in ``counts``, sorted by value."""
+        order = self._by_value(np.flatnonzero(counts))
+        return [counts[order].tolist(), self.categories[order].tolist()]
+
+    def value_counts(self, counts: npt.NDArray[Any]) -> List[List[Any]]:
+        """[counts, values] over the categories seen in ``counts``, most frequent first."""
+        seen = np.flatnonzero(counts)
+        order = seen[np.argsort(-counts[seen], kind="stable")]
+        return [counts[order].tolist(), self.categories[order].tolist()]
+
+
+class EncodingCache:
+    """Lazily built `CategoricalEncoding` per feature of a reference/production pair."""
+
+    def __init__(
+        self,
+        reference_data: pd.DataFrame,
+        production_data: Optional[pd.DataFrame] = None,
+    ):
+        self.reference_data = reference_data
+        self.production_data = production_data
+        self._encodings: Dict[str, CategoricalEncoding] = {}
+        # Report stages running side by side share the cache.
+        self._lock = threading.Lock()
+
+    def __getitem__(self, feature: str) -> CategoricalEncoding:
+        with self._lock:
+            if feature not in self._encodings:
+                self._encodings[feature] = CategoricalEncoding.from_series(
+                    self.reference_data[feature],
+                    self.production_data[feature]
+                    if self.production_data is not None
+                    else None,
+                )
+            return self._encodings[feature]
+
+    def built(self, features: List[str]) -> Dict[str, CategoricalEncoding]:
+        """Encodings of ``features`` built so far, known only through their counts,
+        so they stay small enough to hand to another process.
+        """
+        with self._lock:
+            return {
+                feature: CategoricalEncoding.from_counts(
+                    encoding.categories, encoding.ref_counts, encoding.prod_counts
+                )
+                for feature, encoding in self._encodings.items()
+                if feature in features
+            }
+
+    def update(self, encodings: Dict[str, CategoricalEncoding]) -> None:
+        """Add encodings built elsewhere, see `built`."""
+        with self._lock:
+            self._encodings.update(encodings)
+
+    def ref_codes(self, features: List[str]) -> Dict[str, npt.NDArray[Any]]:
+        return {feature: self[feature].ref_codes for feature in features}
+
+    def prod_codes(self, features: List[str]) -> Dict[str, npt.NDArray[Any]]:
+        return {feature: self[feature].prod_codes for feature in features}
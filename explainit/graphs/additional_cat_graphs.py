@@ -11,22 +11,23 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import Tuple
+
 import plotly.graph_objs as go
+from explainit.encoding import CategoricalEncoding
 from explainit.graphs.additional_num_graphs import fig_to_json
 from plotly.subplots import make_subplots
 
 
-def generate_additional_graph_cat_feature(name, reference_data, production_data):
+def generate_additional_graph_cat_feature(
+    name, encoding: CategoricalEncoding
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
 
     fig1 = go.Figure()
-    feature_ref_data = reference_data.dropna()
-    feature_prod_data = production_data.dropna()
-    reference_data_to_plot = list(
-        reversed(list(map(list, zip(*feature_ref_data.value_counts().items()))))
-    )
-    production_data_to_plot = list(
-        reversed(list(map(list, zip(*feature_prod_data.value_counts().items()))))
-    )
+    reference_data_to_plot = encoding.value_counts(encoding.ref_counts)
+    production_data_to_plot = encoding.value_counts(encoding.prod_counts)
     fig1.add_trace(
         go.Bar(
             x=reference_data_to_plot[1],
@@ -62,10 +63,8 @@ def generate_additional_graph_cat_feature(name, reference_data, production_data)
     )
 
     # Pie Chart Graph.
-    prod_labels = production_data.value_counts().sort_index().index.tolist()
-    prod_values = production_data.value_counts().sort_index().values.tolist()
-    ref_labels = reference_data.value_counts().sort_index().index.tolist()
-    ref_values = reference_data.value_counts().sort_index().values.tolist()
+    ref_values, ref_labels = encoding.sorted_counts(encoding.ref_counts)
+    prod_values, prod_labels = encoding.sorted_counts(encoding.prod_counts)
 
     fig2 = make_subplots(
         rows=1, cols=2, specs=[[{"type": "domain"}, {"type": "domain"}]]
@@ -79,12 +78,18 @@ def generate_additional_graph_cat_feature(name, reference_data, production_data)
     fig2.update_traces(hole=0.4, hoverinfo="label+percent+name")
 
     fig2.update_layout(
-        #     title_text="Grade ",
+        title={
+            "text": f"{name} Pie Chart".upper(),
+            "y": 0.9,
+            "x": 0.5,
+            "xanchor": "center",
+            "yanchor": "top",
+        },
         # Add annotations in the center of the donut pies.
         annotations=[
             dict(text="Reference", x=0.16, y=0.5, font_size=20, showarrow=False),
             dict(text="Production", x=0.825, y=0.5, font_size=20, showarrow=False),
-        ]
+        ],
     )
 
     # distr_graph, pie_graph
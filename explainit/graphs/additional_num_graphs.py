@@ -11,15 +11,27 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
+from explainit.binning import FeatureHistogram
+from explainit.binning import HIST_BINS
+from explainit.graphs.downsampling import DEFAULT_MAX_POINTS
+from explainit.graphs.downsampling import downsample_series
+from explainit.graphs.histograms import counts_bar
+from explainit.graphs.histograms import finite_values
+from explainit.graphs.histograms import nice_bin_edges
 
 DEFAULT_CONF_INTERVAL_SIZE = 1
 
 
-def fig_to_json(figure: go.Figure):
-    result = figure.to_plotly_json()
+def fig_to_json(figure: go.Figure) -> Dict[str, Any]:
+    result: Dict[str, Any] = figure.to_plotly_json()
     result["layout"].pop("template", None)
     return result
 
@@ -29,36 +41,47 @@ def generate_additional_graph_num_feature(
     reference_data: pd.Series,
     production_data: pd.Series,
     date_column: pd.Series = None,
-):
+    max_points: int = DEFAULT_MAX_POINTS,
+    histogram: Optional[FeatureHistogram] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     fig1 = go.Figure()
 
+    # The shared ``"distribution"`` histogram, binned here when not given.
+    if histogram is None:
+        reference_values = finite_values(reference_data)
+        production_values = finite_values(production_data)
+        edges = nice_bin_edges([reference_values, production_values], n_bins=HIST_BINS)
+        histogram = FeatureHistogram(
+            edges,
+            np.histogram(reference_values, edges)[0],
+            np.histogram(production_values, edges)[0],
+        )
     fig1.add_trace(
-        go.Histogram(
-            x=reference_data.tolist(),
+        counts_bar(
+            histogram.counts("reference"),
+            histogram.edges,
+            histnorm="probability",
             marker_color="#48DD2D",
             opacity=0.6,
-            xbins=None,
-            nbinsx=10,
             name="Reference",
-            histnorm="probability",
         )
     )
 
     fig1.add_trace(
-        go.Histogram(
-            x=production_data.tolist(),
+        counts_bar(
+            histogram.counts("production"),
+            histogram.edges,
+            histnorm="probability",
             marker_color="#ed0400",
             opacity=0.6,
-            xbins=None,
-            nbinsx=10,
             name="Production",
-            histnorm="probability",
         )
     )
     fig1.update_layout(
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
         xaxis_title=feature_name,
         yaxis_title="Share",
+        bargap=0,
     )
 
     fig1.update_layout(
@@ -73,16 +96,20 @@ def generate_additional_graph_num_feature(
 
     # Plot Drift
 
-    reference_mean = np.mean(reference_data[np.isfinite(reference_data)])
-    reference_std = np.std(reference_data[np.isfinite(reference_data)], ddof=1)
+    # Accumulated in float64 whatever the dtype of the column.
+    reference_values = finite_values(reference_data)
+    reference_mean = np.mean(reference_values)
+    reference_std = np.std(reference_values, ddof=1)
     x_title = "Timestamp" if date_column else "Index"
 
     fig2 = go.Figure()
 
+    x_values = date_column if date_column else production_data.index
+    rows = downsample_series(x_values, production_data, max_points)
     fig2.add_trace(
         go.Scattergl(
-            x=date_column.to_list() if date_column else production_data.index.tolist(),
-            y=production_data.tolist(),
+            x=pd.Series(x_values).iloc[rows].tolist(),
+            y=production_data.iloc[rows].tolist(),
             mode="markers",
             name="Production Data Points",
             marker=dict(size=6, color="#ed0400"),
@@ -92,7 +119,7 @@ def generate_additional_graph_num_feature(
     if date_column:
         x0 = date_column.sort_values()[1].tolist()
     else:
-        x0 = production_data.index.sort_values()[1].tolist()
+        x0 = production_data.index.sort_values()[1:2].tolist()[0]
 
     fig2.add_trace(
         go.Scattergl(
@@ -109,6 +136,13 @@ def generate_additional_graph_num_feature(
     )
 
     fig2.update_layout(
+        title={
+            "text": f"{feature_name} Drift".upper(),
+            "y": 0.9,
+            "x": 0.5,
+            "xanchor": "center",
+            "yanchor": "top",
+        },
         xaxis_title=x_title,
         yaxis_title=feature_name,
         showlegend=True,
@@ -0,0 +1,162 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+import plotly.graph_objs as go
+import plotly.io as pio
+from explainit.binning import bin_codes
+from explainit.binning import HistogramCache
+from explainit.encoding import EncodingCache
+from explainit.graphs.additional_num_graphs import fig_to_json
+from explainit.stattests.grouped_test import group_counts
+from plotly.subplots import make_subplots
+
+DATASETS = ("Reference", "Production")
+
+
+class TargetCounts:
+    """Rows of every (dataset, target class, feature bin) of one feature.
+
+    Attributes:
+        counts: array of shape (2, n_classes, n_bins), reference first.
+        classes: label of every target class.
+        bins: label of every category, or centre of every numerical bin.
+        edges: bin edges of a numerical feature, None for a categorical one.
+    """
+
+    def __init__(
+        self,
+        counts: npt.NDArray[Any],
+        classes: List[str],
+        bins: List[Any],
+        edges: Optional[npt.NDArray[Any]] = None,
+    ):
+        self.counts = counts
+        self.classes = classes
+        self.bins = bins
+        self.edges = edges
+
+
+def target_behaviour_counts(
+    feature_types: Dict[str, str],
+    target_col_name: str,
+    encodings: EncodingCache,
+    histograms: HistogramCache,
+) -> Dict[str, TargetCounts]:
+    """Count every feature per dataset, target class and feature bin in one pass.
+
+    Target classes and categories come from the shared encodings, and numerical
+    features are binned on their ``"summary"`` edges, so each feature costs one
+    `np.bincount` per dataset and no copy of either frame is made.
+    Args:
+        feature_types: mapping of feature name to ``"num"`` or ``"cat"``.
+        target_col_name: the categorical target.
+        encodings: shared categorical encodings of both datasets.
+        histograms: shared numerical histograms of both datasets.
+    Returns:
+        counts: `TargetCounts` per feature.
+    """
+    target = encodings[target_col_name]
+    order = target.sorted_present()
+    classes = [str(category) for category in target.categories[order]]
+    # Target codes renumbered to the sorted classes; -1 stays missing.
+    class_of = np.full(len(target.categories) + 1, -1)
+    class_of[order] = np.arange(len(order))
+    target_codes = (class_of[target.ref_codes], class_of[target.prod_codes])
+    # Without production data the production sample is empty, as in the encodings.
+    frames = (
+        histograms.reference_data,
+        histograms.production_data
+        if histograms.production_data is not None
+        else histograms.reference_data.iloc[:0],
+    )
+
+    counts = {}
+    for feature, feature_type in feature_types.items():
+        edges: Optional[npt.NDArray[Any]] = None
+        if feature_type == "num":
+            bin_edges = histograms.histogram(feature, "summary").edges
+            codes = tuple(
+                bin_codes(
+                    data[feature].to_numpy(dtype=np.float64, na_value=np.nan),
+                    bin_edges,
+                )
+                for data in frames
+            )
+            bins = ((bin_edges[:-1] + bin_edges[1:]) / 2).tolist()
+            edges = bin_edges
+            n_bins = len(bins)
+        else:
+            encoding = encodings[feature]
+            codes = (encoding.ref_codes, encoding.prod_codes)
+            n_bins = len(encoding.categories)
+        feature_counts = np.stack(
+            [
+                group_counts(target_codes[side], codes[side], len(classes), n_bins)
+                for side in range(2)
+            ]
+        )
+        if feature_type != "num":
+            present = encoding.sorted_present()
+            feature_counts = feature_counts[:, :, present]
+            bins = [str(category) for category in encoding.categories[present]]
+        counts[feature] = TargetCounts(feature_counts, classes, bins, edges)
+    return counts
+
+
+def categorical_target_behaviour_on_features(
+    feature_name: str, target_col_name: str, target_counts: TargetCounts
+) -> Dict[str, Any]:
+    """Histogram of a feature per target class, side by side for both datasets.
+
+    Bars are drawn from `target_behaviour_counts`, one trace per dataset and class.
+    """
+    fig = make_subplots(
+        rows=1,
+        cols=2,
+        shared_yaxes=True,
+        subplot_titles=[f"dataset={dataset}" for dataset in DATASETS],
+    )
+    width = None if target_counts.edges is None else np.diff(target_counts.edges)
+    # The colours plotly express gives the classes.
+    colors = pio.templates["plotly"].layout.colorway
+    for side in range(2):
+        for i, label in enumerate(target_counts.classes):
+            fig.add_trace(
+                go.Bar(
+                    x=target_counts.bins,
+                    y=target_counts.counts[side, i],
+                    width=width,
+                    name=label,
+                    legendgroup=label,
+                    showlegend=side == 0,
+                    marker_color=colors[i % len(colors)],
+                    opacity=0.5,
+                ),
+                row=1,
+                col=side + 1,
+            )
+    fig.update_layout(
+        barmode="overlay",
+        bargap=0,
+        legend_title_text=target_col_name,
+        yaxis_title="count",
+    )
+    fig.update_xaxes(title_text=feature_name)
+    return dict(fig_to_json(fig))
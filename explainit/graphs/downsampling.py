@@ -0,0 +1,184 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import List
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import plotly.graph_objs as go
+
+# Most points a single scatter trace sends to the browser.
+DEFAULT_MAX_POINTS = 5000
+DENSITY_BINS = 100
+# Values further than this many IQRs beyond the quartiles count as outliers.
+OUTLIER_IQR_FACTOR = 3.0
+
+
+def _as_numeric(values: Any) -> npt.NDArray[Any]:
+    """Float view of numbers or datetimes; positions for anything else."""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return np.asarray(
+            values.to_numpy(dtype="datetime64[ns]").astype(np.int64), dtype=float
+        )
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return np.asarray(values.to_numpy(dtype=np.float64, na_value=np.nan))
+    return np.arange(len(values), dtype=np.float64)
+
+
+def lttb_indices(
+    x: npt.NDArray[Any], y: npt.NDArray[Any], n_out: int
+) -> npt.NDArray[Any]:
+    """Largest-Triangle-Three-Buckets (Steinarsson, 2013) on points sorted by x.
+
+    The first and last points are kept. Every bucket in between keeps the point
+    forming the largest triangle with the point kept before it and the mean of the
+    next bucket, which preserves peaks and troughs far better than striding.
+    Args:
+        x: ascending x values.
+        y: y values.
+        n_out: number of points to keep.
+    Returns:
+        indices: positions of the kept points, ascending.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    edges = np.floor(np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges = np.append(edges, n)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop, next_stop = edges[i], edges[i + 1], edges[i + 2]
+        mean_x = x[stop:next_stop].mean()
+        mean_y = y[stop:next_stop].mean()
+        area = np.abs(
+            (x[a] - mean_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (mean_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def outlier_indices(values: npt.NDArray[Any], max_count: int) -> npt.NDArray[Any]:
+    """Positions of the values beyond the outer Tukey fences, most extreme first.
+    Args:
+        values: finite values.
+        max_count: most outliers to return.
+    Returns:
+        indices: positions of at most ``max_count`` outliers.
+    """
+    if len(values) == 0 or max_count <= 0:
+        return np.empty(0, dtype=np.int64)
+    q1, q3 = np.percentile(values, [25, 75])
+    spread = OUTLIER_IQR_FACTOR * (q3 - q1)
+    excess = np.maximum(q1 - spread - values, values - q3 - spread)
+    outliers = np.flatnonzero(excess > 0)
+    if len(outliers) > max_count:
+        outliers = outliers[np.argsort(-excess[outliers], kind="stable")[:max_count]]
+    return outliers
+
+
+def downsample_series(
+    x: Any, y: Any, max_points: int = DEFAULT_MAX_POINTS
+) -> npt.NDArray[Any]:
+    """Rows of a series plot worth drawing within a point budget.
+
+    Points are ordered by x and reduced with `lttb_indices`; outliers of y are
+    added back on top so that they stay visible. Rows with a non-finite y are
+    never drawn.
+    Args:
+        x: index, timestamps or other x values.
+        y: numerical values.
+        max_points: point budget.
+    Returns:
+        indices: positions into ``x`` and ``y`` of the rows to draw.
+    """
+    x_values = _as_numeric(x)
+    y_values = _as_numeric(y)
+    finite = np.flatnonzero(np.isfinite(y_values))
+    if len(finite) <= max_points:
+        return finite
+    order = finite[np.argsort(x_values[finite], kind="stable")]
+    if not np.isfinite(x_values[order]).all():
+        order = finite
+    outliers = order[outlier_indices(y_values[order], max_points // 10)]
+    kept = order[
+        lttb_indices(x_values[order], y_values[order], max_points - len(outliers))
+    ]
+    return np.union1d(kept, outliers)
+
+
+def scatter_traces(
+    x: pd.Series,
+    y: pd.Series,
+    max_points: int = DEFAULT_MAX_POINTS,
+    **scatter_kwargs: Any,
+) -> List[Any]:
+    """Traces for an x-versus-y scatter that stays light in the browser.
+
+    Up to ``max_points`` rows are drawn as a WebGL scatter. Larger numerical data is
+    drawn as a 2-D density heatmap with the outliers of either axis kept as markers
+    on top; non-numerical data falls back to a fixed random sample.
+    Args:
+        x: x values.
+        y: y values.
+        max_points: point budget.
+        scatter_kwargs: styling passed on to ``go.Scattergl``.
+    Returns:
+        traces: the traces to add to the figure.
+    """
+    if len(x) <= max_points:
+        return [go.Scattergl(x=x.tolist(), y=y.tolist(), **scatter_kwargs)]
+
+    numeric = all(
+        pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+        for values in (x, y)
+    )
+    if not numeric:
+        rows = np.sort(
+            np.random.default_rng(0).choice(len(x), max_points, replace=False)
+        )
+        return [
+            go.Scattergl(
+                x=x.iloc[rows].tolist(), y=y.iloc[rows].tolist(), **scatter_kwargs
+            )
+        ]
+
+    x_values = _as_numeric(x)
+    y_values = _as_numeric(y)
+    finite = np.isfinite(x_values) & np.isfinite(y_values)
+    x_values, y_values = x_values[finite], y_values[finite]
+    counts, x_edges, y_edges = np.histogram2d(x_values, y_values, bins=DENSITY_BINS)
+    heatmap = go.Heatmap(
+        x=((x_edges[:-1] + x_edges[1:]) / 2).tolist(),
+        y=((y_edges[:-1] + y_edges[1:]) / 2).tolist(),
+        z=np.where(counts.T > 0, counts.T, np.nan).tolist(),
+        colorscale="Reds",
+        showscale=False,
+        name=scatter_kwargs.get("name"),
+        hovertemplate="x: %{x}<br>y: %{y}<br>rows: %{z}<extra></extra>",
+    )
+    outliers = np.union1d(
+        outlier_indices(x_values, max_points // 2),
+        outlier_indices(y_values, max_points // 2),
+    )
+    markers = go.Scattergl(
+        x=x_values[outliers].tolist(), y=y_values[outliers].tolist(), **scatter_kwargs
+    )
+    return [heatmap, markers]
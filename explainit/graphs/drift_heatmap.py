@@ -0,0 +1,53 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+from explainit.graphs.additional_num_graphs import fig_to_json
+
+
+def plot_window_drift(scores: pd.DataFrame, drift: pd.DataFrame) -> Dict[str, Any]:
+    """Heatmap of drift per feature and time window.
+
+    Cells are coloured by whether the window drifted and show the drift score.
+    Args:
+        scores: drift score per feature (rows) and window (columns).
+        drift: whether each score signals drift.
+    Returns:
+        figure: the heatmap as a plotly figure dictionary.
+    """
+    fig = go.Figure(
+        go.Heatmap(
+            z=np.where(scores.isnull(), np.nan, drift.astype(float)),
+            x=scores.columns.tolist(),
+            y=scores.index.tolist(),
+            customdata=scores.round(4).astype(str),
+            hovertemplate="%{y}<br>%{x}<br>drift score=%{customdata}<extra></extra>",
+            colorscale=[[0.0, "#48DD2D"], [1.0, "#ed0400"]],
+            zmin=0,
+            zmax=1,
+            showscale=False,
+            xgap=1,
+            ygap=1,
+        )
+    )
+    fig.update_layout(
+        xaxis_title="Production window",
+        yaxis=dict(autorange="reversed"),
+        height=max(300, 30 * len(scores.index)),
+    )
+    return dict(fig_to_json(fig))
@@ -11,12 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import json
+from typing import Any
+from typing import Dict
 from typing import Optional
 
-import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
+from explainit.binning import HistogramCache
+from explainit.graphs.histograms import category_bar
+from explainit.graphs.histograms import counts_bar
 
 
 def choose_agg_period(
@@ -57,16 +60,23 @@ def plot_feature_stats(
     production_data: pd.DataFrame,
     feature_name: str,
     feature_type: str,
-):
+    histograms: Optional[HistogramCache] = None,
+) -> Dict[str, Any]:
     if feature_type == "num":
+        # Shared edges on linear and on log10 scale, see `HistogramCache`.
+        if histograms is None:
+            histograms = HistogramCache(reference_data, production_data)
+        linear = histograms.histogram(feature_name, "summary")
+        log = histograms.histogram(feature_name, "summary_log")
         if production_data is None:
-            trace1 = go.Histogram(
-                x=reference_data[feature_name], marker_color="#48DD2D"
+            trace1 = counts_bar(
+                linear.counts("reference"),
+                linear.edges,
+                marker_color="#48DD2D",
             )
-            trace2 = go.Histogram(
-                x=np.log10(
-                    reference_data.loc[reference_data[feature_name] > 0, feature_name]
-                ),
+            trace2 = counts_bar(
+                log.counts("reference"),
+                log.edges,
                 marker_color="#48DD2D",
                 visible=False,
             )
@@ -95,28 +105,28 @@ def plot_feature_stats(
             ]
 
         else:
-            trace1 = go.Histogram(
-                x=reference_data[feature_name],
+            trace1 = counts_bar(
+                linear.counts("reference"),
+                linear.edges,
                 marker_color="#48DD2D",
                 name="reference",
             )
-            trace2 = go.Histogram(
-                x=np.log10(
-                    reference_data.loc[reference_data[feature_name] > 0, feature_name]
-                ),
+            trace2 = counts_bar(
+                log.counts("reference"),
+                log.edges,
                 marker_color="#48DD2D",
                 visible=False,
                 name="reference",
             )
-            trace3 = go.Histogram(
-                x=production_data[feature_name],
+            trace3 = counts_bar(
+                linear.counts("production"),
+                linear.edges,
                 marker_color="#ed0400",
                 name="production",
             )
-            trace4 = go.Histogram(
-                x=np.log10(
-                    production_data.loc[production_data[feature_name] > 0, feature_name]
-                ),
+            trace4 = counts_bar(
+                log.counts("production"),
+                log.edges,
                 marker_color="#ed0400",
                 visible=False,
                 name="production",
@@ -145,7 +155,7 @@ def plot_feature_stats(
                     ),
                 )
             ]
-        layout = dict(updatemenus=updatemenus)
+        layout = dict(updatemenus=updatemenus, bargap=0)
 
         fig = go.Figure(data=data, layout=layout)
 
@@ -157,24 +167,25 @@ def plot_feature_stats(
             cats = cats + ["other"]
         if production_data is None:
             fig.add_trace(
-                go.Histogram(x=reference_data[feature_name], marker_color="#ed0400")
+                category_bar(reference_data[feature_name], marker_color="#ed0400")
             )
         else:
             fig.add_trace(
-                go.Histogram(
-                    x=reference_data[feature_name],
+                category_bar(
+                    reference_data[feature_name],
                     marker_color="#48DD2D",
                     name="reference",
                 )
             )
             fig.add_trace(
-                go.Histogram(
-                    x=production_data[feature_name],
+                category_bar(
+                    production_data[feature_name],
                     marker_color="#ed0400",
                     name="production",
                 )
             )
         fig.update_xaxes(categoryorder="array", categoryarray=cats)
+        fig.update_layout(bargap=0)
 
     elif feature_type == "datetime":
         freq = choose_agg_period(feature_name, reference_data, production_data)
@@ -254,4 +265,5 @@ def plot_feature_stats(
     fig.update_layout(
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
-    return json.loads(fig.to_json())
+    figure: Dict[str, Any] = fig.to_plotly_json()
+    return figure
@@ -0,0 +1,122 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from explainit.graphs.payloads import encode_figure
+
+DEFAULT_MAX_FIGURES = 128
+DEFAULT_MAX_FIGURE_MB = 256.0
+
+
+def serialize_figure(figure: Any) -> bytes:
+    """The figure as the JSON bytes a browser is sent, see `encode_figure`."""
+    return encode_figure(figure)
+
+
+def figure_nbytes(figure: Any) -> int:
+    """Size of a figure once serialized, used as its memory footprint."""
+    return len(serialize_figure(figure))
+
+
+class FigureCache:
+    """Figures built on first request and kept in a bounded LRU cache.
+
+    Each figure kind has a builder taking the feature (or other key) to plot. A
+    cached figure is returned as is, so callers that edit it must copy it first.
+    Every cached figure keeps the JSON it was sized by, so `get_json` serves it
+    without encoding it again. Once either limit is exceeded the least recently
+    used figures are dropped and rebuilt if asked for again; a figure larger than
+    the whole budget is served without being cached.
+    """
+
+    def __init__(
+        self,
+        builders: Dict[str, Callable[[str], Any]],
+        max_figures: int = DEFAULT_MAX_FIGURES,
+        max_mb: float = DEFAULT_MAX_FIGURE_MB,
+        serialized: Optional[Dict[str, Callable[[str], bytes]]] = None,
+    ):
+        """Start empty; figures are built on request.
+        Args:
+            builders: figure builder of every kind.
+            max_figures: most figures kept.
+            max_mb: memory budget of the kept figures, by serialized size.
+            serialized: builders returning the JSON of a kind's figures directly,
+                e.g. read from a bundle; `get_json` prefers them to encoding.
+        """
+        if max_figures < 0 or max_mb < 0:
+            raise ValueError("Figure cache limits must not be negative")
+        self.builders = builders
+        self.serialized = serialized or {}
+        self.max_figures = max_figures
+        self.max_bytes = int(max_mb * 2**20)
+        self.nbytes = 0
+        self._figures: "OrderedDict[Tuple[str, str], Tuple[Any, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._figures)
+
+    def __contains__(self, cache_key: Tuple[str, str]) -> bool:
+        return cache_key in self._figures
+
+    def _cached(self, cache_key: Tuple[str, str]) -> Optional[Tuple[Any, bytes]]:
+        with self._lock:
+            if cache_key in self._figures:
+                self._figures.move_to_end(cache_key)
+                return self._figures[cache_key]
+        return None
+
+    def get(self, kind: str, key: str) -> Any:
+        """Return the ``kind`` figure for ``key``, building it if it is not cached."""
+        cached = self._cached((kind, key))
+        if cached is not None:
+            return cached[0]
+        # Build outside the lock so a slow figure does not hold up cached ones.
+        figure = self.builders[kind](key)
+        self._store((kind, key), figure, serialize_figure(figure))
+        return figure
+
+    def get_json(self, kind: str, key: str) -> bytes:
+        """The ``kind`` figure for ``key`` as JSON, encoded once and then reused."""
+        cached = self._cached((kind, key))
+        if cached is not None:
+            return cached[1]
+        if kind in self.serialized:
+            return self.serialized[kind](key)
+        figure = self.builders[kind](key)
+        blob = serialize_figure(figure)
+        self._store((kind, key), figure, blob)
+        return blob
+
+    def _store(self, cache_key: Tuple[str, str], figure: Any, blob: bytes):
+        if self.max_figures == 0:
+            return
+        size = len(blob)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if cache_key in self._figures:
+                return
+            self._figures[cache_key] = (figure, blob)
+            self.nbytes += size
+            while len(self._figures) > self.max_figures or self.nbytes > self.max_bytes:
+                _, (_, dropped) = self._figures.popitem(last=False)
+                self.nbytes -= len(dropped)
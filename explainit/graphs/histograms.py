@@ -0,0 +1,99 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import plotly.graph_objs as go
+
+# Bin widths are rounded up to one of these multiples of a power of ten.
+NICE_STEPS = (1.0, 2.0, 2.5, 5.0, 10.0)
+
+
+def finite_values(values: Any) -> npt.NDArray[Any]:
+    """Finite floats of a series or array; missing and infinite values are dropped."""
+    floats = pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(floats[np.isfinite(floats)])
+
+
+def _nice_size(raw_size: float) -> float:
+    magnitude = 10 ** float(np.floor(np.log10(raw_size)))
+    for step in NICE_STEPS:
+        if step * magnitude >= raw_size * (1 - 1e-9):
+            return step * magnitude
+    return 10 * magnitude
+
+
+def nice_bin_edges(
+    samples: Sequence[npt.NDArray[Any]], n_bins: Optional[int] = None
+) -> npt.NDArray[Any]:
+    """Shared bin edges for several samples, chosen the way plotly auto-bins.
+
+    The width is the data range over ``n_bins`` (Sturges' rule on the pooled size
+    when omitted) rounded up to 1, 2, 2.5 or 5 times a power of ten, and edges sit
+    on multiples of that width.
+    Args:
+        samples: finite values of every trace drawn on the same axis.
+        n_bins: approximate number of bins.
+    Returns:
+        edges: ascending bin edges.
+    """
+    pooled = np.concatenate([np.asarray(sample) for sample in samples])
+    if pooled.size == 0:
+        return np.array([0.0, 1.0])
+    low, high = pooled.min(), pooled.max()
+    if low == high:
+        return np.array([low - 0.5, high + 0.5])
+    if n_bins is None:
+        n_bins = int(np.ceil(np.log2(pooled.size))) + 1
+    size = _nice_size((high - low) / n_bins)
+    start = np.floor(low / size) * size
+    count = max(int(np.floor((high - start) / size)) + 1, 1)
+    return np.asarray(start + size * np.arange(count + 1))
+
+
+def counts_bar(
+    counts: npt.NDArray[Any],
+    edges: npt.NDArray[Any],
+    histnorm: Optional[str] = None,
+    **bar_kwargs: Any,
+) -> go.Bar:
+    """A bar trace drawing the histogram counts taken over ``edges``.
+    Args:
+        counts: count of every bin.
+        edges: bin edges, e.g. from `nice_bin_edges`.
+        histnorm: ``None`` for counts or ``"probability"`` for shares of the sample.
+        bar_kwargs: styling passed on to ``go.Bar``.
+    Returns:
+        The bar trace, one bar per bin.
+    """
+    total = max(int(counts.sum()), 1)
+    heights = counts / total if histnorm == "probability" else counts
+    return go.Bar(
+        x=((edges[:-1] + edges[1:]) / 2).tolist(),
+        y=heights.tolist(),
+        hovertext=[f"{low:g} - {high:g}" for low, high in zip(edges[:-1], edges[1:])],
+        **bar_kwargs,
+    )
+
+
+def category_bar(values: pd.Series, **bar_kwargs: Any) -> go.Bar:
+    """A bar trace with the count of every category, missing values left out."""
+    counts = values.value_counts()
+    return go.Bar(
+        x=counts.index.astype(str).tolist(), y=counts.values.tolist(), **bar_kwargs
+    )
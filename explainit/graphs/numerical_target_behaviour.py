@@ -11,10 +11,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import json
+from typing import Any
+from typing import Dict
 
 import pandas as pd
-import plotly.graph_objs as go
+from explainit.graphs.downsampling import DEFAULT_MAX_POINTS
+from explainit.graphs.downsampling import scatter_traces
 from plotly.subplots import make_subplots
 
 
@@ -23,32 +25,26 @@ def numerical_target_behaviour_on_features(
     production_feature_data: pd.Series,
     reference_target_data: pd.Series,
     production_target_data: pd.Series,
-):
+    max_points: int = DEFAULT_MAX_POINTS,
+) -> Dict[str, Any]:
     fig = make_subplots(rows=1, cols=2, subplot_titles=("Reference", "Production"))
 
-    fig.add_trace(
-        go.Scattergl(
-            x=reference_feature_data.tolist(),
-            y=reference_target_data.tolist(),
+    for col, (feature_data, target_data, name) in enumerate(
+        [
+            (reference_feature_data, reference_target_data, "Target (ref)"),
+            (production_feature_data, production_target_data, "Target (prod)"),
+        ],
+        start=1,
+    ):
+        for trace in scatter_traces(
+            feature_data,
+            target_data,
+            max_points,
             mode="markers",
-            name="Target (ref)",
+            name=name,
             marker=dict(size=6, color="#ed0400"),
-        ),
-        row=1,
-        col=1,
-    )
-
-    fig.add_trace(
-        go.Scatter(
-            x=production_feature_data.tolist(),
-            y=production_target_data.tolist(),
-            mode="markers",
-            name="Target (prod)",
-            marker=dict(size=6, color="#ed0400"),
-        ),
-        row=1,
-        col=2,
-    )
+        ):
+            fig.add_trace(trace, row=1, col=col)
 
     # Update xaxis properties
     fig.update_xaxes(
@@ -61,4 +57,5 @@ def numerical_target_behaviour_on_features(
     # Update yaxis properties
     fig.update_yaxes(title_text="Value", showgrid=True, row=1, col=1)
     fig.update_yaxes(title_text="Value", showgrid=True, row=1, col=2)
-    return json.loads(fig.to_json())
+    figure: Dict[str, Any] = fig.to_plotly_json()
+    return figure
@@ -0,0 +1,115 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import base64
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+import numpy as np
+import orjson
+from plotly.utils import PlotlyJSONEncoder
+
+# Shorter numeric arrays stay plain JSON lists.
+TYPED_ARRAY_MIN = 16
+INT32_RANGE = (np.iinfo(np.int32).min, np.iinfo(np.int32).max)
+
+_plotly_encoder = PlotlyJSONEncoder()
+
+
+def typed_array(values: Any) -> Optional[Dict[str, str]]:
+    """``{"dtype", "bdata"}`` base64 encoding of a 1-D numeric array, as plotly.js
+    reads typed arrays, or None for anything else.
+
+    Integers fitting in 32 bits are sent as ``i4`` and other numbers as ``f8``, the
+    widest types JavaScript typed arrays hold exactly.
+    """
+    if isinstance(values, (list, tuple)):
+        if len(values) < TYPED_ARRAY_MIN or type(values[0]) not in (int, float):
+            return None
+        values = np.asarray(values)
+    if not isinstance(values, np.ndarray) or values.ndim != 1:
+        return None
+    if len(values) < TYPED_ARRAY_MIN or values.dtype.kind not in "iuf":
+        return None
+    if values.dtype.kind in "iu":
+        low, high = INT32_RANGE
+        if len(values) and (values.min() < low or values.max() > high):
+            return None
+        values, dtype = values.astype("<i4"), "i4"
+    else:
+        values, dtype = values.astype("<f8", copy=False), "f8"
+    return {"dtype": dtype, "bdata": base64.b64encode(values.tobytes()).decode()}
+
+
+def _pack(value: Any) -> Any:
+    packed = typed_array(value)
+    if packed is not None:
+        return packed
+    if isinstance(value, dict):
+        return {key: _pack(item) for key, item in value.items()}
+    # Only lists of containers are walked; lists of scalars are written as is.
+    if (
+        isinstance(value, (list, tuple))
+        and value
+        and isinstance(value[0], (dict, list))
+    ):
+        return [_pack(item) for item in value]
+    return value
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, dict):
+        if set(value) == {"dtype", "bdata"}:
+            return np.frombuffer(base64.b64decode(value["bdata"]), dtype=value["dtype"])
+        return {key: _unpack(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    return value
+
+
+def _default(value: Any) -> Any:
+    return _plotly_encoder.default(value)
+
+
+def encode_figure(payload: Any) -> bytes:
+    """Compact JSON of a figure, or of a list of figures, for the browser.
+
+    The numeric arrays of the traces are base64 typed arrays, see `typed_array`;
+    layouts are left as they are. The result is written with orjson in one pass.
+    """
+    if isinstance(payload, (list, tuple)):
+        return b"[" + b",".join(encode_figure(figure) for figure in payload) + b"]"
+    if isinstance(payload, dict) and "data" in payload:
+        payload = {**payload, "data": [_pack(trace) for trace in payload["data"]]}
+    return orjson.dumps(
+        payload,
+        default=_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def decode_figure(blob: bytes) -> Any:
+    """The figure of `encode_figure`, its typed arrays read back as numpy arrays."""
+    return _unpack(orjson.loads(blob))
+
+
+def recolor(value: Any, colors: Dict[str, str]) -> Any:
+    """A copy of a figure with every colour string in ``colors`` replaced."""
+    if isinstance(value, str):
+        return colors.get(value, value)
+    if isinstance(value, dict):
+        return {key: recolor(item, colors) for key, item in value.items()}
+    if isinstance(value, list):
+        return [recolor(item, colors) for item in value]
+    return value
@@ -0,0 +1,319 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+from explainit.analyzer.data_summary import data_summary_from_profiles
+from explainit.analyzer.feature_summary import feature_summary_from_profile
+from explainit.analyzer.reference_profile import CORRELATION_KINDS
+from explainit.analyzer.reference_profile import ReferenceProfile
+from explainit.backends.aggregates import aggregate_encoding
+from explainit.backends.aggregates import ColumnAggregate
+from explainit.backends.aggregates import DEFAULT_SAMPLE_ROWS
+from explainit.backends.aggregates import FrameAggregate
+from explainit.backends.aggregates import hist_edges
+from explainit.backends.partitioned import aggregate_stat_test
+from explainit.backends.partitioned import JS_MAX_DISTINCT
+from explainit.backends.partitioned import select_aggregate_stattest
+from explainit.binning import hist_data
+from explainit.sources import DataSource
+from explainit.sources import read_source
+from explainit.stattests.sketches import DEFAULT_K
+
+
+class AlignedHistogram:
+    """Counts of values on fixed equal-width bins, extended as values arrive.
+
+    The bins are those of ``edges`` and, beyond them, more bins of the same width,
+    so counts taken at different times always line up. Like `np.histogram`, the
+    last of the given bins is closed on the right.
+    """
+
+    def __init__(self, edges: npt.NDArray[Any]):
+        self.origin = float(edges[0])
+        self.width = float(edges[1] - edges[0])
+        self.last = float(edges[-1])
+        self.n_bins = len(edges) - 1
+        self.counts = pd.Series(dtype=np.int64)
+
+    def update(self, values: npt.NDArray[Any]) -> "AlignedHistogram":
+        """Count finite ``values``."""
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return self
+        index = np.floor((values - self.origin) / self.width).astype(np.int64)
+        index[(index >= self.n_bins) & (values <= self.last)] = self.n_bins - 1
+        self.counts = self.counts.add(
+            pd.Series(index).value_counts(), fill_value=0
+        ).astype(np.int64)
+        return self
+
+    def bins(self, other: Optional["AlignedHistogram"] = None) -> range:
+        """Indices of the bins holding values here or in ``other``."""
+        index = self.counts.index
+        if other is not None:
+            index = index.union(other.counts.index)
+        if not len(index):
+            return range(0, self.n_bins)
+        return range(int(index.min()), int(index.max()) + 1)
+
+    def counts_over(self, bins: range) -> npt.NDArray[Any]:
+        return np.asarray(self.counts.reindex(bins, fill_value=0).to_numpy())
+
+    def edges(self, bins: range) -> npt.NDArray[Any]:
+        return self.origin + self.width * np.arange(bins.start, bins.stop + 1)
+
+
+class ProductionMonitor:
+    """Running aggregates of production data, checked against a fixed reference.
+
+    Every `update` folds a batch of production rows into a `FrameAggregate`
+    (counts, moments, quantile sketches, co-moment and co-occurrence matrices
+    and a row sample) and into histograms on bins aligned with the reference's,
+    in time proportional to the batch. Drift results, summaries and correlations
+    are then read from the aggregates at any moment, without rescanning earlier
+    batches. As with `PartitionedBackend`, Kolmogorov-Smirnov, Wasserstein and
+    percentiles come from sketches, and Spearman and Kendall from a uniform
+    sample of ``sample_rows`` rows. Production histograms, and binned
+    Jensen-Shannon, use bins of the reference's width rather than ones fitted to
+    the production values.
+    """
+
+    def __init__(
+        self,
+        reference_data: Union[DataSource, ReferenceProfile],
+        target_col_name: str,
+        datetime_col_name: Optional[str] = "",
+        k: int = DEFAULT_K,
+        sample_rows: int = DEFAULT_SAMPLE_ROWS,
+        seed: int = 0,
+    ):
+        """Profile the reference side once.
+        Args:
+            reference_data: reference dataset or its `ReferenceProfile`.
+            target_col_name: target column name.
+            datetime_col_name: optional datetime column, excluded from the features.
+            k: size of the quantile sketches, see `KLLSketch`.
+            sample_rows: production rows kept for Spearman and Kendall.
+            seed: seed of the sketches and of the row sample.
+        """
+        if isinstance(reference_data, ReferenceProfile):
+            if reference_data.target_col_name != target_col_name:
+                raise ValueError(
+                    f"Given target column name {Style.BRIGHT + Fore.RED}{target_col_name}{Style.RESET_ALL} does not match the reference profile."
+                )
+            profile = reference_data
+        else:
+            profile = ReferenceProfile.from_frame(
+                read_source(
+                    reference_data,
+                    exclude=[datetime_col_name] if datetime_col_name else [],
+                ),
+                target_col_name,
+                datetime_col_name,
+            )
+        self.profile = profile
+        self.k = k
+        self.sample_rows = sample_rows
+        self.seed = seed
+        self.batches = 0
+        self.feature_types = {
+            feature: profile.feature_type(feature) for feature in profile.feature_names
+        }
+
+        self._reference = {
+            feature: ColumnAggregate.from_series(
+                profile.reference_data[feature], feature_type, k, seed
+            )
+            for feature, feature_type in self.feature_types.items()
+        }
+        self._production: Optional[FrameAggregate] = None
+
+        # Reference histograms and the aligned production ones.
+        self._ref_hist: Dict[str, List[List[float]]] = {}
+        self._histograms: Dict[str, Dict[str, AlignedHistogram]] = {}
+        self._ref_js: Dict[str, AlignedHistogram] = {}
+        for feature in profile.num_feature_names:
+            reference = self._reference[feature]
+            values = profile.reference_data[feature].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+            values = values[np.isfinite(values)]
+            edges = hist_edges(reference)
+            self._ref_hist[feature] = hist_data(np.histogram(values, edges)[0], edges)
+            self._histograms[feature] = {"hist": AlignedHistogram(edges)}
+            if len(reference.finite_counts()) > JS_MAX_DISTINCT:
+                js_edges = np.histogram_bin_edges(values, "sturges")
+                self._ref_js[feature] = AlignedHistogram(js_edges).update(values)
+                self._histograms[feature]["js"] = AlignedHistogram(js_edges)
+
+    @property
+    def rows(self) -> int:
+        """Production rows seen so far."""
+        return 0 if self._production is None else self._production.rows
+
+    def update(self, batch: DataSource) -> "ProductionMonitor":
+        """Fold a batch of production rows into the running aggregates."""
+        batch = read_source(batch, columns=self.profile.feature_names)
+        missing = [feature for feature in self.feature_types if feature not in batch]
+        if missing:
+            raise ValueError(
+                f"Production batch lacks the features {Style.BRIGHT + Fore.RED}{missing}{Style.RESET_ALL}."
+            )
+        aggregate = FrameAggregate.from_frame(
+            batch,
+            self.feature_types,
+            k=self.k,
+            sample_rows=self.sample_rows,
+            seed=(self.seed, self.batches),
+        )
+        if self._production is None:
+            self._production = aggregate
+        else:
+            self._production.merge(aggregate)
+        for feature, histograms in self._histograms.items():
+            values = batch[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+            for histogram in histograms.values():
+                histogram.update(values)
+        self.batches += 1
+        return self
+
+    def _aggregate(self) -> FrameAggregate:
+        if self._production is None:
+            raise ValueError(
+                "No production batch yet, call `ProductionMonitor.update` first."
+            )
+        return self._production
+
+    def feature_tests(self) -> Dict[str, List[str]]:
+        """Map every feature to [stattest, feature_type] for the data seen so far."""
+        production = self._aggregate().columns
+        return {
+            feature: [
+                select_aggregate_stattest(
+                    feature_type, self._reference[feature], production[feature]
+                ),
+                feature_type,
+            ]
+            for feature, feature_type in self.feature_types.items()
+        }
+
+    def statistical_info(
+        self, feature_test: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Drift results and histograms, as `get_statistical_info`."""
+        production = self._aggregate().columns
+        feature_test = self.feature_tests() if feature_test is None else feature_test
+        test_info = {}
+        for feature, (stattest, feature_type) in feature_test.items():
+            ref, prod = self._reference[feature], production[feature]
+            encoding = aggregate_encoding(ref, prod) if feature_type == "cat" else None
+            binned = None
+            if stattest == "jensenshannon_stat_test" and feature in self._ref_js:
+                prod_js = self._histograms[feature]["js"]
+                bins = prod_js.bins(self._ref_js[feature])
+                binned = (
+                    self._ref_js[feature].counts_over(bins),
+                    prod_js.counts_over(bins),
+                )
+            p_value, drift, threshold = aggregate_stat_test(
+                stattest, ref, prod, encoding, binned
+            )
+            test_info[feature] = {
+                "feature_name": feature,
+                "threshold": threshold,
+                "stattest": feature_test[feature],
+                "p_value": p_value,
+                "drift": drift,
+            }
+            if feature_type == "num":
+                histogram = self._histograms[feature]["hist"]
+                bins = histogram.bins()
+                test_info[feature]["prod_hist_data"] = (
+                    hist_data(histogram.counts_over(bins), histogram.edges(bins)),
+                )
+                test_info[feature]["ref_hist_data"] = self._ref_hist[feature]
+            elif encoding is not None:
+                test_info[feature]["ref_hist_data"] = encoding.hist_data(
+                    encoding.ref_counts
+                )
+                test_info[feature]["prod_hist_data"] = encoding.hist_data(
+                    encoding.prod_counts
+                )
+        return test_info
+
+    def feature_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Production feature summaries, as `feature_summary_stats`."""
+        production = self._aggregate().columns
+        return {
+            feature: feature_summary_from_profile(production[feature].profile())
+            for feature in self.feature_types
+        }
+
+    def data_summary(self) -> Dict[str, Any]:
+        """Production data summary, as `data_summary_stats`."""
+        aggregate = self._aggregate()
+        summary = data_summary_from_profiles(
+            {
+                feature: aggregate.columns[feature].profile()
+                for feature in self.feature_types
+            },
+            aggregate.rows,
+            target_column=self.profile.target_col_name,
+        )
+        summary["categorical features"] = len(self.profile.cat_feature_names)
+        summary["numeric features"] = len(self.profile.num_feature_names)
+        return summary
+
+    def correlations(self) -> Dict[str, pd.DataFrame]:
+        """Production correlation matrices over the reference's correlated features."""
+        aggregate = self._aggregate()
+        num_for_corr, cat_for_corr = self.profile.features_for_corr()
+        correlations = {}
+        for kind in CORRELATION_KINDS:
+            if kind == "cramer_v":
+                correlations[kind] = aggregate.co_occurrence.cramer_v(cat_for_corr)
+            elif kind == "pearson":
+                correlations[kind] = aggregate.co_moments.pearson(num_for_corr)
+            else:
+                correlations[kind] = aggregate.sample.rows[num_for_corr].corr(kind)
+        return correlations
+
+    def statistics(self) -> Dict[str, Any]:
+        """Everything `compute_statistics` returns, for the production data so far."""
+        feature_test = self.feature_tests()
+        return {
+            "feature_test": feature_test,
+            "statistical_data": self.statistical_info(feature_test),
+            "feature_stats": {
+                "reference": self.profile.feature_stats,
+                "production": self.feature_stats(),
+            },
+            "data_summary": {
+                "reference": self.profile.data_summary,
+                "production": self.data_summary(),
+            },
+            "correlations": {
+                "reference": self.profile.correlations,
+                "production": self.correlations(),
+            },
+        }
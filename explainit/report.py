@@ -0,0 +1,914 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+import json
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+from explainit.analyzer.column_profile import DEFAULT_CHUNK_ROWS
+from explainit.analyzer.column_profile import profile_columns
+from explainit.analyzer.data_summary import data_summary_from_profiles
+from explainit.analyzer.feature_summary import feature_summary_from_profile
+from explainit.analyzer.feature_summary import make_feature_stats_dataframe
+from explainit.analyzer.feature_summary import new_and_unused_counts
+from explainit.analyzer.reference_profile import CORRELATION_KINDS
+from explainit.analyzer.reference_profile import ReferenceProfile
+from explainit.analyzer.reference_profile import split_feature_names
+from explainit.backends.partitioned import PartitionedBackend
+from explainit.binning import HistogramCache
+from explainit.budget import BUDGET_STAGES
+from explainit.budget import MemoryBudget
+from explainit.budget import sketch_correlator
+from explainit.budget import StagePlan
+from explainit.budget import stratified_sample
+from explainit.correlations.correlation_heatmaps import plot_correlation_figure
+from explainit.correlations.correlation_table import make_metrics
+from explainit.correlations.correlations import calculate_correlations
+from explainit.encoding import EncodingCache
+from explainit.graphs.additional_cat_graphs import generate_additional_graph_cat_feature
+from explainit.graphs.additional_num_graphs import generate_additional_graph_num_feature
+from explainit.graphs.cat_target_plot import cat_target_main_graph
+from explainit.graphs.categorical_target_behaviour import (
+    categorical_target_behaviour_on_features,
+)
+from explainit.graphs.categorical_target_behaviour import target_behaviour_counts
+from explainit.graphs.categorical_target_behaviour import TargetCounts
+from explainit.graphs.downsampling import DEFAULT_MAX_POINTS
+from explainit.graphs.drift_heatmap import plot_window_drift
+from explainit.graphs.feature_stats_plots import plot_feature_stats
+from explainit.graphs.figure_cache import DEFAULT_MAX_FIGURE_MB
+from explainit.graphs.figure_cache import DEFAULT_MAX_FIGURES
+from explainit.graphs.figure_cache import FigureCache
+from explainit.graphs.num_target_plot import num_target_main_graph
+from explainit.graphs.numerical_target_behaviour import (
+    numerical_target_behaviour_on_features,
+)
+from explainit.graphs.payloads import recolor
+from explainit.sources import compact_frame
+from explainit.sources import DataSource
+from explainit.sources import frame_mb
+from explainit.sources import peak_rss_mb
+from explainit.sources import read_source
+from explainit.sources import source_columns
+from explainit.sources import source_schema
+from explainit.stages import StageRunner
+from explainit.stattests.slice_test import slice_statistical_info
+from explainit.stattests.stat_test import get_statistical_info
+from explainit.stattests.window_test import window_drift
+from explainit.stattests.window_test import window_statistical_info
+from plotly.utils import PlotlyJSONEncoder
+
+REPORT_FORMAT_VERSION = 1
+FIGURE_KINDS = ["additional", "target_behaviour", "feature_stats", "correlation"]
+# Plotly's first two default colours, drawn in the dashboard's own.
+TARGET_BEHAVIOUR_COLORS = {"#636efa": "#00BFFF", "#EF553B": "#FF1493"}
+# Ways `compute_report` can compact the loaded data.
+COMPACT_MODES = ("lossless", "float32")
+# Stages of a report computation and the stages each of them needs first. The
+# reference profile holds the reference feature stats and correlations that the
+# summary and correlation stages compare against.
+REPORT_STAGES: Dict[str, List[str]] = {
+    "profile": [],
+    "drift": ["profile"],
+    "windows": ["profile"],
+    "slices": ["profile"],
+    "target": ["profile"],
+    "summary": ["profile"],
+    "correlations": ["profile"],
+}
+CORRELATION_TABLE_HEADERS = [
+    "top 5 correlation diff category (Cramer_V)",
+    "value train",
+    "value test",
+    "difference",
+    "top 5 correlation diff numerical (Spearman)",
+    "value train",
+    "value test",
+    "difference",
+]
+
+
+def _frame_to_dict(frame: pd.DataFrame) -> Dict[str, Any]:
+    # Same layout as to_dict("split"), which warns on the repeated headers of the
+    # correlation table even though it keeps every column.
+    return {
+        "index": frame.index.tolist(),
+        "columns": frame.columns.tolist(),
+        "data": frame.values.tolist(),
+    }
+
+
+def _frame_from_dict(split: Dict[str, Any]) -> pd.DataFrame:
+    return pd.DataFrame(split["data"], index=split["index"], columns=split["columns"])
+
+
+class Report:
+    """Everything the dashboard shows for one reference/production comparison.
+
+    A report is computed once with `compute_report` and can be served by `build`
+    or by a separate process after a round trip through `Report.save` and
+    `Report.load`. Figures of a freshly computed report are built on demand from
+    the data it still holds; a saved report carries all of them.
+    """
+
+    def __init__(
+        self,
+        target_col_name: str,
+        target_col_type: str,
+        num_feature_names: List[str],
+        cat_feature_names: List[str],
+        statistical_data: Dict[str, Dict[str, Any]],
+        target_figure: Dict[str, Any],
+        data_summary: pd.DataFrame,
+        feature_summaries: Dict[str, pd.DataFrame],
+        correlations: Dict[str, Dict[str, pd.DataFrame]],
+        correlation_table: pd.DataFrame,
+        figures: FigureCache,
+        window_drift: Optional[pd.DataFrame] = None,
+        window_drift_figure: Optional[Dict[str, Any]] = None,
+        slice_drift: Optional[pd.DataFrame] = None,
+        memory_plan: Optional[Dict[str, StagePlan]] = None,
+    ):
+        self.target_col_name = target_col_name
+        self.target_col_type = target_col_type
+        self.num_feature_names = num_feature_names
+        self.cat_feature_names = cat_feature_names
+        self.statistical_data = statistical_data
+        self.target_figure = target_figure
+        self.data_summary = data_summary
+        self.feature_summaries = feature_summaries
+        self.correlations = correlations
+        self.correlation_table = correlation_table
+        self.figures = figures
+        # Drift score per feature and production time window, and its heatmap;
+        # empty without a datetime column.
+        self.window_drift = pd.DataFrame() if window_drift is None else window_drift
+        self.window_drift_figure = (
+            {} if window_drift_figure is None else window_drift_figure
+        )
+        # Drift per (slice, feature), worst first; empty without slice columns.
+        self.slice_drift = pd.DataFrame() if slice_drift is None else slice_drift
+        # Set while `compute_report` is still filling the report in the background.
+        self.stages: Optional[StageRunner] = None
+        # Megabytes held by the data before and after compaction, see `compute_report`.
+        self.memory_usage: Dict[str, float] = {}
+        # How every stage ran under the memory budget; empty without one.
+        self.memory_plan = {} if memory_plan is None else memory_plan
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.num_feature_names + self.cat_feature_names
+
+    @property
+    def target_drift(self) -> Dict[str, Any]:
+        return self.statistical_data[self.target_col_name]
+
+    def ready(self, *stages: str) -> bool:
+        """Whether the given stages of `REPORT_STAGES`, or all of them, are done."""
+        return self.stages is None or self.stages.done(*stages)
+
+    def finished_stages(self) -> List[str]:
+        """Stages that are done or have failed."""
+        return (
+            list(REPORT_STAGES)
+            if self.stages is None
+            else self.stages.finished_stages()
+        )
+
+    def approximation_notes(self, *stages: str) -> List[str]:
+        """Notes on the given stages that the memory budget made approximate."""
+        return [
+            self.memory_plan[stage].note()
+            for stage in stages
+            if stage in self.memory_plan and self.memory_plan[stage].approximate
+        ]
+
+    def stage_error(self, stage: str) -> Optional[BaseException]:
+        return None if self.stages is None else self.stages.error(stage)
+
+    def wait(self, timeout: Optional[float] = None) -> "Report":
+        """Block until every stage is done, raising the error of a failed one."""
+        if self.stages is not None:
+            self.stages.wait(timeout)
+        return self
+
+    def figure(self, kind: str, key: str) -> Any:
+        """The ``kind`` figure of a feature, or of a correlation kind."""
+        return self.figures.get(kind, key)
+
+    def figure_keys(self, kind: str) -> List[str]:
+        if kind == "correlation":
+            return [
+                correlation_kind
+                for correlation_kind in CORRELATION_KINDS
+                if self.correlations["reference"][correlation_kind].shape[0] > 1
+            ]
+        return self.feature_names
+
+    def to_dict(self, with_figures: bool = True) -> Dict[str, Any]:
+        """Plain-data form of the report.
+        Args:
+            with_figures: whether to build every figure and include it.
+        Returns:
+            report: JSON-serializable report.
+        """
+        self.wait()
+        report = {
+            "version": REPORT_FORMAT_VERSION,
+            "target_col_name": self.target_col_name,
+            "target_col_type": self.target_col_type,
+            "num_feature_names": self.num_feature_names,
+            "cat_feature_names": self.cat_feature_names,
+            "statistical_data": self.statistical_data,
+            "target_figure": self.target_figure,
+            "data_summary": _frame_to_dict(self.data_summary),
+            "feature_summaries": {
+                feature: _frame_to_dict(frame)
+                for feature, frame in self.feature_summaries.items()
+            },
+            "correlations": {
+                side: {
+                    kind: _frame_to_dict(matrix) for kind, matrix in matrices.items()
+                }
+                for side, matrices in self.correlations.items()
+            },
+            "correlation_table": _frame_to_dict(self.correlation_table),
+            "window_drift": _frame_to_dict(self.window_drift),
+            "window_drift_figure": self.window_drift_figure,
+            "slice_drift": _frame_to_dict(self.slice_drift),
+            "memory_plan": {
+                stage: plan.to_dict() for stage, plan in self.memory_plan.items()
+            },
+        }
+        if with_figures:
+            report["figures"] = {
+                kind: {
+                    key: self.figures.builders[kind](key)
+                    for key in self.figure_keys(kind)
+                }
+                for kind in FIGURE_KINDS
+            }
+        return report
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), cls=PlotlyJSONEncoder)
+
+    @classmethod
+    def from_dict(
+        cls, report: Dict[str, Any], figures: Optional[FigureCache] = None
+    ) -> "Report":
+        """Rebuild a report from `Report.to_dict` output.
+        Args:
+            report: plain-data report.
+            figures: figure cache to serve figures from, when ``report`` was written
+                without them.
+        Returns:
+            report: the report.
+        """
+        if report["version"] != REPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported report format version {report['version']}")
+        if figures is None:
+            # Every figure is already in memory, so nothing needs caching.
+            figures = FigureCache(
+                {kind: report["figures"][kind].__getitem__ for kind in FIGURE_KINDS},
+                max_figures=0,
+            )
+        return cls(
+            report["target_col_name"],
+            report["target_col_type"],
+            report["num_feature_names"],
+            report["cat_feature_names"],
+            report["statistical_data"],
+            report["target_figure"],
+            _frame_from_dict(report["data_summary"]),
+            {
+                feature: _frame_from_dict(split)
+                for feature, split in report["feature_summaries"].items()
+            },
+            {
+                side: {
+                    kind: _frame_from_dict(split).astype(float)
+                    for kind, split in matrices.items()
+                }
+                for side, matrices in report["correlations"].items()
+            },
+            _frame_from_dict(report["correlation_table"]),
+            figures,
+            # Reports saved before windowed drift existed have neither.
+            _frame_from_dict(report["window_drift"]).astype(float)
+            if "window_drift" in report
+            else None,
+            report.get("window_drift_figure"),
+            _frame_from_dict(report["slice_drift"])
+            if "slice_drift" in report
+            else None,
+            {
+                stage: StagePlan(**plan)
+                for stage, plan in report.get("memory_plan", {}).items()
+            },
+        )
+
+    def save(self, path: str):
+        """Write the report, figures included, to a JSON file."""
+        with open(path, "w", encoding="utf-8") as report_file:
+            report_file.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str) -> "Report":
+        """Read a report written by `Report.save`."""
+        with open(path, encoding="utf-8") as report_file:
+            return cls.from_dict(json.load(report_file))
+
+
+@dataclass
+class _FigureData:
+    """Data and histograms the figures of `compute_report` are drawn from, sampled
+    under a memory budget, and the target behaviour counts of a categorical target.
+    """
+
+    reference_data: pd.DataFrame
+    production_data: pd.DataFrame
+    histograms: HistogramCache
+    target_counts: Dict[str, TargetCounts] = field(default_factory=dict)
+
+
+@dataclass
+class _ProfiledData:
+    """What the profile stage of `compute_report` leaves for the other stages."""
+
+    profile: ReferenceProfile
+    reference_data: pd.DataFrame
+    production_data: pd.DataFrame
+    feature_test: Dict[str, List[str]]
+    encodings: EncodingCache
+    histograms: HistogramCache
+    production_dates: Optional[pd.Series]
+    figures: _FigureData
+
+
+def _check_columns(
+    reference_data: Union[DataSource, ReferenceProfile],
+    production_data: DataSource,
+    target_col_name: str,
+    target_col_type: str,
+    datetime_col_name: Optional[str],
+    slice_columns: Optional[List[str]],
+) -> None:
+    """Raise for columns the report needs and the data lacks, from the column names
+    and types of both sources alone, so that no stage starts on invalid input.
+    """
+    if isinstance(reference_data, ReferenceProfile):
+        feature_types = {
+            feature: reference_data.feature_type(feature)
+            for feature in reference_data.feature_names
+        }
+    else:
+        names = split_feature_names(source_schema(reference_data), datetime_col_name)
+        feature_types = {
+            feature: feature_type
+            for feature_type in ("num", "cat")
+            for feature in names[feature_type]
+        }
+    if target_col_name not in feature_types:
+        raise ValueError(
+            f"Given target column name {Style.BRIGHT + Fore.RED}{target_col_name}{Style.RESET_ALL} does not exist in the reference data."
+        )
+    if target_col_type == "num" and feature_types[target_col_name] != "num":
+        raise ValueError(
+            f"Given target column {Style.BRIGHT + Fore.RED}{target_col_name}{Style.RESET_ALL} is not numerical, its type must be 'cat'."
+        )
+    production_columns = set(source_columns(production_data))
+    missing = [
+        feature for feature in feature_types if feature not in production_columns
+    ]
+    if missing:
+        raise ValueError(
+            f"Given production data lacks the columns {Style.BRIGHT + Fore.RED}{missing}{Style.RESET_ALL} of the reference data."
+        )
+    if datetime_col_name and datetime_col_name not in production_columns:
+        raise ValueError(
+            f"Given datetime column name {Style.BRIGHT + Fore.RED}{datetime_col_name}{Style.RESET_ALL} does not exist in the production data."
+        )
+    for column in slice_columns or []:
+        if column not in feature_types:
+            raise ValueError(
+                f"Given slice column name {Style.BRIGHT + Fore.RED}{column}{Style.RESET_ALL} is not a feature of the data."
+            )
+
+
+def compute_report(
+    reference_data: Union[DataSource, ReferenceProfile],
+    production_data: DataSource,
+    target_col_name: str,
+    target_col_type: str,
+    datetime_col_name: Optional[str] = "",
+    n_jobs: int = 1,
+    max_cached_figures: int = DEFAULT_MAX_FIGURES,
+    figure_cache_mb: float = DEFAULT_MAX_FIGURE_MB,
+    max_points: int = DEFAULT_MAX_POINTS,
+    background: bool = False,
+    approximate: bool = False,
+    drift_window: Optional[str] = None,
+    slice_columns: Optional[List[str]] = None,
+    compact: Optional[str] = None,
+    memory_budget_mb: Optional[float] = None,
+) -> Report:
+    """Compute drift, target drift and data quality without starting a server.
+
+    The work is split into the stages of `REPORT_STAGES`, each started on a
+    background thread as soon as the stages it needs are done.
+    Args:
+        reference_data: reference dataset, its `ReferenceProfile`, or the path, glob
+            or list of paths of its Parquet or CSV files.
+        production_data: production dataset, or the path, glob or list of paths of
+            its Parquet or CSV files.
+        target_col_name: target column name.
+        target_col_type: ``"num"`` or ``"cat"``.
+        datetime_col_name: optional datetime column, excluded from the features.
+        n_jobs: worker processes for the statistical tests, -1 for all cores.
+        max_cached_figures: figures kept in memory once built.
+        figure_cache_mb: memory limit of the figure cache in megabytes.
+        max_points: points drawn per scatter plot before downsampling.
+        background: return at once with the stages still running; `Report.ready`
+            tells which parts are filled in. The columns and types of the data
+            are checked before, so invalid input raises either way.
+        approximate: estimate distinct counts, quartiles and most common values of
+            the summaries with mergeable sketches, and count distinct values for
+            test selection with a `HyperLogLog`; the summaries show the error
+            bounds.
+        drift_window: pandas period alias, e.g. ``"W"`` or ``"D"``, of the
+            production time windows tested for drift when ``datetime_col_name``
+            is given; chosen by `choose_agg_period` when omitted.
+        slice_columns: feature columns, e.g. a segment, region or model version,
+            whose value combinations split both datasets into slices; every other
+            feature is then tested for drift within every slice, see
+            `slice_statistical_info`.
+        compact: ``"lossless"`` to load both datasets in their smallest dtypes, see
+            `compact_frame`, leaving every result unchanged, or ``"float32"`` to
+            store every float in 32 bits as well; `Report.memory_usage` then holds
+            the megabytes saved.
+        memory_budget_mb: memory the report may use, data included. Before the
+            drift, summary, correlation and figure work, its peak is estimated
+            from the rows, features and dtypes of the data, and work that would
+            not fit is computed from sketches or a stratified sample instead, see
+            `MemoryBudget`; `Report.memory_plan` and the dashboard tell which
+            results are approximate.
+    Returns:
+        The report.
+    """
+    if target_col_type not in ("num", "cat"):
+        raise ValueError(
+            f"Given target column type {Style.BRIGHT + Fore.RED}{target_col_type}{Style.RESET_ALL} must be 'num' or 'cat'."
+        )
+    if compact not in (None,) + COMPACT_MODES:
+        raise ValueError(
+            f"Given compact mode {Style.BRIGHT + Fore.RED}{compact}{Style.RESET_ALL} must be one of {COMPACT_MODES}."
+        )
+    if (
+        isinstance(reference_data, ReferenceProfile)
+        and reference_data.target_col_name != target_col_name
+    ):
+        raise ValueError(
+            f"Given target column name {Style.BRIGHT + Fore.RED}{target_col_name}{Style.RESET_ALL} does not match the reference profile."
+        )
+    # Invalid input raises here, before any stage starts, even in the background.
+    _check_columns(
+        reference_data,
+        production_data,
+        target_col_name,
+        target_col_type,
+        datetime_col_name,
+        slice_columns,
+    )
+
+    # Set by the profile stage, which every other stage and figure comes after.
+    profiled: Optional[_ProfiledData] = None
+
+    def profiled_data() -> _ProfiledData:
+        if profiled is None:
+            raise RuntimeError("The profile stage of the report has not run.")
+        return profiled
+
+    # Additional Feature Graphs
+    def additional_graph(feature: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        data = profiled_data()
+        # plot distributions
+        if data.feature_test[feature][1] == "num":
+            return generate_additional_graph_num_feature(
+                feature,
+                data.figures.reference_data[feature].dropna(),
+                data.figures.production_data[feature].dropna(),
+                max_points=max_points,
+                histogram=data.figures.histograms.histogram(feature, "distribution"),
+            )
+        return generate_additional_graph_cat_feature(feature, data.encodings[feature])
+
+    # Target behaviour based on individual features
+    def target_behaviour_graph(feature: str) -> Dict[str, Any]:
+        figure_data = profiled_data().figures
+        if target_col_type == "num":
+            figure = numerical_target_behaviour_on_features(
+                figure_data.reference_data[feature],
+                figure_data.production_data[feature],
+                figure_data.reference_data[target_col_name],
+                figure_data.production_data[target_col_name],
+                max_points=max_points,
+            )
+        else:
+            figure = categorical_target_behaviour_on_features(
+                feature, target_col_name, figure_data.target_counts[feature]
+            )
+        # The dashboard's colours are baked in, so the figure is served as built.
+        recolored: Dict[str, Any] = recolor(figure, TARGET_BEHAVIOUR_COLORS)
+        return recolored
+
+    # Feature Summary Graphs.
+    def feature_stats_graph(feature: str) -> Dict[str, Any]:
+        data = profiled_data()
+        return plot_feature_stats(
+            data.figures.reference_data,
+            data.figures.production_data,
+            feature,
+            data.profile.feature_type(feature),
+            data.figures.histograms,
+        )
+
+    # Correlations Heatmaps.
+    def correlation_graph_figure(kind: str) -> Dict[str, Any]:
+        reference_correlations = report.correlations["reference"]
+        if reference_correlations[kind].shape[0] <= 1:
+            raise KeyError(kind)
+        correlation_figure = plot_correlation_figure(
+            kind, reference_correlations, report.correlations["production"]
+        )
+        return {
+            "data": correlation_figure["data"],
+            "layout": correlation_figure["layout"],
+        }
+
+    # Figures are built the first time they are asked for.
+    figures = FigureCache(
+        {
+            "additional": additional_graph,
+            "target_behaviour": target_behaviour_graph,
+            "feature_stats": feature_stats_graph,
+            "correlation": correlation_graph_figure,
+        },
+        max_figures=max_cached_figures,
+        max_mb=figure_cache_mb,
+    )
+    # Every stage below fills in its part of this report.
+    report = Report(
+        target_col_name,
+        target_col_type,
+        [],
+        [],
+        {},
+        {},
+        pd.DataFrame(),
+        {},
+        {"reference": {}, "production": {}},
+        pd.DataFrame(columns=CORRELATION_TABLE_HEADERS),
+        figures,
+    )
+
+    def load(side: str, data: pd.DataFrame) -> pd.DataFrame:
+        if not compact:
+            return data
+        before = frame_mb(data)
+        # The loaded frame is dropped as soon as its compact copy is made.
+        data = compact_frame(data, float32=compact == "float32")
+        after = frame_mb(data)
+        report.memory_usage[f"{side}_mb"] = before
+        report.memory_usage[f"{side}_compact_mb"] = after
+        report.memory_usage["saved_mb"] = (
+            report.memory_usage.get("saved_mb", 0.0) + before - after
+        )
+        return data
+
+    def approximated(stage: str) -> Optional[int]:
+        """Rows per partition, chunk or sample of a stage the memory budget made
+        approximate, else None.
+        """
+        plan = report.memory_plan.get(stage)
+        return plan.rows if plan is not None and plan.approximate else None
+
+    def profile_stage() -> None:
+        nonlocal profiled
+        profile: Optional[ReferenceProfile] = None
+        if isinstance(reference_data, ReferenceProfile):
+            profile = reference_data
+            reference_frame = profile.reference_data
+            feature_types = {
+                feature: profile.feature_type(feature)
+                for feature in profile.feature_names
+            }
+        else:
+            reference_frame = load(
+                "reference",
+                read_source(
+                    reference_data,
+                    exclude=[datetime_col_name] if datetime_col_name else [],
+                ),
+            )
+            names = split_feature_names(reference_frame, datetime_col_name)
+            feature_types = {
+                feature: feature_type
+                for feature_type in ("num", "cat")
+                for feature in names[feature_type]
+            }
+        production_dates: Optional[pd.Series] = None
+        if datetime_col_name:
+            production_dates = read_source(
+                production_data, columns=[datetime_col_name]
+            )[datetime_col_name]
+        # Only the profiled features of the production data are ever read.
+        production_frame = load(
+            "production", read_source(production_data, columns=list(feature_types))
+        )
+        peak = peak_rss_mb()
+        if compact and peak is not None:
+            # Peak resident memory once both datasets are loaded.
+            report.memory_usage["peak_rss_mb"] = peak
+
+        # Every stage is planned before any of them runs, as all the data is known.
+        if memory_budget_mb is not None:
+            budget = MemoryBudget(memory_budget_mb, n_jobs=n_jobs)
+            report.memory_plan = {
+                stage: budget.plan(
+                    stage, [reference_frame, production_frame], feature_types
+                )
+                for stage in BUDGET_STAGES
+            }
+        if profile is None:
+            summary_rows = approximated("summary")
+            correlation_rows = approximated("correlations")
+            profile = ReferenceProfile.from_frame(
+                reference_frame,
+                target_col_name,
+                datetime_col_name,
+                approximate=approximate or summary_rows is not None,
+                chunk_rows=summary_rows or DEFAULT_CHUNK_ROWS,
+                correlate=None
+                if correlation_rows is None
+                else sketch_correlator(correlation_rows),
+            )
+        reference_frame = profile.reference_data
+
+        # Categorical columns are factorized once and shared by tests, graphs and correlations.
+        encodings = EncodingCache(reference_frame, production_frame)
+        # Likewise every numerical edge set is binned once for tests and figures.
+        histograms = HistogramCache(reference_frame, production_frame)
+
+        figures = _FigureData(reference_frame, production_frame, histograms)
+        figure_rows = approximated("figures")
+        if figure_rows is not None:
+            # Every target class keeps its share of the rows drawn.
+            strata = target_col_name if target_col_type == "cat" else None
+            figure_reference = stratified_sample(reference_frame, figure_rows, strata)
+            figure_production = stratified_sample(production_frame, figure_rows, strata)
+            figures = _FigureData(
+                figure_reference,
+                figure_production,
+                HistogramCache(figure_reference, figure_production),
+            )
+
+        profiled = _ProfiledData(
+            profile,
+            reference_frame,
+            production_frame,
+            # Finding appropriate Statistical test for Individual feature.
+            profile.feature_tests(production_frame, approximate),
+            encodings,
+            histograms,
+            production_dates,
+            figures,
+        )
+        report.num_feature_names = profile.num_feature_names
+        report.cat_feature_names = profile.cat_feature_names
+
+    def drift_stage() -> None:
+        data = profiled_data()
+        partition_rows = approximated("drift")
+        if partition_rows is not None:
+            # Both datasets are reduced to sketches a partition at a time.
+            backend = PartitionedBackend(partition_rows=partition_rows)
+            report.statistical_data = backend.statistical_info(
+                data.feature_test,
+                backend.prepare(data.reference_data, list(data.feature_test)),
+                backend.prepare(data.production_data, list(data.feature_test)),
+            )
+            return
+        # Statistical Information
+        report.statistical_data = get_statistical_info(
+            data.feature_test,
+            data.reference_data,
+            data.production_data,
+            n_jobs=n_jobs,
+            encodings=data.encodings,
+            histograms=data.histograms,
+        )
+
+    def windows_stage() -> None:
+        data = profiled_data()
+        if data.production_dates is None:
+            return
+        # One feature x window matrix, from which the heatmap is drawn once.
+        scores = window_statistical_info(
+            data.feature_test,
+            data.reference_data,
+            data.production_data,
+            data.production_dates,
+            freq=drift_window,
+            encodings=data.encodings,
+        )
+        report.window_drift = scores
+        report.window_drift_figure = plot_window_drift(
+            scores, window_drift(scores, data.feature_test)
+        )
+
+    def slices_stage() -> None:
+        if not slice_columns:
+            return
+        data = profiled_data()
+        report.slice_drift = slice_statistical_info(
+            data.feature_test,
+            data.reference_data,
+            data.production_data,
+            slice_columns,
+            encodings=data.encodings,
+        )
+
+    def target_stage() -> None:
+        data = profiled_data()
+        # Target Main Graph.
+        if target_col_type == "cat":
+            report.target_figure = cat_target_main_graph(
+                data.reference_data[target_col_name],
+                data.production_data[target_col_name],
+            )
+            # Target behaviour figures are drawn from these counts of every feature.
+            data.figures.target_counts = target_behaviour_counts(
+                {
+                    feature: feature_type
+                    for feature, (_, feature_type) in data.feature_test.items()
+                },
+                target_col_name,
+                data.encodings,
+                data.histograms,
+            )
+        else:
+            report.target_figure = num_target_main_graph(
+                data.figures.reference_data[target_col_name].tolist(),
+                data.figures.production_data[target_col_name].tolist(),
+            )
+
+    def summary_stage() -> None:
+        data = profiled_data()
+        profile = data.profile
+        num_feature_names = profile.num_feature_names
+        cat_feature_names = profile.cat_feature_names
+
+        # Data Summary
+        reference_data_summary = copy.deepcopy(profile.data_summary)
+
+        # One pass over every production column serves both summaries.
+        chunk_rows = approximated("summary")
+        production_profiles = profile_columns(
+            data.production_data,
+            num_feature_names,
+            approximate or chunk_rows is not None,
+            chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS,
+        )
+        production_data_summary = data_summary_from_profiles(
+            production_profiles,
+            data.production_data.shape[0],
+            target_column=target_col_name,
+        )
+        production_data_summary["categorical features"] = len(cat_feature_names)
+        production_data_summary["numeric features"] = len(num_feature_names)
+
+        data_summary_df = pd.concat(
+            [
+                pd.DataFrame(reference_data_summary, index=[0]),
+                pd.DataFrame(production_data_summary, index=[0]),
+            ]
+        ).T
+        data_summary_df.columns = ["Reference", "Production"]
+        data_summary_df.reset_index(inplace=True)
+
+        # Feature Summary
+        prod_cat_feature_stats: Dict[str, Dict[str, Any]] = {}
+        ref_cat_feature_stats: Dict[str, Dict[str, Any]] = {}
+        for feature in cat_feature_names:
+            prod_cat_feature_stats[feature] = feature_summary_from_profile(
+                production_profiles[feature]
+            )
+            ref_cat_feature_stats[feature] = copy.deepcopy(
+                profile.feature_stats[feature]
+            )
+            # The drift tests share this encoding, so the value sets come for free.
+            new_count, unused_count = new_and_unused_counts(data.encodings[feature])
+            for feature_stats in (prod_cat_feature_stats, ref_cat_feature_stats):
+                feature_stats[feature]["new_in_production_values_count"] = new_count
+                feature_stats[feature][
+                    "unused_in_production_values_count"
+                ] = unused_count
+
+        prod_num_feature_stats: Dict[str, Dict[str, Any]] = {}
+        ref_num_feature_stats: Dict[str, Dict[str, Any]] = {}
+        for feature in num_feature_names:
+            prod_num_feature_stats[feature] = feature_summary_from_profile(
+                production_profiles[feature]
+            )
+            ref_num_feature_stats[feature] = copy.deepcopy(
+                profile.feature_stats[feature]
+            )
+
+        report.feature_summaries = {
+            feature: make_feature_stats_dataframe(
+                feature,
+                prod_cat_feature_stats,
+                prod_num_feature_stats,
+                ref_cat_feature_stats,
+                ref_num_feature_stats,
+            )
+            for feature in list(data.feature_test.keys())
+        }
+        report.data_summary = data_summary_df
+
+    def correlations_stage() -> None:
+        data = profiled_data()
+        # Correlations
+        num_for_corr, cat_for_corr = data.profile.features_for_corr()
+
+        reference_correlations = data.profile.correlations
+        production_correlations: Dict[str, pd.DataFrame] = {}
+        sample_rows = approximated("correlations")
+        correlate = None if sample_rows is None else sketch_correlator(sample_rows)
+        for kind in CORRELATION_KINDS:
+            if correlate is not None:
+                production_correlations[kind] = correlate(
+                    data.production_data, num_for_corr, cat_for_corr, kind
+                )
+                continue
+            production_correlations[kind] = calculate_correlations(
+                data.production_data,
+                num_for_corr,
+                cat_for_corr,
+                kind,
+                data.encodings.prod_codes(cat_for_corr),
+                n_jobs=n_jobs,
+            )
+
+        metrics = make_metrics(reference_correlations, production_correlations)
+
+        # Correlations Dataframe
+        report.correlation_table = pd.DataFrame(
+            [metric["values"] for metric in metrics], columns=CORRELATION_TABLE_HEADERS
+        )
+        report.correlations = {
+            "reference": reference_correlations,
+            "production": production_correlations,
+        }
+
+    stage_functions: Dict[str, Callable[[], None]] = {
+        "profile": profile_stage,
+        "drift": drift_stage,
+        "windows": windows_stage,
+        "slices": slices_stage,
+        "target": target_stage,
+        "summary": summary_stage,
+        "correlations": correlations_stage,
+    }
+    report.stages = StageRunner(
+        {
+            stage: (stage_functions[stage], dependencies)
+            for stage, dependencies in REPORT_STAGES.items()
+        }
+    ).start()
+    if not background:
+        report.wait()
+        report.stages = None
+    return report
@@ -0,0 +1,213 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import mmap
+import os
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+from explainit.app import create_app
+from explainit.graphs.figure_cache import DEFAULT_MAX_FIGURE_MB
+from explainit.graphs.figure_cache import DEFAULT_MAX_FIGURES
+from explainit.graphs.figure_cache import FigureCache
+from explainit.graphs.figure_cache import serialize_figure
+from explainit.graphs.payloads import decode_figure
+from explainit.report import FIGURE_KINDS
+from explainit.report import Report
+from plotly.utils import PlotlyJSONEncoder
+
+# Environment variable naming the bundle `create_server` serves by default.
+REPORT_BUNDLE_ENV = "EXPLAINIT_REPORT"
+# Sections of a bundle holding matrices start on multiples of this many bytes.
+SECTION_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+
+def save_bundle(report: Report, path: str):
+    """Write a report as a bundle that serving workers can share.
+
+    The first line of the file is the report without its figures and matrices.
+    The correlation and windowed drift matrices follow as raw float64 sections, and
+    every figure as a separate JSON document, all located through an index in that
+    first line, so a reader can memory-map the file, view the matrices in place and
+    decode figures one at a time.
+    Args:
+        report: the report to write.
+        path: the bundle file.
+    """
+    report.wait()
+    header = report.to_dict(with_figures=False)
+    sections: List[Tuple[int, bytes]] = []
+    offset = 0
+
+    def add(blob: bytes, align: bool = False) -> Tuple[int, int]:
+        nonlocal offset
+        start = _aligned(offset) if align else offset
+        sections.append((start, blob))
+        offset = start + len(blob)
+        return start, len(blob)
+
+    def add_matrix(frame: pd.DataFrame) -> Dict[str, Any]:
+        values = np.ascontiguousarray(frame.to_numpy(dtype=np.float64))
+        return {
+            "index": frame.index.tolist(),
+            "columns": frame.columns.tolist(),
+            "section": add(values.tobytes(), align=True),
+            "shape": list(values.shape),
+        }
+
+    header["correlations"] = {
+        side: {kind: add_matrix(matrix) for kind, matrix in matrices.items()}
+        for side, matrices in report.correlations.items()
+    }
+    header["window_drift"] = add_matrix(report.window_drift)
+
+    index: Dict[str, Dict[str, Tuple[int, int]]] = {}
+    for kind in FIGURE_KINDS:
+        index[kind] = {}
+        for key in report.figure_keys(kind):
+            index[kind][key] = add(serialize_figure(report.figures.builders[kind](key)))
+    header["figure_index"] = index
+
+    with open(path, "wb") as bundle_file:
+        # json.dumps escapes newlines, so the header is exactly one line.
+        bundle_file.write(json.dumps(header, cls=PlotlyJSONEncoder).encode("utf-8"))
+        bundle_file.write(b"\n")
+        start = _aligned(bundle_file.tell())
+        for section_offset, blob in sections:
+            bundle_file.write(b"\0" * (start + section_offset - bundle_file.tell()))
+            bundle_file.write(blob)
+
+
+class _MappedBundle:
+    """Matrices and figures read on request from a read-only memory map of a bundle.
+
+    The operating system keeps a single copy of the mapped pages for every process
+    that maps the same file, so serving workers share the matrices and figures
+    rather than each holding its own.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as bundle_file:
+            self.header = json.loads(bundle_file.readline())
+            self._start = _aligned(bundle_file.tell())
+            self._map = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = self.header.pop("figure_index")
+
+    def matrix(self, split: Dict[str, Any]) -> pd.DataFrame:
+        """A matrix written by `save_bundle`, viewing the mapped section in place."""
+        shape = tuple(split["shape"])
+        offset, _ = split["section"]
+        values = (
+            np.ndarray(
+                shape, dtype=np.float64, buffer=self._map, offset=self._start + offset
+            )
+            if 0 not in shape
+            else np.empty(shape)
+        )
+        return pd.DataFrame(
+            values, index=split["index"], columns=split["columns"], copy=False
+        )
+
+    def raw(self, kind: str) -> Callable[[str], bytes]:
+        """Reader of the JSON of the ``kind`` figures, served without decoding."""
+
+        def read(key: str) -> bytes:
+            offset, length = self._index[kind][key]
+            start = self._start + offset
+            stop = start + length
+            return self._map[start:stop]
+
+        return read
+
+    def builder(self, kind: str) -> Callable[[str], Any]:
+        read = self.raw(kind)
+
+        def decode(key: str) -> Any:
+            return decode_figure(read(key))
+
+        return decode
+
+
+def load_bundle(
+    path: str,
+    max_cached_figures: int = DEFAULT_MAX_FIGURES,
+    figure_cache_mb: float = DEFAULT_MAX_FIGURE_MB,
+) -> Report:
+    """Open a bundle written by `save_bundle` without reading its figures.
+    Args:
+        path: the bundle file.
+        max_cached_figures: most decoded figures kept in this process.
+        figure_cache_mb: memory budget of the decoded figures in megabytes.
+    Returns:
+        report: the report, its matrices and figures read from the memory-mapped
+            file.
+    """
+    mapped = _MappedBundle(path)
+    figures = FigureCache(
+        {kind: mapped.builder(kind) for kind in FIGURE_KINDS},
+        max_figures=max_cached_figures,
+        max_mb=figure_cache_mb,
+        serialized={kind: mapped.raw(kind) for kind in FIGURE_KINDS},
+    )
+    header = mapped.header
+    correlations = header.pop("correlations")
+    window_drift = header.pop("window_drift")
+    report = Report.from_dict(
+        dict(header, correlations={side: {} for side in correlations}),
+        figures=figures,
+    )
+    report.correlations = {
+        side: {kind: mapped.matrix(split) for kind, split in matrices.items()}
+        for side, matrices in correlations.items()
+    }
+    report.window_drift = mapped.matrix(window_drift)
+    return report
+
+
+def create_server(
+    path: Optional[str] = None,
+    max_cached_figures: int = DEFAULT_MAX_FIGURES,
+    figure_cache_mb: float = DEFAULT_MAX_FIGURE_MB,
+):
+    """WSGI application serving the dashboard of a saved bundle.
+
+    Meant for multi-worker servers such as gunicorn or waitress, e.g.
+    ``gunicorn -w 4 "explainit.serving:create_server('report.bundle')"``.
+    Args:
+        path: the bundle file, by default the one named by ``EXPLAINIT_REPORT``.
+        max_cached_figures: most decoded figures kept in each worker.
+        figure_cache_mb: memory budget of the decoded figures of each worker.
+    Returns:
+        server: the Flask application behind the dashboard.
+    """
+    if path is None:
+        path = os.environ.get(REPORT_BUNDLE_ENV)
+    if not path:
+        raise ValueError(
+            f"Pass the bundle path or set {Style.BRIGHT + Fore.RED}{REPORT_BUNDLE_ENV}{Style.RESET_ALL}."
+        )
+    report = load_bundle(path, max_cached_figures, figure_cache_mb)
+    return create_app(report).server
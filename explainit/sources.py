@@ -0,0 +1,279 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import glob
+import os
+import sys
+import warnings
+from typing import Any
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.bz2", ".csv.zip", ".csv.xz")
+# CSV rows parsed to infer the column types, and find the date columns, of a CSV
+# source.
+SCHEMA_ROWS = 10_000
+# String columns with at most this share of distinct values per row become
+# ``category`` when compacted.
+MAX_CATEGORY_RATIO = 0.5
+
+PathLike = Union[str, "os.PathLike[str]"]
+DataSource = Union[pd.DataFrame, PathLike, Sequence[PathLike]]
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError(
+            "Reading Parquet files needs pyarrow, install it with `pip install explainit[parquet]`."
+        ) from error
+    return pq
+
+
+def resolve_paths(source: Union[PathLike, Sequence[PathLike]]) -> List[str]:
+    """Expand a path, a glob or a list of them into the matching files, sorted."""
+    patterns = [source] if isinstance(source, (str, os.PathLike)) else list(source)
+    paths: List[str] = []
+    for pattern in patterns:
+        pattern = os.fspath(pattern)
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(matches)
+    if not paths:
+        raise ValueError(
+            f"No files match {Style.BRIGHT + Fore.RED}{source}{Style.RESET_ALL}."
+        )
+    return paths
+
+
+def file_format(path: str) -> str:
+    """``"parquet"`` or ``"csv"``, from the file suffix."""
+    lower = path.lower()
+    if lower.endswith(PARQUET_SUFFIXES):
+        return "parquet"
+    if lower.endswith(CSV_SUFFIXES):
+        return "csv"
+    raise ValueError(
+        f"Unsupported file {Style.BRIGHT + Fore.RED}{path}{Style.RESET_ALL}, expected a Parquet or CSV file."
+    )
+
+
+def source_columns(source: DataSource) -> List[str]:
+    """Column names of a source, read from the file metadata or the CSV header only."""
+    if isinstance(source, pd.DataFrame):
+        return list(source.columns)
+    path = resolve_paths(source)[0]
+    if file_format(path) == "parquet":
+        return list(_parquet().read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def source_schema(source: DataSource) -> pd.DataFrame:
+    """An empty dataframe with the column names and types of a source, read from the
+    file metadata or inferred from the first `SCHEMA_ROWS` rows of a CSV file.
+    """
+    if isinstance(source, pd.DataFrame):
+        return source.iloc[:0]
+    path = resolve_paths(source)[0]
+    if file_format(path) == "parquet":
+        return _parquet().read_schema(path).empty_table().to_pandas()
+    sample = pd.read_csv(path, nrows=SCHEMA_ROWS)
+    for column in _date_columns(sample):
+        sample[column] = pd.to_datetime(sample[column])
+    return sample.iloc[:0]
+
+
+def _date_columns(sample: pd.DataFrame) -> List[str]:
+    """String columns of a CSV sample whose every value, with a digit in it, reads as
+    a date or time.
+    """
+    dates = []
+    for column in sample.select_dtypes(include=[object]).columns:
+        values = sample[column].dropna()
+        if (
+            values.empty
+            or not values.astype(str).str.contains(r"\d").all()
+            or pd.to_numeric(values, errors="coerce").notna().any()
+        ):
+            continue
+        with warnings.catch_warnings():
+            # Formats are guessed from the values, which pandas warns about.
+            warnings.simplefilter("ignore")
+            if pd.to_datetime(values, errors="coerce").notna().all():
+                dates.append(column)
+    return dates
+
+
+def read_source(
+    source: DataSource,
+    columns: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = (),
+) -> pd.DataFrame:
+    """Load the columns of a dataframe, Parquet or CSV source that are needed.
+
+    Columns outside ``columns`` are never read from a file. Parquet columns are read
+    through a memory map and converted to pandas with Arrow releasing each column
+    as it goes; a CSV file is parsed in one pass over the selected columns. Peak
+    memory thus follows the selected columns rather than the size of the files,
+    with a second copy of them while several CSV files are concatenated.
+
+    Date and time columns are never profiled: without ``columns`` they are left out
+    of both Parquet and CSV files, and when asked for they are read as datetimes,
+    CSV columns whose first `SCHEMA_ROWS` values all read as dates included.
+    Args:
+        source: a dataframe, or the path, glob or list of paths of Parquet or CSV files.
+        columns: columns to keep, all of them when omitted.
+        exclude: columns to leave out.
+    Returns:
+        data: the selected columns, files concatenated in path order.
+    """
+    exclude = set(exclude)
+    if isinstance(source, pd.DataFrame):
+        keep = [
+            column
+            for column in (source.columns if columns is None else columns)
+            if column not in exclude
+        ]
+        # Selecting columns copies them, so leave a frame that already fits alone.
+        return source if set(keep) == set(source.columns) else source[keep]
+
+    wanted = None if columns is None else set(columns)
+    paths = resolve_paths(source)
+    if file_format(paths[0]) == "parquet":
+        return _read_parquet(paths, wanted, exclude)
+    return _read_csv(paths, wanted, exclude)
+
+
+def _read_parquet(paths: List[str], wanted, exclude) -> pd.DataFrame:
+    pq = _parquet()
+    import pyarrow as pa
+    import pyarrow.types as pa_types
+
+    schema = pq.read_schema(paths[0])
+    selected = [
+        field.name
+        for field in schema
+        if (wanted is None or field.name in wanted)
+        and field.name not in exclude
+        and not (
+            wanted is None
+            and (pa_types.is_timestamp(field.type) or pa_types.is_date(field.type))
+        )
+    ]
+    tables = [pq.read_table(path, columns=selected, memory_map=True) for path in paths]
+    table = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+    del tables
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _read_csv(paths: List[str], wanted, exclude) -> pd.DataFrame:
+    dates = set(_date_columns(pd.read_csv(paths[0], nrows=SCHEMA_ROWS)))
+
+    def usecols(column: str) -> bool:
+        return (
+            (wanted is None or column in wanted)
+            and column not in exclude
+            and not (wanted is None and column in dates)
+        )
+
+    parse_dates = [column for column in dates if usecols(column)]
+    frames = [
+        pd.read_csv(path, usecols=usecols, parse_dates=parse_dates) for path in paths
+    ]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def _lossless_float32(values: npt.NDArray[Any]) -> bool:
+    # Comparing in float64 tells whether every value, infinities included, survives.
+    with np.errstate(over="ignore"):
+        return np.array_equal(values.astype(np.float32), values, equal_nan=True)
+
+
+def compact_column(
+    column: pd.Series,
+    float32: bool = False,
+    max_category_ratio: float = MAX_CATEGORY_RATIO,
+) -> pd.Series:
+    """``column`` in its smallest dtype that keeps the report unchanged.
+
+    Integers are downcast to the narrowest integer type holding their range, and
+    64-bit floats to 32 bits when every value survives the round trip, or always
+    with ``float32``. String columns with at most ``max_category_ratio`` distinct
+    values per row become ``category``, stored as small integer codes and one copy
+    of each value. Any other column is returned as is.
+    """
+    kind = column.dtype.kind
+    if kind in "iu":
+        return pd.to_numeric(column, downcast="unsigned" if kind == "u" else "integer")
+    if column.dtype == np.float64:
+        if float32 or _lossless_float32(column.to_numpy()):
+            return column.astype(np.float32)
+        return column
+    if kind == "O" and len(column):
+        # ``category`` stores None as NaN, which the summaries would then show.
+        if (
+            column.nunique(dropna=True) <= max_category_ratio * len(column)
+            and pd.api.types.infer_dtype(column, skipna=True) == "string"
+            and not any(value is None for value in column[column.isna()])
+        ):
+            return column.astype("category")
+    return column
+
+
+def compact_frame(
+    data: pd.DataFrame,
+    float32: bool = False,
+    max_category_ratio: float = MAX_CATEGORY_RATIO,
+) -> pd.DataFrame:
+    """``data`` with every column compacted by `compact_column`.
+
+    Columns are converted one at a time into a new frame, and unchanged ones are
+    shared rather than copied, so converting costs at most one column of extra
+    memory; ``data`` itself is left untouched.
+    """
+    return pd.DataFrame(
+        {
+            column: compact_column(data[column], float32, max_category_ratio)
+            for column in data.columns
+        },
+        index=data.index,
+        copy=False,
+    )
+
+
+def frame_mb(data: pd.DataFrame) -> float:
+    """Memory held by ``data``, string values included, in megabytes."""
+    return float(data.memory_usage(index=True, deep=True).sum()) / 2**20
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far in megabytes, None where the
+    platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
@@ -0,0 +1,120 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class StageRunner:
+    """Runs named stages on background threads in dependency order.
+
+    A stage starts as soon as every stage it depends on is done, so independent
+    stages run concurrently. When a stage raises, it and every stage depending on
+    it are marked as failed with that error; the others carry on.
+    """
+
+    def __init__(self, stages: Dict[str, Tuple[Callable[[], None], Sequence[str]]]):
+        for name, (_, dependencies) in stages.items():
+            unknown = [
+                dependency for dependency in dependencies if dependency not in stages
+            ]
+            if unknown:
+                raise ValueError(f"Stage {name} depends on unknown stages {unknown}")
+        self._stages = stages
+        self._status = {name: PENDING for name in stages}
+        self._errors: Dict[str, BaseException] = {}
+        # Re-entrant: a stage that is already over runs its callback on submit.
+        self._lock = threading.RLock()
+        self._finished = threading.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(stages), 1), thread_name_prefix="explainit-stage"
+        )
+
+    def start(self) -> "StageRunner":
+        """Start every stage without dependencies and return at once."""
+        with self._lock:
+            self._submit_ready()
+        return self
+
+    def status(self, stage: str) -> str:
+        return self._status[stage]
+
+    def error(self, stage: str) -> Optional[BaseException]:
+        return self._errors.get(stage)
+
+    def done(self, *stages: str) -> bool:
+        """Whether the given stages, or all of them when none are given, are done."""
+        return all(self._status[stage] == DONE for stage in stages or self._stages)
+
+    def finished_stages(self) -> List[str]:
+        """Stages that are done or failed, in declaration order."""
+        return [
+            stage for stage, status in self._status.items() if status in (DONE, FAILED)
+        ]
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until every stage has finished and raise the first failure.
+        Args:
+            timeout: seconds to wait at most.
+        """
+        if not self._finished.wait(timeout):
+            raise TimeoutError("Report stages are still running")
+        for stage in self._stages:
+            if stage in self._errors:
+                raise self._errors[stage]
+
+    def _submit_ready(self):
+        changed = True
+        while changed:
+            changed = False
+            for name, (function, dependencies) in self._stages.items():
+                if self._status[name] != PENDING:
+                    continue
+                failed = [d for d in dependencies if self._status[d] == FAILED]
+                if failed:
+                    # Later stages may depend on this one, so look at them again.
+                    self._status[name] = FAILED
+                    self._errors[name] = self._errors[failed[0]]
+                    changed = True
+                elif all(self._status[d] == DONE for d in dependencies):
+                    self._status[name] = RUNNING
+                    future = self._executor.submit(function)
+                    future.add_done_callback(functools.partial(self._on_done, name))
+        if not self._finished.is_set() and all(
+            status in (DONE, FAILED) for status in self._status.values()
+        ):
+            self._executor.shutdown(wait=False)
+            self._finished.set()
+
+    def _on_done(self, name: str, future: "Future[None]") -> None:
+        with self._lock:
+            error = future.exception()
+            if error is None:
+                self._status[name] = DONE
+            else:
+                self._status[name] = FAILED
+                self._errors[name] = error
+            self._submit_ready()
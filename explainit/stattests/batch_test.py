@@ -0,0 +1,282 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from explainit.binning import HIST_BINS
+from explainit.binning import HistogramCache
+from explainit.stattests.jensenshannon_test import jensenshannon_stat_test
+from explainit.stattests.ks_test import ks_pvalues
+from scipy.special import rel_entr
+
+BATCH_STAT_TESTS = ("ks_stat_test", "wasserstein_stat_test", "jensenshannon_stat_test")
+DEFAULT_BLOCK_SIZE = 128
+
+
+def _finite_block(data: pd.DataFrame, columns: List[str]) -> npt.NDArray[Any]:
+    """Return the columns as a (K, n) float64 matrix with non-finite cells set to NaN."""
+    block = np.ascontiguousarray(data[columns].to_numpy(dtype=np.float64).T)
+    block[~np.isfinite(block)] = np.nan
+    return block
+
+
+def batch_histograms(block: npt.NDArray[Any], n_bins: int = HIST_BINS):
+    """Row-wise equivalent of ``np.histogram(row, bins=n_bins, density=True)``.
+
+    NaN cells are ignored. The bin assignment mirrors numpy's uniform-bin code path,
+    so the returned densities and edges are identical to the per-feature call.
+    Args:
+        block: 2-D array, one feature per row.
+        n_bins: number of equal-width bins.
+    Returns:
+        densities: array of shape (K, n_bins).
+        edges: array of shape (K, n_bins + 1).
+    """
+    valid = ~np.isnan(block)
+    n_features = block.shape[0]
+    has_values = valid.any(axis=1)
+    with np.errstate(invalid="ignore"):
+        first_edge = np.where(
+            has_values, np.nanmin(block, axis=1, initial=np.inf, where=valid), 0.0
+        )
+        last_edge = np.where(
+            has_values, np.nanmax(block, axis=1, initial=-np.inf, where=valid), 1.0
+        )
+    flat = first_edge == last_edge
+    first_edge = np.where(flat, first_edge - 0.5, first_edge)
+    last_edge = np.where(flat, last_edge + 0.5, last_edge)
+    edges = np.linspace(first_edge, last_edge, n_bins + 1, endpoint=True, axis=1)
+
+    norm = n_bins / (last_edge - first_edge)
+    with np.errstate(invalid="ignore"):
+        indices = np.where(
+            valid, (block - first_edge[:, None]) * norm[:, None], 0
+        ).astype(np.intp)
+    indices[indices == n_bins] -= 1
+    with np.errstate(invalid="ignore"):
+        decrement = block < np.take_along_axis(edges, indices, axis=1)
+        indices[decrement] -= 1
+        increment = (block >= np.take_along_axis(edges, indices + 1, axis=1)) & (
+            indices != n_bins - 1
+        )
+        indices[increment] += 1
+    # Missing cells fall into an extra trailing bucket that is dropped afterwards.
+    indices[~valid] = n_bins
+
+    offsets = np.arange(n_features)[:, None] * (n_bins + 1)
+    counts = np.bincount(
+        (indices + offsets).ravel(), minlength=n_features * (n_bins + 1)
+    ).reshape(n_features, n_bins + 1)[:, :n_bins]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        densities = counts / np.diff(edges, axis=1) / counts.sum(axis=1, keepdims=True)
+    return densities, edges
+
+
+def _finite_row(values: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    return np.asarray(values[~np.isnan(values)])
+
+
+def _sorted_union(ref_block: npt.NDArray[Any], prod_block: npt.NDArray[Any]):
+    """Sort reference and production samples together, feature by feature.
+
+    Returns:
+        values: the pooled samples sorted per row, NaN cells last.
+        from_ref: whether each sorted cell came from the reference sample.
+        valid: whether each sorted cell holds a finite value.
+    """
+    pooled = np.hstack([ref_block, prod_block])
+    # Ties are resolved through run boundaries below, so the sort need not be stable.
+    order = np.argsort(pooled, axis=1)
+    values = np.take_along_axis(pooled, order, axis=1)
+    from_ref = order < ref_block.shape[1]
+    return values, from_ref, ~np.isnan(values)
+
+
+def _distinct_value_js(
+    values: npt.NDArray[Any], from_ref: npt.NDArray[Any], valid: npt.NDArray[Any]
+) -> Tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+    """Jensen-Shannon distance over distinct values, one bucket per run of ties.
+
+    Returns:
+        js: Jensen-Shannon distance per row.
+        ref_unique: number of distinct values in the reference sample per row.
+    """
+    n_features = values.shape[0]
+    run_start = valid.copy()
+    run_start[:, 1:] &= values[:, 1:] != values[:, :-1]
+    n_runs = run_start.sum(axis=1)
+    run_offset = np.concatenate([[0], np.cumsum(n_runs)[:-1]])
+    run_id = np.cumsum(run_start, axis=1) - 1 + run_offset[:, None]
+    flat_run_id = run_id[valid]
+    run_row = np.repeat(np.arange(n_features), n_runs)
+    ref_counts = np.bincount(
+        flat_run_id, weights=from_ref[valid], minlength=n_runs.sum()
+    )
+    prod_counts = np.bincount(
+        flat_run_id, weights=~from_ref[valid], minlength=n_runs.sum()
+    )
+    ref_unique = np.bincount(run_row, weights=ref_counts > 0, minlength=n_features)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = ref_counts / np.bincount(run_row, weights=ref_counts)[run_row]
+        q = prod_counts / np.bincount(run_row, weights=prod_counts)[run_row]
+        m = (p + q) / 2.0
+        js = np.sqrt(
+            np.bincount(
+                run_row, weights=rel_entr(p, m) + rel_entr(q, m), minlength=n_features
+            )
+            / 2.0
+        )
+    return js, ref_unique
+
+
+def _block_stat_info(
+    features: List[str],
+    feature_test: Dict[str, List[str]],
+    reference_data: pd.DataFrame,
+    production_data: pd.DataFrame,
+    histograms: HistogramCache,
+) -> Dict[str, Dict[str, Any]]:
+    ref_block = _finite_block(reference_data, features)
+    prod_block = _finite_block(production_data, features)
+    n_ref = (~np.isnan(ref_block)).sum(axis=1)
+    n_prod = (~np.isnan(prod_block)).sum(axis=1)
+    stattests = np.array([feature_test[feature][0] for feature in features])
+
+    values, from_ref, valid = _sorted_union(ref_block, prod_block)
+    ref_cdf = np.cumsum(from_ref & valid, axis=1) / np.maximum(n_ref, 1)[:, None]
+    prod_cdf = np.cumsum(~from_ref & valid, axis=1) / np.maximum(n_prod, 1)[:, None]
+    cdf_gap = np.abs(ref_cdf - prod_cdf)
+
+    # Kolmogorov-Smirnov: sup |F_ref - F_prod|, read where a run of ties ends.
+    run_end = valid.copy()
+    run_end[:, :-1] &= values[:, 1:] != values[:, :-1]
+    ks_stat = np.where(run_end, cdf_gap, 0.0).max(axis=1)
+    ks_pvalue = np.ones(len(features))
+    is_ks = stattests == "ks_stat_test"
+    if is_ks.any():
+        ks_rows = np.flatnonzero(is_ks)
+        ks_pvalue[is_ks] = ks_pvalues(
+            ks_stat[is_ks],
+            n_ref[is_ks],
+            n_prod[is_ks],
+            lambda j: (
+                _finite_row(ref_block[ks_rows[j]]),
+                _finite_row(prod_block[ks_rows[j]]),
+            ),
+        )
+
+    # First Wasserstein distance: integral of |F_ref - F_prod| between pooled values.
+    deltas = np.where(valid[:, 1:], values[:, 1:] - values[:, :-1], 0.0)
+    wd_norm = np.sum(cdf_gap[:, :-1] * deltas, axis=1) / np.maximum(
+        np.nanstd(ref_block, axis=1), 0.001
+    )
+
+    is_js = stattests == "jensenshannon_stat_test"
+    js = np.zeros(len(features))
+    ref_unique = np.zeros(len(features))
+    if is_js.any():
+        js[is_js], ref_unique[is_js] = _distinct_value_js(
+            values[is_js], from_ref[is_js], valid[is_js]
+        )
+
+    ref_hist, ref_edges = batch_histograms(ref_block)
+    prod_hist, prod_edges = batch_histograms(prod_block)
+
+    test_info: Dict[str, Dict[str, Any]] = {}
+    for j, feature in enumerate(features):
+        if n_ref[j] == 0 or n_prod[j] == 0:
+            continue
+        threshold = 0.05
+        if stattests[j] == "ks_stat_test":
+            p_value = float(ks_pvalue[j])
+            drift = p_value <= threshold
+        elif stattests[j] == "wasserstein_stat_test":
+            p_value = float(wd_norm[j])
+            drift = p_value >= threshold
+        elif ref_unique[j] > 20:
+            # Sturges bins vary in count per feature; they come from the shared cache.
+            p_value, drift, threshold = jensenshannon_stat_test(
+                pd.Series(ref_block[j]).dropna(),
+                pd.Series(prod_block[j]).dropna(),
+                "num",
+                threshold=threshold,
+                histogram=histograms.histogram(feature, "sturges"),
+            )
+        else:
+            p_value = float(js[j])
+            drift = p_value <= threshold
+        test_info[feature] = {
+            "feature_name": feature,
+            "threshold": threshold,
+            "stattest": feature_test[feature],
+            "p_value": p_value,
+            "drift": drift,
+            "prod_hist_data": ([prod_hist[j].tolist(), prod_edges[j].tolist()],),
+            "ref_hist_data": [ref_hist[j].tolist(), ref_edges[j].tolist()],
+        }
+    return test_info
+
+
+def batch_statistical_info(
+    feature_test: Dict[str, List[str]],
+    reference_data: pd.DataFrame,
+    production_data: pd.DataFrame,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    histograms: Optional[HistogramCache] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Compute drift scores for all numerical features in vectorized column blocks.
+
+    Features tested with K-S, Wasserstein or Jensen-Shannon are sorted together
+    column-wise, so every score and histogram is read off the same pooled sample.
+    K-S p-values are exact, from ``ks_2samp``, when neither sample has more than
+    `KS_EXACT_MAX_N` values, and come from the asymptotic Kolmogorov distribution
+    otherwise, see `ks_pvalues`. Features outside these tests, or with an empty
+    sample after cleaning, are left to the per-feature path.
+    Args:
+        feature_test: mapping of feature name to [stattest, feature_type].
+        reference_data: reference data
+        production_data: production data
+        block_size: number of columns processed per vectorized pass.
+        histograms: shared histograms of both datasets; binned Jensen-Shannon
+            reads its Sturges bins from it.
+    Returns:
+        test_info: per-feature entries shaped like `get_statistical_info` output.
+    """
+    features = [
+        feature
+        for feature, (stattest, feature_type) in feature_test.items()
+        if feature_type == "num" and stattest in BATCH_STAT_TESTS
+    ]
+
+    if histograms is None:
+        histograms = HistogramCache(reference_data, production_data)
+    test_info: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(features), block_size):
+        stop = start + block_size
+        test_info.update(
+            _block_stat_info(
+                features[start:stop],
+                feature_test,
+                reference_data,
+                production_data,
+                histograms,
+            )
+        )
+    return test_info
@@ -11,28 +11,41 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from typing import Any
 from typing import Tuple
 
-import numpy as np
+import numpy.typing as npt
 import pandas as pd
+from explainit.encoding import CategoricalEncoding
 from scipy.stats import chisquare
 
 
-def chi_stat_test(
-    reference_data: pd.Series, production_data: pd.Series, threshold: float
+def chi_stat_test_from_counts(
+    ref_counts: npt.NDArray[Any], prod_counts: npt.NDArray[Any], threshold: float
 ) -> Tuple[float, bool, float]:
-    #  TODO: simplify ignoring NaN values here, in z_test and data_drift
-    keys = list((set(reference_data) | set(production_data)) - {np.nan})
-
-    ref_feature_dict = {**dict.fromkeys(keys, 0), **dict(reference_data.value_counts())}
-    production_feature_dict = {
-        **dict.fromkeys(keys, 0),
-        **dict(production_data.value_counts()),
-    }
+    """Chi-square goodness of fit of production counts against the reference ones.
+    Args:
+        ref_counts: reference count per category, aligned with ``prod_counts``.
+        prod_counts: production count per category.
+        threshold: all values below this threshold means data drift
+    Returns:
+        p_value: calculated p_value
+        test_result: whether the drift is detected
+        threshold: threshold for reference
+    """
+    present = (ref_counts > 0) | (prod_counts > 0)
+    k_norm = prod_counts.sum() / ref_counts.sum()
 
-    k_norm = production_data.shape[0] / reference_data.shape[0]
-
-    f_exp = [ref_feature_dict[key] * k_norm for key in keys]
-    f_obs = [production_feature_dict[key] for key in keys]
+    f_exp = ref_counts[present] * k_norm
+    f_obs = prod_counts[present]
     p_value = chisquare(f_obs, f_exp)[1]
     return p_value, p_value <= threshold, threshold
+
+
+def chi_stat_test(
+    reference_data: pd.Series, production_data: pd.Series, threshold: float
+) -> Tuple[float, bool, float]:
+    encoding = CategoricalEncoding.from_series(reference_data, production_data)
+    return chi_stat_test_from_counts(
+        encoding.ref_counts, encoding.prod_counts, threshold
+    )
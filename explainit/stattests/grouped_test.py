@@ -0,0 +1,188 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import List
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+from explainit.stattests.ks_test import ks_pvalues
+from scipy.special import rel_entr
+from scipy.stats import chi2
+from scipy.stats import norm
+
+CONTINUOUS_STAT_TESTS = ("ks_stat_test", "wasserstein_stat_test")
+# Tests whose score drifts above the threshold rather than at or below it.
+DRIFT_ABOVE_STAT_TESTS = ("wasserstein_stat_test",)
+
+
+def group_counts(
+    groups: npt.NDArray[Any], codes: npt.NDArray[Any], n_groups: int, n_bins: int
+) -> npt.NDArray[Any]:
+    """Counts of every (group, bin) pair in one `np.bincount`; -1 codes are skipped.
+    Returns:
+        counts: array of shape (n_groups, n_bins).
+    """
+    valid = (groups >= 0) & (codes >= 0)
+    cells = groups[valid] * n_bins + codes[valid]
+    return np.bincount(cells, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+
+def discrete_group_scores(
+    stattest: str,
+    ref_counts: npt.NDArray[Any],
+    counts: npt.NDArray[Any],
+    order: List[int],
+) -> npt.NDArray[Any]:
+    """Chi-square or z-test p-value, or Jensen-Shannon distance, of every group.
+
+    Each row of ``counts`` is tested as `chi_stat_test_from_counts`,
+    `z_stat_test_from_counts` or `jensenshannon_stat_test` would test it.
+    Args:
+        stattest: name of the test.
+        ref_counts: reference count per category, shared by every group, shape
+            (n_categories,), or per group, shape (n_groups, n_categories).
+        counts: production count per group and category.
+        order: category indices sorted by value, for the z-test.
+    Returns:
+        scores: one score per group, NaN where a side has no value.
+    """
+    ref_counts = np.broadcast_to(ref_counts, counts.shape)
+    n_ref = ref_counts.sum(axis=1)
+    n_prod = counts.sum(axis=1)
+    present = (ref_counts > 0) | (counts > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if stattest == "chi_stat_test":
+            expected = ref_counts * (n_prod / n_ref)[:, None]
+            terms = np.where(present, (counts - expected) ** 2 / expected, 0.0)
+            return np.asarray(chi2.sf(terms.sum(axis=1), present.sum(axis=1) - 1))
+        if stattest == "z_stat_test":
+            # Share of the rows outside the smallest category seen on either side.
+            first = np.asarray(order)[np.argmax(present[:, order], axis=1)]
+            rows = np.arange(len(counts))
+            p1 = (n_ref - ref_counts[rows, first]) / n_ref
+            p2 = (n_prod - counts[rows, first]) / n_prod
+            pooled = (p1 * n_ref + p2 * n_prod) / (n_ref + n_prod)
+            z_stat = (p1 - p2) / np.sqrt(
+                pooled * (1 - pooled) * (1.0 / n_ref + 1.0 / n_prod)
+            )
+            p_value = 2 * (1 - norm.cdf(np.abs(z_stat)))
+            return np.asarray(np.where(present.sum(axis=1) > 1, p_value, 1.0))
+        p = ref_counts / n_ref[:, None]
+        q = counts / n_prod[:, None]
+        m = (p + q) / 2.0
+        divergence = np.sum(rel_entr(p, m) + rel_entr(q, m), axis=1) / 2.0
+        return np.asarray(np.sqrt(divergence))
+
+
+def continuous_group_scores(
+    stattest: str,
+    ref_values: npt.NDArray[Any],
+    ref_groups: npt.NDArray[Any],
+    values: npt.NDArray[Any],
+    groups: npt.NDArray[Any],
+    n_groups: int,
+) -> npt.NDArray[Any]:
+    """Exact K-S p-value or normalized Wasserstein distance of every group.
+
+    Reference and production values are sorted once by (group, value), and both
+    empirical distribution functions of every group are read off that order, as
+    `batch_statistical_info` does for a single pair of samples.
+    Args:
+        stattest: ``"ks_stat_test"`` or ``"wasserstein_stat_test"``.
+        ref_values: reference values; missing and infinite ones are skipped.
+        ref_groups: group of every reference value, -1 for none.
+        values: production values.
+        groups: group of every production value, -1 for none.
+        n_groups: number of groups.
+    Returns:
+        scores: one score per group, NaN where a side has no value.
+    """
+    pooled = np.concatenate([ref_values, values])
+    pooled_groups = np.concatenate([ref_groups, groups])
+    from_ref = np.arange(len(pooled)) < len(ref_values)
+    keep = np.isfinite(pooled) & (pooled_groups >= 0)
+    pooled, pooled_groups, from_ref = pooled[keep], pooled_groups[keep], from_ref[keep]
+    order = np.lexsort((pooled, pooled_groups))
+    pooled, pooled_groups, from_ref = (
+        pooled[order],
+        pooled_groups[order],
+        from_ref[order],
+    )
+
+    n_ref = np.bincount(pooled_groups, weights=from_ref, minlength=n_groups)
+    n_prod = np.bincount(pooled_groups, weights=~from_ref, minlength=n_groups)
+    # Running counts restart at every group.
+    ref_before = np.concatenate([[0], np.cumsum(n_ref)[:-1]])
+    prod_before = np.concatenate([[0], np.cumsum(n_prod)[:-1]])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ref_cdf = (np.cumsum(from_ref) - ref_before[pooled_groups]) / n_ref[
+            pooled_groups
+        ]
+        prod_cdf = (np.cumsum(~from_ref) - prod_before[pooled_groups]) / n_prod[
+            pooled_groups
+        ]
+    gap = np.abs(ref_cdf - prod_cdf)
+    same_group = pooled_groups[1:] == pooled_groups[:-1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if stattest == "ks_stat_test":
+            # sup |F_ref - F_prod|, read where a run of ties ends.
+            run_end = np.ones(len(pooled), dtype=bool)
+            run_end[:-1] = ~same_group | (pooled[1:] != pooled[:-1])
+            ks_stat = np.zeros(n_groups)
+            np.maximum.at(ks_stat, pooled_groups[run_end], gap[run_end])
+            # Groups are contiguous in the sorted pooled values.
+            starts = np.searchsorted(pooled_groups, np.arange(n_groups + 1))
+
+            def samples(group: int) -> Tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+                part = slice(starts[group], starts[group + 1])
+                return (
+                    pooled[part][from_ref[part]],
+                    pooled[part][~from_ref[part]],
+                )
+
+            scores = ks_pvalues(ks_stat, n_ref, n_prod, samples)
+        else:
+            # Integral of |F_ref - F_prod| between the pooled values of each group.
+            deltas = np.where(same_group, pooled[1:] - pooled[:-1], 0.0)
+            distance = np.bincount(
+                pooled_groups[:-1], weights=gap[:-1] * deltas, minlength=n_groups
+            )
+            ref_sum = np.bincount(
+                pooled_groups,
+                weights=np.where(from_ref, pooled, 0.0),
+                minlength=n_groups,
+            )
+            mean = ref_sum / n_ref
+            squares = np.bincount(
+                pooled_groups,
+                weights=np.where(from_ref, pooled - mean[pooled_groups], 0.0) ** 2,
+                minlength=n_groups,
+            )
+            scores = distance / np.maximum(np.sqrt(squares / n_ref), 0.001)
+    return np.where((n_ref > 0) & (n_prod > 0), scores, np.nan)
+
+
+def drift_flags(
+    stattests: npt.NDArray[Any], scores: npt.NDArray[Any], threshold: float = 0.05
+) -> npt.NDArray[Any]:
+    """Whether each score signals drift under the test that produced it.
+
+    Wasserstein distances drift above ``threshold``, every other score at or below
+    it, as in the per-feature tests.
+    """
+    above = np.isin(stattests, DRIFT_ABOVE_STAT_TESTS)
+    with np.errstate(invalid="ignore"):
+        return np.where(above, scores >= threshold, scores <= threshold)
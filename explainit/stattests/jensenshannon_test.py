@@ -11,10 +11,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from typing import Optional
 from typing import Tuple
 
 import numpy as np
 import pandas as pd
+from explainit.binning import FeatureHistogram
+from explainit.encoding import CategoricalEncoding
 from scipy.spatial import distance
 
 
@@ -24,6 +27,8 @@ def get_binned_data(
     feature_type: str,
     n: int,
     feel_zeroes: bool = True,
+    encoding: Optional[CategoricalEncoding] = None,
+    histogram: Optional[FeatureHistogram] = None,
 ):
     """Split variable into n buckets based on reference quantiles
     Args:
@@ -31,35 +36,38 @@ def get_binned_data(
         production: production data
         feature_type: feature type
         n: number of quantiles
+        encoding: cached encoding of the feature, built on demand when omitted.
+        histogram: cached ``"sturges"`` histogram of the feature, see
+            `HistogramCache`; built on demand when omitted.
     Returns:
         reference_percents: % of records in each bucket for reference
         production_percents: % of records in each bucket for reference
     """
-    n_vals = reference.nunique()
+    n_vals = (
+        reference.nunique()
+        if encoding is None
+        else int(np.count_nonzero(encoding.ref_counts))
+    )
     if feature_type == "num" and n_vals > 20:
-
-        bins = np.histogram_bin_edges(
-            list(reference) + list(production), bins="sturges"
-        )
-
-        reference_percents = np.histogram(reference, bins)[0] / len(reference)
-        production_percents = np.histogram(production, bins)[0] / len(production)
+        if histogram is None:
+            bins = np.histogram_bin_edges(
+                np.concatenate([reference.to_numpy(), production.to_numpy()]),
+                bins="sturges",
+            )
+            histogram = FeatureHistogram(
+                bins,
+                np.histogram(reference, bins)[0],
+                np.histogram(production, bins)[0],
+            )
+        reference_percents = np.asarray(histogram.ref_counts) / len(reference)
+        production_percents = np.asarray(histogram.prod_counts) / len(production)
 
     else:
-        keys = list((set(reference.unique()) | set(production.unique())) - {np.nan})
-
-        ref_feature_dict = {**dict.fromkeys(keys, 0), **dict(reference.value_counts())}
-        production_feature_dict = {
-            **dict.fromkeys(keys, 0),
-            **dict(production.value_counts()),
-        }
-
-        reference_percents = np.array(
-            [ref_feature_dict[key] / len(reference) for key in keys]
-        )
-        production_percents = np.array(
-            [production_feature_dict[key] / len(production) for key in keys]
-        )
+        if encoding is None:
+            encoding = CategoricalEncoding.from_series(reference, production)
+        present = encoding.present
+        reference_percents = encoding.ref_counts[present] / len(reference)
+        production_percents = encoding.prod_counts[present] / len(production)
     if feel_zeroes:
         np.place(reference_percents, reference_percents == 0, 0.0001)
         np.place(production_percents, production_percents == 0, 0.0001)
@@ -73,6 +81,8 @@ def jensenshannon_stat_test(
     feature_type: str,
     threshold: float,
     n_bins: int = 30,
+    encoding: Optional[CategoricalEncoding] = None,
+    histogram: Optional[FeatureHistogram] = None,
 ) -> Tuple[float, bool, float]:
     """Compute the Jensen-Shannon distance between two arrays
     Args:
@@ -81,13 +91,21 @@ def jensenshannon_stat_test(
         feature_type: feature type
         threshold: all values above this threshold means data drift
         n_bins: number of bins
+        encoding: cached encoding of the feature, built on demand when omitted.
+        histogram: cached ``"sturges"`` histogram of the feature.
     Returns:
         jensenshannon: calculated Jensen-Shannon distance
         test_result: whether the drift is detected
         threshold: threshold for reference
     """
     reference_percents, production_percents = get_binned_data(
-        reference_data, production_data, feature_type, n_bins, False
+        reference_data,
+        production_data,
+        feature_type,
+        n_bins,
+        False,
+        encoding,
+        histogram,
     )
     jensenshannon_value = distance.jensenshannon(
         reference_percents, production_percents
@@ -11,10 +11,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from typing import Any
+from typing import Callable
 from typing import Tuple
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
+from explainit.stattests.sketches import KLLSketch
 from scipy.stats import ks_2samp
+from scipy.stats import kstwo
+
+# Largest sample for which Kolmogorov-Smirnov p-values are exact, the limit of
+# ``ks_2samp``'s default mode; larger samples get the asymptotic distribution.
+KS_EXACT_MAX_N = 10_000
 
 
 def ks_stat_test(
@@ -33,3 +43,78 @@ def ks_stat_test(
     """
     p_value = ks_2samp(reference_data, production_data)[1]
     return p_value, p_value <= threshold, threshold
+
+
+def ks_pvalues(
+    statistics: npt.NDArray[Any],
+    n_ref: npt.NDArray[Any],
+    n_prod: npt.NDArray[Any],
+    samples: Callable[[int], Tuple[npt.NDArray[Any], npt.NDArray[Any]]],
+) -> npt.NDArray[Any]:
+    """Two-sided p-values of Kolmogorov-Smirnov statistics computed in bulk, equal to
+    those of `ks_stat_test`.
+
+    The asymptotic distribution can be off by about 0.01 at a few hundred rows, so
+    pairs of samples up to `KS_EXACT_MAX_N` values get the exact p-value of
+    ``ks_2samp`` instead.
+    Args:
+        statistics: statistic of every pair of samples.
+        n_ref: reference sample sizes.
+        n_prod: production sample sizes.
+        samples: the finite reference and production values of pair ``j``.
+    Returns:
+        p_values: one per pair, 1 where a sample is empty.
+    """
+    n_ref, n_prod = np.asarray(n_ref), np.asarray(n_prod)
+    p_values = np.ones(len(statistics))
+    present = (n_ref > 0) & (n_prod > 0)
+    p_values[present] = kstwo.sf(
+        statistics[present],
+        np.round(n_ref[present] * n_prod[present] / (n_ref + n_prod)[present]),
+    )
+    for j in np.flatnonzero(present & (np.maximum(n_ref, n_prod) <= KS_EXACT_MAX_N)):
+        p_values[j] = ks_2samp(*samples(j)).pvalue
+    return p_values
+
+
+def ks_sketch_statistic(
+    reference_sketch: KLLSketch, production_sketch: KLLSketch
+) -> Tuple[float, float]:
+    """Kolmogorov-Smirnov statistic read from two quantile sketches.
+    Args:
+        reference_sketch: sketch of the reference data
+        production_sketch: sketch of the production data
+    Returns:
+        statistic: sup |F_ref - F_prod| over the retained values of both sketches.
+        error_bound: the exact statistic lies within this distance with probability
+            about 0.98, the sum of both sketches' rank errors.
+    """
+    points = np.union1d(
+        reference_sketch.weighted_items()[0], production_sketch.weighted_items()[0]
+    )
+    statistic = np.max(
+        np.abs(reference_sketch.cdf(points) - production_sketch.cdf(points))
+    )
+    return float(statistic), reference_sketch.rank_error + production_sketch.rank_error
+
+
+def ks_sketch_stat_test(
+    reference_sketch: KLLSketch, production_sketch: KLLSketch, threshold: float
+) -> Tuple[float, bool, float]:
+    """Approximate two-sample Kolmogorov-Smirnov test on streamed data.
+
+    The p-value is the asymptotic two-sided p-value of the sketched statistic, see
+    `ks_sketch_statistic` for how far that statistic can be from the exact one.
+    Args:
+        reference_sketch: sketch of the reference data
+        production_sketch: sketch of the production data
+        threshold: level of significance
+    Returns:
+        p_value: two-tailed p-value
+        test_result: whether the drift is detected
+        threshold: threshold for reference
+    """
+    statistic, _ = ks_sketch_statistic(reference_sketch, production_sketch)
+    n_ref, n_prod = reference_sketch.count, production_sketch.count
+    p_value = float(kstwo.sf(statistic, np.round(n_ref * n_prod / (n_ref + n_prod))))
+    return p_value, p_value <= threshold, threshold
@@ -0,0 +1,267 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from colorama import Fore
+from colorama import Style
+from explainit.binning import FeatureHistogram
+from explainit.binning import HistogramCache
+from explainit.encoding import CategoricalEncoding
+from explainit.encoding import EncodingCache
+from explainit.utils import array_to_column
+from explainit.utils import column_to_array
+from explainit.utils import ColumnLayout
+
+# Workers start from a fresh interpreter rather than a fork of the caller, whose
+# report stages run on threads that may hold locks at the time of the fork.
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# Shards per worker: a few small shards balance uneven feature costs across the pool.
+SHARDS_PER_WORKER = 4
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """Translate an ``n_jobs`` value into a worker count, -1 meaning all cores."""
+    if n_jobs == 0:
+        raise ValueError("n_jobs must be a positive integer or -1")
+    if n_jobs < 0:
+        return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    return n_jobs
+
+
+class SharedFrames:
+    """Reference and production columns packed into one shared memory block.
+
+    Workers attach to the block by name and view the columns in place, so the data
+    is copied once by the parent instead of being pickled for every shard.
+    """
+
+    def __init__(
+        self,
+        features: List[str],
+        reference_data: pd.DataFrame,
+        production_data: pd.DataFrame,
+    ):
+        self.layout: Dict[str, Dict[str, ColumnLayout]] = {
+            "reference": {},
+            "production": {},
+        }
+        arrays = []
+        offset = 0
+        for side, data in (
+            ("reference", reference_data),
+            ("production", production_data),
+        ):
+            for feature in features:
+                values, layout = column_to_array(data[feature])
+                # Keep every column 8-byte aligned inside the block.
+                offset = -(-offset // 8) * 8
+                layout.update(offset=offset, dtype=values.dtype.str, length=len(values))
+                self.layout[side][feature] = layout
+                arrays.append((offset, values))
+                offset += values.nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for start, values in arrays:
+            np.ndarray(
+                values.shape, dtype=values.dtype, buffer=self.shm.buf, offset=start
+            )[:] = values
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _frame_from_buffer(buffer: Any, layout: Dict[str, ColumnLayout]) -> pd.DataFrame:
+    columns = {}
+    for feature, column_layout in layout.items():
+        values: npt.NDArray[Any] = np.ndarray(
+            (column_layout["length"],),
+            dtype=np.dtype(column_layout["dtype"]),
+            buffer=buffer,
+            offset=column_layout["offset"],
+        )
+        columns[feature] = array_to_column(values, column_layout)
+    return pd.DataFrame(columns, copy=False)
+
+
+# Column layouts of the shared block, sent once to every worker by `_init_worker`
+# rather than with every shard, since object columns carry their distinct values.
+_worker_layout: Dict[str, Dict[str, ColumnLayout]] = {}
+
+
+def _init_worker(layout: Dict[str, Dict[str, ColumnLayout]]) -> None:
+    _worker_layout.update(layout)
+
+
+def _run_shard(
+    statistical_info: Callable[..., Dict[str, Dict[str, Any]]],
+    shm_name: str,
+    shard_test: Dict[str, List[str]],
+    encodings: Dict[str, CategoricalEncoding],
+    histograms: Dict[Tuple[str, str], FeatureHistogram],
+    kwargs: Dict[str, Any],
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[Tuple[str, str], FeatureHistogram]]:
+    # Pool workers share the parent's resource tracker, which unlinks the block once.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    features = list(shard_test.keys())
+    try:
+        reference_data = _frame_from_buffer(
+            shm.buf,
+            {feature: _worker_layout["reference"][feature] for feature in features},
+        )
+        production_data = _frame_from_buffer(
+            shm.buf,
+            {feature: _worker_layout["production"][feature] for feature in features},
+        )
+        encoding_cache = EncodingCache(reference_data, production_data)
+        encoding_cache.update(encodings)
+        histogram_cache = HistogramCache(reference_data, production_data)
+        histogram_cache.update(histograms)
+        result = statistical_info(
+            shard_test,
+            reference_data,
+            production_data,
+            encodings=encoding_cache,
+            histograms=histogram_cache,
+            **kwargs,
+        )
+        built = histogram_cache.built(features)
+        del reference_data, production_data, encoding_cache, histogram_cache
+    finally:
+        shm.close()
+    return result, built
+
+
+def parallel_statistical_info(
+    statistical_info: Callable[..., Dict[str, Dict[str, Any]]],
+    feature_test: Dict[str, List[str]],
+    reference_data: pd.DataFrame,
+    production_data: pd.DataFrame,
+    n_jobs: int,
+    encodings: Optional[EncodingCache] = None,
+    histograms: Optional[HistogramCache] = None,
+    **kwargs: Any,
+) -> Dict[str, Dict[str, Any]]:
+    """Shard features across a process pool and run ``statistical_info`` on each shard.
+
+    Columns reach the workers through shared memory; object columns travel as integer
+    codes plus their table of distinct values, sent once to every worker. Shards are
+    contiguous slices of ``feature_test`` and the output is reassembled in its order,
+    so the result equals the serial call.
+
+    The encodings and histograms already in the caches go to the workers with their
+    shard, encodings by their counts alone. Histograms the workers build come back
+    into ``histograms``; encodings they build do not, since the other stages read
+    their codes, which would cost a copy of every categorical column.
+
+    Workers import the caller's main module, so scripts call this under an
+    ``if __name__ == "__main__":`` guard; without one the workers stop while
+    starting, and the tests run serially after a warning.
+    Args:
+        statistical_info: serial function with the `get_statistical_info` signature.
+        feature_test: mapping of feature name to [stattest, feature_type].
+        reference_data: reference data
+        production_data: production data
+        n_jobs: number of worker processes, -1 for all cores.
+        encodings: shared categorical encodings of both datasets.
+        histograms: shared numerical histograms of both datasets.
+        kwargs: extra keyword arguments forwarded to ``statistical_info``.
+    Returns:
+        test_info: per-feature drift results keyed by feature name.
+    """
+    features = list(feature_test.keys())
+    n_workers = min(resolve_n_jobs(n_jobs), len(features))
+    if n_workers <= 1:
+        return statistical_info(
+            feature_test,
+            reference_data,
+            production_data,
+            encodings=encodings,
+            histograms=histograms,
+            **kwargs,
+        )
+
+    if encodings is None:
+        encodings = EncodingCache(reference_data, production_data)
+    if histograms is None:
+        histograms = HistogramCache(reference_data, production_data)
+    n_shards = min(len(features), n_workers * SHARDS_PER_WORKER)
+    shards = [
+        {feature: feature_test[feature] for feature in shard}
+        for shard in np.array_split(np.array(features, dtype=object), n_shards)
+    ]
+    frames = SharedFrames(features, reference_data, production_data)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=_init_worker,
+            initargs=(frames.layout,),
+        ) as executor:
+            results = list(
+                executor.map(
+                    _run_shard,
+                    [statistical_info] * n_shards,
+                    [frames.name] * n_shards,
+                    shards,
+                    [encodings.built(list(shard)) for shard in shards],
+                    [histograms.built(list(shard)) for shard in shards],
+                    [kwargs] * n_shards,
+                )
+            )
+    except BrokenProcessPool:
+        # Workers import the caller's main module as they start, and stop there when
+        # a script starts a report outside of its main guard.
+        print(
+            f"{Style.BRIGHT + Fore.YELLOW}Warning:{Style.RESET_ALL} the statistical test "
+            "workers stopped while starting, so the tests run in this process instead. "
+            "Scripts using n_jobs other than 1 must build the report under an "
+            '`if __name__ == "__main__":` guard.',
+            file=sys.stderr,
+        )
+        return statistical_info(
+            feature_test,
+            reference_data,
+            production_data,
+            encodings=encodings,
+            histograms=histograms,
+            **kwargs,
+        )
+    finally:
+        frames.close()
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    for result, built in results:
+        merged.update(result)
+        histograms.update(built)
+    return {feature: merged[feature] for feature in features}
@@ -0,0 +1,225 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+DEFAULT_K = 200
+# Ratio between the capacities of two neighbouring compactor levels.
+CAPACITY_DECAY = 2.0 / 3.0
+# HyperLogLog keeps 2**precision registers.
+DEFAULT_PRECISION = 14
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang & Liberty, 2016) over finite floats.
+
+    Values are kept in a stack of compactors. Level ``h`` holds items of weight
+    ``2**h`` and may keep about ``k * (2/3)**depth`` of them; a full level is sorted
+    and every other item, from a random offset, moves up one level. The sketch
+    retains at most about ``3 * k`` items whatever the stream length, and two
+    sketches merge into one that summarises both streams.
+
+    Error bound: with probability 0.99 the rank of any single value is off by less
+    than ``rank_error * count`` (``rank_error`` is about 1.3% for the default
+    ``k=200``). Count, minimum, maximum, mean and standard deviation are exact.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._levels: List[npt.NDArray[Any]] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self) -> float:
+        """Normalized single-rank error at 99% confidence.
+
+        Empirical fit published with the Apache DataSketches KLL implementation.
+        """
+        return float(2.296 / self.k**0.9723)
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else np.nan
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation, as ``np.std`` with ``ddof=0``."""
+        return float(np.sqrt(self._m2 / self.count)) if self.count else np.nan
+
+    @property
+    def retained(self) -> int:
+        return sum(len(items) for items in self._levels)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(int(np.ceil(self.k * CAPACITY_DECAY**depth)), 2)
+
+    def _add_moments(self, count: int, mean: float, m2: float):
+        # Chan et al. pairwise update, so chunked and merged moments stay exact.
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+
+    def update(self, values: Any) -> "KLLSketch":
+        """Add a chunk of values; missing and infinite values are ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        mean = values.mean()
+        self._add_moments(values.size, mean, float(((values - mean) ** 2).sum()))
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold another sketch into this one."""
+        if other.count == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._add_moments(other.count, other._mean, other._m2)
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self._compress()
+        return self
+
+    def _compress(self):
+        while True:
+            for level, items in enumerate(self._levels):
+                if len(items) > self._capacity(level):
+                    break
+            else:
+                return
+            if level + 1 == len(self._levels):
+                self._levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd item out stays behind so the total weight is preserved exactly.
+            odd = len(items) % 2
+            keep, items = items[:odd], items[odd:]
+            offset = self._rng.integers(2)
+            self._levels[level + 1] = np.concatenate(
+                [self._levels[level + 1], items[offset::2]]
+            )
+            self._levels[level] = keep
+
+    def weighted_items(self) -> Tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+        """Retained values in ascending order together with their weights."""
+        values = np.concatenate(self._levels)
+        weights = np.concatenate(
+            [
+                np.full(len(items), 2.0**level)
+                for level, items in enumerate(self._levels)
+            ]
+        )
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def cdf(self, x: Any) -> npt.NDArray[Any]:
+        """Approximate share of values less than or equal to ``x``."""
+        values, weights = self.weighted_items()
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        return np.asarray(
+            cumulative[np.searchsorted(values, x, side="right")] / cumulative[-1]
+        )
+
+    def quantile(self, q: Any) -> npt.NDArray[Any]:
+        """Approximate ``q``-quantiles, ``q`` in [0, 1]."""
+        values, weights = self.weighted_items()
+        cumulative = np.cumsum(weights)
+        ranks = np.asarray(q, dtype=np.float64) * cumulative[-1]
+        index = np.searchsorted(cumulative, ranks, side="left")
+        return np.asarray(values[np.minimum(index, len(values) - 1)])
+
+
+def _bit_length(values: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    """Bit length of unsigned integers below 2**64, exact through 32-bit halves."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """Mergeable distinct count sketch (Flajolet et al., 2007) over hashed values.
+
+    Each value is hashed to 64 bits; the first ``precision`` bits pick one of
+    ``2**precision`` registers, which keeps the longest run of leading zeros seen
+    in the remaining bits. Small counts use linear counting over the empty
+    registers and are practically exact. Numbers are hashed as floats so that an
+    integer and a float column holding the same values agree.
+
+    Error bound: the relative standard error is ``relative_error``, about 0.8% for
+    the default ``precision=14``, with 16 KiB of registers.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / float(np.sqrt(len(self.registers)))
+
+    def update(self, values: Any) -> "HyperLogLog":
+        """Add a chunk of values; missing values are ignored."""
+        values = pd.Series(values).dropna().to_numpy()
+        if values.size == 0:
+            return self
+        if values.dtype.kind in "iufb":
+            values = values.astype(np.float64)
+        hashes = pd.util.hash_array(values)
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+        rank = (suffix_bits - _bit_length(suffix) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Only sketches of the same precision can be merged")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        """Estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            estimate = m * np.log(m / empty)
+        return int(np.round(estimate))
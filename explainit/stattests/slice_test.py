@@ -0,0 +1,195 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from explainit.encoding import EncodingCache
+from explainit.stattests.grouped_test import continuous_group_scores
+from explainit.stattests.grouped_test import CONTINUOUS_STAT_TESTS
+from explainit.stattests.grouped_test import discrete_group_scores
+from explainit.stattests.grouped_test import DRIFT_ABOVE_STAT_TESTS
+from explainit.stattests.grouped_test import drift_flags
+from explainit.stattests.grouped_test import group_counts
+
+SLICE_INFO_COLUMNS = [
+    "slice",
+    "feature",
+    "stattest",
+    "reference_rows",
+    "production_rows",
+    "p_value",
+    "drift",
+    "severity",
+]
+
+
+def slice_codes(
+    reference_data: pd.DataFrame,
+    production_data: pd.DataFrame,
+    slice_columns: List[str],
+) -> Tuple[npt.NDArray[Any], npt.NDArray[Any], List[str]]:
+    """Assign the rows of both datasets to the slices of ``slice_columns``.
+
+    A slice is one combination of values of the slice columns; missing values form
+    a slice of their own.
+    Returns:
+        ref_codes: slice of every reference row.
+        prod_codes: slice of every production row.
+        labels: ``"column=value"`` label of every slice, sorted by value.
+    """
+    keys = pd.concat(
+        [reference_data[slice_columns], production_data[slice_columns]],
+        ignore_index=True,
+    )
+    grouped = keys.groupby(slice_columns, sort=True, dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    labels = []
+    for values in grouped.size().index:
+        values = values if isinstance(values, tuple) else (values,)
+        labels.append(
+            ", ".join(
+                f"{column}={value}" for column, value in zip(slice_columns, values)
+            )
+        )
+    n_ref = len(reference_data)
+    return codes[:n_ref], codes[n_ref:], labels
+
+
+def _severity(stattests: npt.NDArray[Any], scores: npt.NDArray[Any], threshold: float):
+    """How far past ``threshold`` a score lies, on a log scale; positive on drift."""
+    above = np.isin(stattests, DRIFT_ABOVE_STAT_TESTS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.log10(np.maximum(scores, 1e-300) / threshold)
+    return np.where(above, ratio, -ratio)
+
+
+def slice_statistical_info(
+    feature_test: Dict[str, List[str]],
+    reference_data: pd.DataFrame,
+    production_data: pd.DataFrame,
+    slice_columns: List[str],
+    encodings: Optional[EncodingCache] = None,
+    threshold: float = 0.05,
+) -> pd.DataFrame:
+    """Drift of every feature within every slice of the data, worst first.
+
+    The production rows of a slice are tested against the reference rows of the
+    same slice with the feature's own test. Rows are assigned to slices once;
+    categorical and discrete numerical features are then counted per slice and
+    value in one `np.bincount`, and K-S and Wasserstein features are scored from
+    one sort of every value by (slice, value). No slice of the data is ever copied.
+    Args:
+        feature_test: mapping of feature name to [stattest, feature_type].
+        reference_data: reference data
+        production_data: production data
+        slice_columns: columns whose value combinations define the slices, e.g.
+            ``["region", "model_version"]``; they are not tested themselves.
+        encodings: shared categorical encodings of both datasets.
+        threshold: drift threshold of the tests.
+    Returns:
+        slice_info: one row per (slice, feature) with the columns of
+            `SLICE_INFO_COLUMNS`, sorted by ``severity``: how far the score lies
+            past the threshold, in powers of ten, positive when drift is detected.
+            Scores are NaN where a side of the slice has no value of the feature.
+    """
+    ref_slices, prod_slices, labels = slice_codes(
+        reference_data, production_data, slice_columns
+    )
+    n_slices = len(labels)
+    if encodings is None:
+        encodings = EncodingCache(reference_data, production_data)
+    features = [feature for feature in feature_test if feature not in slice_columns]
+    scores = np.full((len(features), n_slices), np.nan)
+    for i, feature in enumerate(features):
+        stattest = feature_test[feature][0]
+        if stattest in CONTINUOUS_STAT_TESTS:
+            scores[i] = continuous_group_scores(
+                stattest,
+                reference_data[feature].to_numpy(dtype=np.float64, na_value=np.nan),
+                ref_slices,
+                production_data[feature].to_numpy(dtype=np.float64, na_value=np.nan),
+                prod_slices,
+                n_slices,
+            )
+            continue
+        encoding = encodings[feature]
+        n_categories = len(encoding.categories)
+        scores[i] = discrete_group_scores(
+            stattest,
+            group_counts(ref_slices, encoding.ref_codes, n_slices, n_categories),
+            group_counts(prod_slices, encoding.prod_codes, n_slices, n_categories),
+            encoding.sorted_present(),
+        )
+
+    stattests = np.array([feature_test[feature][0] for feature in features])
+    stattests = np.repeat(stattests, n_slices)
+    scores = scores.ravel()
+    slice_info = pd.DataFrame(
+        {
+            "slice": np.tile(labels, len(features)),
+            "feature": np.repeat(features, n_slices),
+            "stattest": stattests,
+            "reference_rows": np.tile(
+                np.bincount(ref_slices, minlength=n_slices), len(features)
+            ),
+            "production_rows": np.tile(
+                np.bincount(prod_slices, minlength=n_slices), len(features)
+            ),
+            "p_value": scores,
+            "drift": drift_flags(stattests, scores, threshold),
+            "severity": _severity(stattests, scores, threshold),
+        },
+        columns=SLICE_INFO_COLUMNS,
+    )
+    return slice_info.sort_values(
+        "severity", ascending=False, kind="stable", na_position="last"
+    ).reset_index(drop=True)
+
+
+def top_drifted_slices(slice_info: pd.DataFrame, k: int = 10) -> pd.DataFrame:
+    """The ``k`` slices with the most severe drift.
+    Args:
+        slice_info: output of `slice_statistical_info`.
+        k: number of slices to keep.
+    Returns:
+        slices: per slice, its row counts, the number of drifted features, and its
+            worst feature with that feature's test, score and severity.
+    """
+    worst = slice_info.dropna(subset=["severity"]).drop_duplicates("slice")
+    drifted = slice_info.groupby("slice")["drift"].sum().rename("drifted_features")
+    slices = worst.join(drifted, on="slice").rename(
+        columns={"feature": "worst_feature"}
+    )
+    return (
+        slices[
+            [
+                "slice",
+                "reference_rows",
+                "production_rows",
+                "drifted_features",
+                "worst_feature",
+                "stattest",
+                "p_value",
+                "severity",
+            ]
+        ]
+        .head(k)
+        .reset_index(drop=True)
+    )
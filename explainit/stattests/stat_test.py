@@ -13,24 +13,79 @@
 # limitations under the License.
 from typing import Dict
 from typing import List
+from typing import Optional
 
 import numpy as np
 import pandas as pd
-from explainit.stattests.chi2_test import chi_stat_test
+from explainit.binning import hist_data
+from explainit.binning import HistogramCache
+from explainit.encoding import EncodingCache
+from explainit.stattests.batch_test import batch_statistical_info
+from explainit.stattests.chi2_test import chi_stat_test_from_counts
 from explainit.stattests.jensenshannon_test import jensenshannon_stat_test
 from explainit.stattests.ks_test import ks_stat_test
+from explainit.stattests.parallel import parallel_statistical_info
+from explainit.stattests.sketches import HyperLogLog
 from explainit.stattests.wasserstein_distance_test import wasserstein_distance_stat_test
-from explainit.stattests.z_test import z_stat_test
+from explainit.stattests.z_test import z_stat_test_from_counts
+
+# Above this many distinct values every test choice is the same, see `select_stattest`.
+STATTEST_MAX_DISTINCT = 5
 
 
 def get_statistical_info(
     feature_test: Dict[str, List[str]],
     reference_data: pd.DataFrame,
     production_data: pd.DataFrame,
+    vectorized: bool = True,
+    n_jobs: int = 1,
+    encodings: Optional[EncodingCache] = None,
+    histograms: Optional[HistogramCache] = None,
 ):
+    """Run the chosen statistical test and build histograms for every feature.
+    Args:
+        feature_test: mapping of feature name to [stattest, feature_type].
+        reference_data: reference data
+        production_data: production data
+        vectorized: score numerical K-S, Wasserstein and Jensen-Shannon features
+            in column blocks with `batch_statistical_info`.
+        n_jobs: number of worker processes sharing the features, -1 for all cores.
+        encodings: shared categorical encodings of both datasets; chi-square, z-test,
+            categorical Jensen-Shannon and histograms read their counts from it.
+        histograms: shared numerical histograms of both datasets; binned
+            Jensen-Shannon and ``ref_hist_data``/``prod_hist_data`` read their bins
+            from it.
+    Returns:
+        test_info: per-feature drift results keyed by feature name.
+    """
+    if n_jobs != 1:
+        return parallel_statistical_info(
+            get_statistical_info,
+            feature_test,
+            reference_data,
+            production_data,
+            n_jobs=n_jobs,
+            encodings=encodings,
+            histograms=histograms,
+            vectorized=vectorized,
+        )
+    if encodings is None:
+        encodings = EncodingCache(reference_data, production_data)
+    if histograms is None:
+        histograms = HistogramCache(reference_data, production_data)
+    batch_info = (
+        batch_statistical_info(
+            feature_test, reference_data, production_data, histograms=histograms
+        )
+        if vectorized
+        else {}
+    )
     test_info = {}
 
     for feature in list(feature_test.keys()):
+        if feature in batch_info:
+            test_info[feature] = batch_info[feature]
+            continue
         ref_feature = (
             reference_data[feature].replace([-np.inf, np.inf], np.nan).dropna()
         )
@@ -43,18 +98,26 @@ def get_statistical_info(
             )
 
         if feature_test[feature][0] == "z_stat_test":
-            p_value, drift, threshold = z_stat_test(
-                ref_feature, prod_feature, threshold=0.05
+            p_value, drift, threshold = z_stat_test_from_counts(
+                encodings[feature], threshold=0.05
             )
 
         if feature_test[feature][0] == "chi_stat_test":
-            p_value, drift, threshold = chi_stat_test(
-                ref_feature, prod_feature, threshold=0.05
+            encoding = encodings[feature]
+            p_value, drift, threshold = chi_stat_test_from_counts(
+                encoding.ref_counts, encoding.prod_counts, threshold=0.05
             )
 
         if feature_test[feature][0] == "jensenshannon_stat_test":
             p_value, drift, threshold = jensenshannon_stat_test(
-                ref_feature, prod_feature, feature_test[feature][1], threshold=0.05
+                ref_feature,
+                prod_feature,
+                feature_test[feature][1],
+                threshold=0.05,
+                encoding=encodings[feature],
+                histogram=histograms.histogram(feature, "sturges")
+                if feature_test[feature][1] == "num"
+                else None,
             )
 
         if feature_test[feature][0] == "wasserstein_stat_test":
@@ -69,69 +132,55 @@ def get_statistical_info(
             "drift": drift,
         }
         if feature_test[feature][1] == "num":
+            production = histograms.histogram(feature, "production")
             test_info[feature]["prod_hist_data"] = (
-                [
-                    t.tolist()
-                    for t in np.histogram(
-                        production_data[feature][np.isfinite(production_data[feature])],
-                        bins=10,
-                        density=True,
-                    )
-                ],
+                hist_data(production.counts("production"), production.edges),
+            )
+            reference = histograms.histogram(feature, "reference")
+            test_info[feature]["ref_hist_data"] = hist_data(
+                reference.counts("reference"), reference.edges
             )
-            test_info[feature]["ref_hist_data"] = [
-                t.tolist()
-                for t in np.histogram(
-                    reference_data[feature][np.isfinite(reference_data[feature])],
-                    bins=10,
-                    density=True,
-                )
-            ]
         if feature_test[feature][1] == "cat":
-            ref_counts = ref_feature.value_counts(sort=False)
-            prod_counts = prod_feature.value_counts(sort=False)
-            keys = set(ref_counts.keys()).union(set(prod_counts.keys()))
-            for key in keys:
-                if key not in ref_counts:
-                    ref_counts[key] = 0
-                if key not in prod_counts:
-                    prod_counts[key] = 0
-            test_info[feature]["ref_hist_data"] = list(
-                reversed(
-                    list(
-                        map(list, zip(*sorted(ref_counts.items(), key=lambda x: x[0])))  # type: ignore
-                    )
-                )
+            encoding = encodings[feature]
+            test_info[feature]["ref_hist_data"] = encoding.hist_data(
+                encoding.ref_counts
             )
-            test_info[feature]["prod_hist_data"] = list(
-                reversed(
-                    list(
-                        map(list, zip(*sorted(prod_counts.items(), key=lambda x: x[0])))  # type: ignore
-                    )
-                )
+            test_info[feature]["prod_hist_data"] = encoding.hist_data(
+                encoding.prod_counts
             )
-            # test_info[feature]["prod_hist_data"] = prod_small_hist
-            # test_info[feature]["ref_hist_data"] = ref_small_hist
     return test_info
 
 
 def get_stattest(
-    feature_type: str, ref_feature: pd.Series, prod_feature: pd.Series
+    feature_type: str,
+    ref_feature: pd.Series,
+    prod_feature: pd.Series,
+    approximate: bool = False,
 ) -> str:
-    n_values = pd.concat([ref_feature, prod_feature]).nunique()
-    if ref_feature.shape[0] <= 1000:
+    if approximate:
+        n_values = HyperLogLog().update(ref_feature).update(prod_feature).count()
+    else:
+        n_values = pd.concat([ref_feature, prod_feature]).nunique()
+    return select_stattest(feature_type, ref_feature.shape[0], n_values)
+
+
+def select_stattest(feature_type: str, ref_size: int, n_values: int) -> str:
+    """Pick the statistical test from the reference size and the number of distinct
+    values across reference and production data.
+    """
+    if ref_size <= 1000:
         if feature_type == "num":
-            if n_values <= 5:
+            if n_values <= STATTEST_MAX_DISTINCT:
                 return "chi_stat_test" if n_values > 2 else "z_stat_test"
-            elif n_values > 5:
+            elif n_values > STATTEST_MAX_DISTINCT:
                 return "ks_stat_test"
         elif feature_type == "cat":
             return "chi_stat_test" if n_values > 2 else "z_stat_test"
-    elif ref_feature.shape[0] > 1000:
+    elif ref_size > 1000:
         if feature_type == "num":
-            if n_values <= 5:
+            if n_values <= STATTEST_MAX_DISTINCT:
                 return "jensenshannon_stat_test"
-            elif n_values > 5:
+            elif n_values > STATTEST_MAX_DISTINCT:
                 return "wasserstein_stat_test"
         elif feature_type == "cat":
             return "jensenshannon_stat_test"
@@ -15,6 +15,7 @@ from typing import Tuple
 
 import numpy as np
 import pandas as pd
+from explainit.stattests.sketches import KLLSketch
 from scipy.stats import wasserstein_distance
 
 
@@ -35,3 +36,44 @@ def wasserstein_distance_stat_test(
     norm = max(np.std(reference_data), 0.001)
     wd_norm_value = wasserstein_distance(reference_data, production_data) / norm
     return wd_norm_value, wd_norm_value >= threshold, threshold
+
+
+def wasserstein_distance_sketch(
+    reference_sketch: KLLSketch, production_sketch: KLLSketch
+) -> Tuple[float, float]:
+    """First Wasserstein distance normed by the reference std, read from two sketches.
+    Args:
+        reference_sketch: sketch of the reference data
+        production_sketch: sketch of the production data
+    Returns:
+        wasserstein_distance_norm: normed distance between the sketched distributions.
+        error_bound: the exact normed distance lies within this distance with
+            probability about 0.98. The CDF gap is off by at most the summed rank
+            errors over the whole value range, and the norm itself is exact.
+    """
+    norm = max(reference_sketch.std, 0.001)
+    ref_values, ref_weights = reference_sketch.weighted_items()
+    prod_values, prod_weights = production_sketch.weighted_items()
+    distance = wasserstein_distance(ref_values, prod_values, ref_weights, prod_weights)
+    value_range = max(reference_sketch.max, production_sketch.max) - min(
+        reference_sketch.min, production_sketch.min
+    )
+    error = (reference_sketch.rank_error + production_sketch.rank_error) * value_range
+    return float(distance / norm), float(error / norm)
+
+
+def wasserstein_distance_sketch_stat_test(
+    reference_sketch: KLLSketch, production_sketch: KLLSketch, threshold: float
+) -> Tuple[float, bool, float]:
+    """Approximate normed Wasserstein distance on streamed data.
+    Args:
+        reference_sketch: sketch of the reference data
+        production_sketch: sketch of the production data
+        threshold: all values above this threshold means data drift
+    Returns:
+        wasserstein_distance_norm: normed Wasserstein distance
+        test_result: whether the drift is detected
+        threshold: threshold for reference
+    """
+    wd_norm_value, _ = wasserstein_distance_sketch(reference_sketch, production_sketch)
+    return wd_norm_value, wd_norm_value >= threshold, threshold
@@ -0,0 +1,174 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from explainit.encoding import EncodingCache
+from explainit.graphs.feature_stats_plots import choose_agg_period
+from explainit.stattests.grouped_test import CONTINUOUS_STAT_TESTS
+from explainit.stattests.grouped_test import discrete_group_scores
+from explainit.stattests.grouped_test import drift_flags
+from explainit.stattests.grouped_test import group_counts
+from scipy.stats import kstwo
+
+# Reference quantile bins that continuous features are counted on per window.
+WINDOW_BINS = 100
+
+
+def window_codes(
+    dates: pd.Series, freq: Optional[str] = None
+) -> Tuple[npt.NDArray[Any], List[str]]:
+    """Assign every row to a time window.
+    Args:
+        dates: datetime of every production row.
+        freq: pandas period alias of the windows, chosen by `choose_agg_period`
+            when omitted.
+    Returns:
+        codes: window index of every row, -1 where the date is missing.
+        windows: label of every window, in time order.
+    """
+    dates = pd.to_datetime(dates)
+    if freq is None:
+        freq = choose_agg_period(dates.name, dates.to_frame(), None)
+    codes, periods = pd.factorize(dates.dt.to_period(freq), sort=True)
+    return codes, [str(period) for period in periods]
+
+
+def _continuous_scores(
+    stattest: str,
+    reference: pd.Series,
+    production: pd.Series,
+    window: npt.NDArray[Any],
+    n_windows: int,
+) -> npt.NDArray[Any]:
+    """KS p-value or normalized Wasserstein distance of every window.
+
+    Both samples are counted on the reference's quantile bins, plus one bin below
+    and one above them. The distribution functions are compared at the bin edges,
+    so either score is within one bin of the per-window test on raw values.
+    """
+    ref_values = reference.to_numpy(dtype=np.float64, na_value=np.nan)
+    ref_values = ref_values[np.isfinite(ref_values)]
+    values = production.to_numpy(dtype=np.float64, na_value=np.nan)
+    finite = np.isfinite(values)
+    edges = np.unique(np.quantile(ref_values, np.linspace(0, 1, WINDOW_BINS + 1)))
+    n_bins = len(edges) + 1
+
+    def bin_codes(x: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        codes = np.searchsorted(edges, x, side="right")
+        codes[x == edges[-1]] = len(edges) - 1
+        return codes
+
+    ref_counts = np.bincount(bin_codes(ref_values), minlength=n_bins)
+    codes = np.where(finite, bin_codes(np.where(finite, values, 0.0)), -1)
+    counts = group_counts(window, codes, n_windows, n_bins)
+    n_ref, n_prod = ref_counts.sum(), counts.sum(axis=1)
+
+    # Both distribution functions at every edge, the first and last bin aside.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ref_cdf = np.cumsum(ref_counts)[:-1] / n_ref
+        prod_cdf = np.cumsum(counts, axis=1)[:, :-1] / n_prod[:, None]
+    gap = np.abs(ref_cdf - prod_cdf)
+    if stattest == "ks_stat_test":
+        return np.asarray(
+            kstwo.sf(
+                gap.max(axis=1),
+                np.round(n_ref * n_prod / np.maximum(n_ref + n_prod, 1)),
+            )
+        )
+
+    # The tails outside the reference range are integrated exactly from value sums.
+    sums = np.bincount(
+        np.maximum(window, 0) * n_bins + np.maximum(codes, 0),
+        weights=np.where((window >= 0) & finite, values, 0.0),
+        minlength=n_windows * n_bins,
+    ).reshape(n_windows, n_bins)
+    below = edges[0] * counts[:, 0] - sums[:, 0]
+    above = sums[:, -1] - edges[-1] * counts[:, -1]
+    # Within a bin both functions are taken as linear between its edges.
+    midpoints = (ref_cdf[:-1] + ref_cdf[1:] - prod_cdf[:, :-1] - prod_cdf[:, 1:]) / 2
+    inner = np.sum(np.abs(midpoints) * np.diff(edges), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distance = inner + (below + above) / n_prod
+    return np.asarray(distance / max(np.std(ref_values), 0.001))
+
+
+def window_statistical_info(
+    feature_test: Dict[str, List[str]],
+    reference_data: pd.DataFrame,
+    production_data: pd.DataFrame,
+    dates: pd.Series,
+    freq: Optional[str] = None,
+    encodings: Optional[EncodingCache] = None,
+) -> pd.DataFrame:
+    """Drift score of every feature in every time window of the production data.
+
+    Each window of production rows is tested against the whole reference with the
+    feature's own test. Rows are assigned to windows once, and every feature is
+    counted per window and bin in a single `np.bincount`; all windows are then
+    scored together from those counts. Categorical and discrete numerical
+    features are counted per value, so their scores are exact; K-S and
+    Wasserstein features are counted on `WINDOW_BINS` reference quantile bins.
+    Args:
+        feature_test: mapping of feature name to [stattest, feature_type].
+        reference_data: reference data
+        production_data: production data
+        dates: datetime of every production row.
+        freq: pandas period alias of the windows, e.g. ``"W"`` or ``"D"``; chosen by
+            `choose_agg_period` when omitted.
+        encodings: shared categorical encodings of both datasets.
+    Returns:
+        scores: p-value or distance per feature (rows) and window (columns), NaN
+            where a window holds no value of the feature.
+    """
+    window, windows = window_codes(dates, freq)
+    if encodings is None:
+        encodings = EncodingCache(reference_data, production_data)
+    scores = np.full((len(feature_test), len(windows)), np.nan)
+    for i, (feature, (stattest, _)) in enumerate(feature_test.items()):
+        if stattest in CONTINUOUS_STAT_TESTS:
+            scores[i] = _continuous_scores(
+                stattest,
+                reference_data[feature],
+                production_data[feature],
+                window,
+                len(windows),
+            )
+            continue
+        encoding = encodings[feature]
+        counts = group_counts(
+            window, encoding.prod_codes, len(windows), len(encoding.categories)
+        )
+        scores[i] = discrete_group_scores(
+            stattest, encoding.ref_counts, counts, encoding.sorted_present()
+        )
+    return pd.DataFrame(scores, index=list(feature_test), columns=windows)
+
+
+def window_drift(
+    scores: pd.DataFrame, feature_test: Dict[str, List[str]], threshold: float = 0.05
+) -> pd.DataFrame:
+    """Whether each score of `window_statistical_info` signals drift, see `drift_flags`."""
+    stattests = np.array([feature_test[feature][0] for feature in scores.index])
+    return pd.DataFrame(
+        drift_flags(stattests[:, None], scores.to_numpy(), threshold),
+        index=scores.index,
+        columns=scores.columns,
+    )
@@ -15,16 +15,14 @@ from typing import Tuple
 
 import numpy as np
 import pandas as pd
+from explainit.encoding import CategoricalEncoding
 from scipy.stats import norm
 
 
-def proportions_diff_z_stat_ind(ref: pd.DataFrame, prod: pd.DataFrame):
+def proportions_diff_z_stat_ind(ones1: int, n1: int, ones2: int, n2: int):
     # pylint: disable=invalid-name
-    n1 = len(ref)
-    n2 = len(prod)
-
-    p1 = float(sum(ref)) / n1
-    p2 = float(sum(prod)) / n2
+    p1 = float(ones1) / n1
+    p2 = float(ones2) / n2
     P = float(p1 * n1 + p2 * n2) / (n1 + n2)
 
     return (p1 - p2) / np.sqrt(P * (1 - P) * (1.0 / n1 + 1.0 / n2))
@@ -45,29 +43,39 @@ def proportions_diff_z_test(z_stat, alternative="two-sided"):
     )
 
 
-def z_stat_test(
-    reference_data: pd.Series, production_data: pd.Series, threshold: float
+def z_stat_test_from_counts(
+    encoding: CategoricalEncoding, threshold: float
 ) -> Tuple[float, bool, float]:
-    #  TODO: simplify ignoring NaN values here, in chi_stat_test and data_drift_analyzer
-    if (
-        reference_data.nunique() == 1
-        and production_data.nunique() == 1
-        and reference_data.unique()[0] == production_data.unique()[0]
-    ):
+    """Two-proportion z-test on the share of the smallest category.
+    Args:
+        encoding: encoded reference and production values.
+        threshold: all values below this threshold means data drift
+    Returns:
+        p_value: calculated p_value
+        test_result: whether the drift is detected
+        threshold: threshold for reference
+    """
+    ordered_keys = encoding.sorted_present()
+    if len(ordered_keys) == 1:
         p_value = 1
     else:
-        keys = set(list(reference_data.unique()) + list(production_data.unique())) - {
-            np.nan
-        }
-        ordered_keys = sorted(list(keys))
+        n1 = encoding.ref_counts.sum()
+        n2 = encoding.prod_counts.sum()
+        # Rows equal to the first key count as 0 and every other row as 1.
         p_value = proportions_diff_z_test(
             proportions_diff_z_stat_ind(
-                reference_data.apply(
-                    lambda x, key=ordered_keys[0]: 0 if x == key else 1
-                ),
-                production_data.apply(
-                    lambda x, key=ordered_keys[0]: 0 if x == key else 1
-                ),
+                n1 - encoding.ref_counts[ordered_keys[0]],
+                n1,
+                n2 - encoding.prod_counts[ordered_keys[0]],
+                n2,
             )
         )
     return p_value, p_value <= threshold, threshold
+
+
+def z_stat_test(
+    reference_data: pd.Series, production_data: pd.Series, threshold: float
+) -> Tuple[float, bool, float]:
+    return z_stat_test_from_counts(
+        CategoricalEncoding.from_series(reference_data, production_data), threshold
+    )
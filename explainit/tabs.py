@@ -94,3 +94,56 @@ def data_quality_tabs():
             ),
         ],
     )
+
+
+def generate_stage_progress(stages, finished, total, error=None):
+    """
+    Generates the placeholder of a tab whose stages are still being computed.
+
+    Args:
+        stages: names of the stages the tab is waiting for.
+        finished: number of stages finished so far.
+        total: number of stages in all.
+        error: the error of a failed stage the tab needs, if any.
+    """
+    if error is not None:
+        return html.Div(
+            id="stage-progress",
+            children=[
+                html.H6(f"Computing {', '.join(stages)} failed"),
+                html.Pre(f"{type(error).__name__}: {error}"),
+            ],
+            style={"margin": "35px"},
+        )
+    return html.Div(
+        id="stage-progress",
+        children=[
+            html.H6(f"Computing {', '.join(stages)}..."),
+            html.Progress(value=str(finished), max=str(total)),
+            html.P(f"{finished} of {total} stages finished"),
+        ],
+        style={"margin": "35px", "textAlign": "center"},
+    )
+
+
+def generate_approximation_notes(notes):
+    """
+    Generates the notice of a tab whose results are approximate under the memory budget.
+
+    Args:
+        notes: one sentence per approximate stage, see `Report.approximation_notes`.
+    """
+    if not notes:
+        return []
+    return [
+        html.Div(
+            className="approximation-notes",
+            children=[html.P(note) for note in notes],
+            style={
+                "margin": "10px 35px",
+                "padding": "5px 10px",
+                "border": "1px solid #FFA500",
+                "color": "#FFA500",
+            },
+        )
+    ]
@@ -0,0 +1,54 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+ColumnLayout = Dict[str, Any]
+
+
+def column_to_array(series: pd.Series) -> Tuple[npt.NDArray[Any], ColumnLayout]:
+    """Split a column into a flat numpy array and the metadata needed to rebuild it.
+
+    Numerical and boolean columns are returned as they are, categoricals as their codes
+    and any other column as integer codes into its table of distinct values.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), {
+            "kind": "categorical",
+            "categories": series.cat.categories.to_numpy(),
+            "ordered": bool(series.cat.ordered),
+        }
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+        return series.to_numpy(), {"kind": "raw"}
+    codes, uniques = pd.factorize(series)
+    return codes, {"kind": "codes", "uniques": np.asarray(uniques, dtype=object)}
+
+
+def array_to_column(values: npt.NDArray[Any], layout: ColumnLayout) -> Any:
+    """Inverse of `column_to_array`, missing codes become NaN."""
+    if layout["kind"] == "raw":
+        return values
+    if layout["kind"] == "categorical":
+        return pd.Categorical.from_codes(
+            values, layout["categories"], ordered=layout["ordered"]
+        )
+    column = np.full(values.shape[0], np.nan, dtype=object)
+    present = values >= 0
+    column[present] = np.asarray(layout["uniques"], dtype=object)[values[present]]
+    return column
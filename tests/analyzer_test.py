@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+from explainit.analyzer.column_profile import profile_columns
+from explainit.analyzer.column_profile import sketch_profiles
+from explainit.analyzer.feature_summary import feature_summary_from_profile
+from explainit.analyzer.reference_profile import clean_feature
+from explainit.analyzer.reference_profile import ReferenceProfile
+from explainit.stattests.stat_test import get_stattest
+
+
+def make_frames():
+    rng = np.random.default_rng(0)
+    reference = pd.DataFrame(
+        {
+            "num": rng.normal(size=1500),
+            "few": rng.integers(0, 3, 1500).astype(float),
+            "cat": rng.choice(["a", "b", None], 1500),
+            "target": rng.choice(["yes", "no"], 1500),
+        }
+    )
+    production = pd.DataFrame(
+        {
+            "num": rng.normal(size=300),
+            "few": rng.integers(0, 7, 300).astype(float),
+            "cat": rng.choice(["a", "b", "c"], 300),
+            "target": rng.choice(["yes", "no"], 300),
+        }
+    )
+    return reference, production
+
+
+def test_reference_profile_selects_same_stattest() -> None:
+    reference, production = make_frames()
+    profile = ReferenceProfile.from_frame(reference, "target")
+    for feature, (stattest, feature_type) in profile.feature_tests(production).items():
+        assert stattest == get_stattest(
+            feature_type,
+            clean_feature(reference[feature], feature_type),
+            clean_feature(production[feature], feature_type),
+        )
+
+
+def test_reference_profile_save_load_round_trip(tmp_path) -> None:
+    reference, production = make_frames()
+    profile = ReferenceProfile.from_frame(reference, "target")
+    path = str(tmp_path / "reference.npz")
+    profile.save(path)
+    loaded = ReferenceProfile.load(path)
+
+    assert loaded.feature_names == profile.feature_names
+    pd.testing.assert_frame_equal(
+        loaded.reference_data.fillna(np.nan),
+        profile.reference_data.fillna(np.nan),
+    )
+    assert loaded.feature_stats == profile.feature_stats
+    assert loaded.feature_tests(production) == profile.feature_tests(production)
+    for kind, matrix in profile.correlations.items():
+        pd.testing.assert_frame_equal(loaded.correlations[kind], matrix)
+
+
+def test_profile_columns_matches_pandas() -> None:
+    reference, _ = make_frames()
+    reference["num"] = reference["num"].where(reference.index % 10 != 0, np.inf)
+    reference["count"] = np.arange(1500) % 4
+    profiles = profile_columns(reference, ["num", "few", "count"])
+
+    for feature in ["num", "few", "count"]:
+        values = reference[feature]
+        stats = feature_summary_from_profile(profiles[feature])
+        described = values.describe()
+        assert stats["count"] == values.count()
+        assert stats["unique_count"] == values.nunique()
+        assert stats["infinite"].startswith(f"{np.isinf(values).sum()} ")
+        assert stats["max"] == np.round(values.max(), 4)
+        assert stats["min"] == np.round(values.min(), 4)
+        for key, name in [("percentile_25", "25%"), ("percentile_50", "50%")]:
+            assert stats[key] == np.round(described[name], 4)
+        if np.isfinite(values).all():
+            assert stats["mean"] == np.round(described["mean"], 4)
+            assert stats["std"] == np.round(described["std"], 4)
+    # Extremes keep the column's type.
+    assert isinstance(profiles["count"].numeric["max"], np.integer)
+    assert profiles["cat"].missing == reference["cat"].isnull().sum()
+
+
+def test_sketched_profiles_within_error_bounds() -> None:
+    rng = np.random.default_rng(1)
+    n = 40_000
+    data = pd.DataFrame(
+        {
+            "num": rng.normal(size=n),
+            "cat": pd.Series(rng.zipf(1.5, n) % 5000).astype(str),
+        }
+    )
+    data.loc[::10, "num"] = np.nan
+    exact = profile_columns(data, ["num"])
+    chunks = np.array_split(np.arange(n), 4)
+    sketches = sketch_profiles((data.iloc[rows] for rows in chunks[:2]), ["num"])
+    for column, sketch in sketch_profiles(
+        (data.iloc[rows] for rows in chunks[2:]), ["num"]
+    ).items():
+        sketches[column].merge(sketch)
+
+    for column in ["num", "cat"]:
+        approximate = sketches[column].profile()
+        assert approximate.count == exact[column].count
+        assert approximate.missing == exact[column].missing
+        error = approximate.errors.get("unique_count", 0)
+        assert abs(approximate.unique_count - exact[column].unique_count) <= (
+            3 * error * exact[column].unique_count
+        )
+    # The most frequent value survives, its count low by at most the bound.
+    top = sketches["cat"].profile()
+    assert top.value_counts.index[0] == exact["cat"].value_counts.index[0]
+    shortfall = exact["cat"].value_counts.iloc[0] - top.value_counts.iloc[0]
+    assert 0 <= shortfall <= top.errors["most_common"]
+
+    numbers = np.sort(data["num"].dropna().to_numpy())
+    profile = sketches["num"].profile()
+    for q in [25, 50, 75]:
+        rank = (
+            np.searchsorted(numbers, profile.numeric[f"percentile_{q}"]) / numbers.size
+        )
+        assert abs(rank - q / 100) <= profile.errors["percentiles"]
+    assert profile.numeric["mean"] == pytest.approx(np.mean(numbers))
+
+    stats = feature_summary_from_profile(profile)
+    assert stats["percentile rank error"].startswith("±")
+    assert "unique_count error" in feature_summary_from_profile(top)
+
+    reference, production = make_frames()
+    assert ReferenceProfile.from_frame(
+        reference, "target", approximate=True
+    ).feature_tests(production, approximate=True) == ReferenceProfile.from_frame(
+        reference, "target"
+    ).feature_tests(
+        production
+    )
@@ -0,0 +1,145 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Any
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+from explainit.backends import aggregates
+from explainit.backends.base import compute_statistics
+from explainit.backends.base import PandasBackend
+from explainit.backends.executors import DaskExecutor
+from explainit.backends.executors import LocalExecutor
+from explainit.backends.partitioned import PartitionedBackend
+
+
+def _frame(n: int, seed: int, shift: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(
+        {
+            "wide": rng.normal(shift, 1.0, n),
+            "binned": np.round(rng.normal(shift, 1.0, n), 1),
+            "few": rng.choice([1.0, 2.0, 3.0], n),
+            "color": rng.choice(["red", "green", "blue"], n, p=[0.5, 0.3, 0.2]),
+            "size": rng.choice(["s", "m", "l", "xl"], n, p=[0.4, 0.3, 0.2, 0.1]),
+            "target": rng.choice(["yes", "no"], n, p=[0.7, 0.3]),
+        }
+    )
+    data["linked"] = data["wide"] * 2 + rng.normal(0, 0.5, n)
+    data.loc[rng.choice(n, n // 20, replace=False), "wide"] = np.nan
+    data.loc[rng.choice(n, n // 25, replace=False), "color"] = None
+    return data
+
+
+def _assert_matches_pandas(result: Dict[str, Any], expected: Dict[str, Any]) -> None:
+    assert result["feature_test"] == expected["feature_test"]
+    for feature, info in expected["statistical_data"].items():
+        partitioned = result["statistical_data"][feature]
+        stattest = info["stattest"][0]
+        if stattest in ("ks_stat_test", "wasserstein_stat_test"):
+            # Both come from quantile sketches.
+            assert partitioned["p_value"] == pytest.approx(info["p_value"], abs=0.05)
+        else:
+            assert partitioned["p_value"] == pytest.approx(info["p_value"])
+            assert partitioned["drift"] == info["drift"]
+        np.testing.assert_allclose(
+            partitioned["ref_hist_data"][0], info["ref_hist_data"][0]
+        )
+        if info["stattest"][1] == "num":
+            np.testing.assert_allclose(
+                partitioned["prod_hist_data"][0][1], info["prod_hist_data"][0][1]
+            )
+
+    for side in ("reference", "production"):
+        assert result["data_summary"][side] == expected["data_summary"][side]
+        for feature, stats in expected["feature_stats"][side].items():
+            partitioned = result["feature_stats"][side][feature]
+            # Quartiles come from the sketch, which adds their error bound.
+            assert partitioned.keys() - {"percentile rank error"} == stats.keys()
+            for key, value in stats.items():
+                if key.endswith("most_common") and feature in ("wide", "linked"):
+                    # Every value is unique, any of them may be listed first.
+                    assert partitioned[key].split()[-1] == value.split()[-1]
+                elif key.startswith("percentile"):
+                    assert partitioned[key] == pytest.approx(value, abs=0.2)
+                elif isinstance(value, float):
+                    assert partitioned[key] == pytest.approx(value, abs=1e-4)
+                else:
+                    assert partitioned[key] == value
+
+        for kind, matrix in expected["correlations"][side].items():
+            # Spearman and Kendall are exact here as the sample holds every row.
+            pd.testing.assert_frame_equal(
+                result["correlations"][side][kind], matrix, atol=1e-10
+            )
+
+
+@pytest.mark.parametrize("n_rows", [800, 3000])
+def test_partitioned_backend_matches_pandas(n_rows: int) -> None:
+    reference, production = _frame(n_rows, 0), _frame(n_rows // 2, 1, shift=0.3)
+    expected = compute_statistics(reference, production, "target")
+    backend = PartitionedBackend(
+        LocalExecutor(n_jobs=2), partition_rows=n_rows // 4, sample_rows=n_rows
+    )
+    result = compute_statistics(reference, production, "target", backend=backend)
+    _assert_matches_pandas(result, expected)
+
+
+def test_partitioned_backend_on_dask_matches_pandas() -> None:
+    pytest.importorskip("dask.distributed")
+    reference, production = _frame(800, 0), _frame(400, 1, shift=0.3)
+    expected = compute_statistics(reference, production, "target")
+    with DaskExecutor(n_workers=2) as executor:
+        backend = PartitionedBackend(executor, partition_rows=200, sample_rows=800)
+        result = compute_statistics(reference, production, "target", backend=backend)
+    _assert_matches_pandas(result, expected)
+
+
+def test_partitioned_backend_reads_file_partitions(tmp_path) -> None:
+    reference, production = _frame(600, 2), _frame(400, 3)
+    for i, start in enumerate([0, 150, 300, 450]):
+        stop = start + 150
+        reference.iloc[start:stop].to_csv(tmp_path / f"reference-{i}.csv", index=False)
+    production.to_csv(tmp_path / "production.csv", index=False)
+
+    expected = compute_statistics(reference, production, "target")
+    result = compute_statistics(
+        str(tmp_path / "reference-*.csv"),
+        str(tmp_path / "production.csv"),
+        "target",
+        backend=PartitionedBackend(sample_rows=1000),
+    )
+    assert result["data_summary"] == expected["data_summary"]
+    pd.testing.assert_frame_equal(
+        result["correlations"]["reference"]["cramer_v"],
+        expected["correlations"]["reference"]["cramer_v"],
+    )
+
+    with pytest.raises(ValueError):
+        compute_statistics(reference, production, "missing", backend=PandasBackend())
+
+
+def test_truncated_aggregates_estimate_distinct_values(monkeypatch) -> None:
+    monkeypatch.setattr(aggregates, "MAX_TRACKED_VALUES", 50)
+    values = pd.Series(np.arange(3000) % 300).astype(str)
+    halves = [
+        aggregates.ColumnAggregate.from_series(part, "cat")
+        for part in (values.iloc[:1500], values.iloc[1500:])
+    ]
+    profile = halves[0].merge(halves[1]).profile()
+    assert profile.unique_count == pytest.approx(300, rel=0.05)
+    assert 0 < profile.errors["unique_count"] < 0.05
+    # Every value occurs 10 times, so the kept counts are low by at most that.
+    assert profile.errors["most_common"] >= 10 - profile.value_counts.iloc[0]
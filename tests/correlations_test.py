@@ -0,0 +1,37 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+import pandas as pd
+from explainit.correlations.correlations import calculate_correlations
+from explainit.correlations.correlations import corr_matrix
+from explainit.correlations.correlations import cramer_v
+
+
+def test_cramer_v_matrix_matches_pairwise() -> None:
+    rng = np.random.default_rng(2)
+    data = pd.DataFrame(
+        {
+            "a": rng.choice(["x", "y", "z", None], 500),
+            "b": rng.choice(["u", "v"], 500),
+            "c": rng.choice(["p", "q", "r", "s"], 500),
+            "const": ["k"] * 500,
+        }
+    )
+    data["d"] = data["a"].where(rng.random(500) > 0.2, "w")
+    expected = corr_matrix(data, cramer_v)
+    for n_jobs in (1, 2):
+        matrix = calculate_correlations(
+            data, [], list(data.columns), "cramer_v", n_jobs=n_jobs
+        )
+        np.testing.assert_allclose(matrix.to_numpy(), expected.to_numpy(), atol=1e-12)
@@ -0,0 +1,150 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+
+import numpy as np
+import pandas as pd
+from explainit.binning import HistogramCache
+from explainit.encoding import EncodingCache
+from explainit.graphs.additional_num_graphs import generate_additional_graph_num_feature
+from explainit.graphs.categorical_target_behaviour import (
+    categorical_target_behaviour_on_features,
+)
+from explainit.graphs.categorical_target_behaviour import target_behaviour_counts
+from explainit.graphs.downsampling import downsample_series
+from explainit.graphs.downsampling import lttb_indices
+from explainit.graphs.figure_cache import figure_nbytes
+from explainit.graphs.figure_cache import FigureCache
+from explainit.graphs.histograms import nice_bin_edges
+from explainit.graphs.payloads import decode_figure
+from explainit.graphs.payloads import encode_figure
+from plotly.utils import PlotlyJSONEncoder
+
+
+def test_figure_cache_builds_lazily_and_evicts_lru() -> None:
+    calls = []
+
+    def build_figure(key):
+        calls.append(key)
+        return {"data": [{"x": [key] * 10}], "layout": {}}
+
+    cache = FigureCache({"hist": build_figure}, max_figures=2)
+    assert len(cache) == 0
+    first = cache.get("hist", "a")
+    assert cache.get("hist", "a") is first
+    cache.get("hist", "b")
+    cache.get("hist", "a")
+    cache.get("hist", "c")
+    assert ("hist", "b") not in cache
+    assert ("hist", "a") in cache
+    assert calls == ["a", "b", "c"]
+
+    size = figure_nbytes(first)
+    small = FigureCache({"hist": build_figure}, max_mb=1.5 * size / 2**20)
+    small.get("hist", "a")
+    small.get("hist", "b")
+    assert len(small) == 1 and small.nbytes == size
+
+
+def test_nice_bin_edges_round_width() -> None:
+    edges = nice_bin_edges([np.array([0.3, 4.2]), np.array([9.7])], n_bins=10)
+    np.testing.assert_allclose(edges, np.arange(11))
+    np.testing.assert_allclose(nice_bin_edges([np.array([5.0, 5.0])]), [4.5, 5.5])
+
+
+def test_distribution_graph_is_pre_binned() -> None:
+    rng = np.random.default_rng(0)
+    index = pd.Index(np.arange(20000) * 1)
+    reference = pd.Series(rng.normal(size=20000), index=index)
+    production = pd.Series(rng.normal(0.5, size=20000), index=index)
+    production.iloc[0] = np.inf
+    distribution, _ = generate_additional_graph_num_feature(
+        "feature", reference, production
+    )
+    for trace in distribution["data"]:
+        assert trace["type"] == "bar"
+        assert len(trace["x"]) == len(trace["y"]) <= 15
+        assert abs(sum(trace["y"]) - 1) < 1e-9
+
+
+def test_lttb_keeps_peaks() -> None:
+    x = np.arange(10.0)
+    y = np.array([0, 1, 0, 5, 0, 1, 0, -4, 0, 0.0])
+    kept = lttb_indices(x, y, 5)
+    assert kept[0] == 0 and kept[-1] == 9
+    assert {3, 7} <= set(kept.tolist())
+
+
+def test_downsample_series_respects_budget_and_outliers() -> None:
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=50000)
+    values[[10, 20000]] = [40.0, -40.0]
+    values[5] = np.nan
+    rows = downsample_series(pd.Index(np.arange(50000) * 2), values, 1000)
+    assert len(rows) <= 1000
+    assert {10, 20000} <= set(rows.tolist())
+    assert 5 not in rows
+
+
+def test_encode_figure_packs_numeric_traces() -> None:
+    values = np.linspace(-1.0, 1.0, 50)
+    figure = {
+        "data": [
+            {"type": "scatter", "x": list(range(50)), "y": values, "text": ["a"] * 50},
+            {"type": "bar", "x": [1, 2], "y": [3.5, 4.5]},
+        ],
+        "layout": {"xaxis": {"range": [0, 49]}},
+    }
+    blob = encode_figure(figure)
+    packed = json.loads(blob)
+    assert packed["data"][0]["x"]["dtype"] == "i4"
+    assert packed["data"][0]["y"]["dtype"] == "f8"
+    assert packed["data"][0]["text"] == ["a"] * 50
+    assert packed["data"][1]["y"] == [3.5, 4.5]
+    assert json.dumps(decode_figure(blob), cls=PlotlyJSONEncoder) == json.dumps(
+        figure, cls=PlotlyJSONEncoder
+    )
+
+
+def test_target_behaviour_counts_match_crosstab() -> None:
+    rng = np.random.default_rng(5)
+    frames = [
+        pd.DataFrame(
+            {
+                "x": rng.normal(size=n),
+                "s": rng.choice(["u", "v", None], n),
+                "target": rng.choice(["no", "yes"], n),
+            }
+        )
+        for n in (300, 200)
+    ]
+    counts = target_behaviour_counts(
+        {"x": "num", "s": "cat"},
+        "target",
+        EncodingCache(*frames),
+        HistogramCache(*frames),
+    )
+    for side, frame in enumerate(frames):
+        expected = pd.crosstab(frame["target"], frame["s"])
+        np.testing.assert_array_equal(counts["s"].counts[side], expected.to_numpy())
+        edges = counts["x"].edges
+        for i, label in enumerate(counts["x"].classes):
+            values = frame.loc[frame["target"] == label, "x"]
+            np.testing.assert_array_equal(
+                counts["x"].counts[side, i], np.histogram(values, edges)[0]
+            )
+    assert counts["s"].bins == ["u", "v"] and counts["s"].classes == ["no", "yes"]
+
+    figure = categorical_target_behaviour_on_features("x", "target", counts["x"])
+    assert len(figure["data"]) == 4
@@ -0,0 +1,63 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+import pandas as pd
+import pytest
+from explainit.analyzer.reference_profile import ReferenceProfile
+from explainit.backends.base import compute_statistics
+from explainit.monitor import ProductionMonitor
+from tests.backends_test import _frame
+
+
+def test_monitor_batches_match_whole_production() -> None:
+    reference, production = _frame(2000, 0), _frame(1500, 1, shift=0.3)
+    expected = compute_statistics(reference, production, "target")
+    monitor = ProductionMonitor(
+        ReferenceProfile.from_frame(reference, "target"), "target", sample_rows=2000
+    )
+    with pytest.raises(ValueError):
+        monitor.statistics()
+    for start in range(0, 1500, 400):
+        stop = start + 400
+        monitor.update(production.iloc[start:stop])
+    assert monitor.rows == 1500
+    result = monitor.statistics()
+
+    assert result["feature_test"] == expected["feature_test"]
+    for feature, info in expected["statistical_data"].items():
+        monitored = result["statistical_data"][feature]
+        stattest, feature_type = info["stattest"]
+        if stattest in ("z_stat_test", "chi_stat_test") or feature_type == "cat":
+            assert monitored["p_value"] == pytest.approx(info["p_value"])
+            assert monitored["prod_hist_data"] == info["prod_hist_data"]
+        else:
+            # Sketched tests, and histograms on the reference's bins.
+            assert monitored["p_value"] == pytest.approx(info["p_value"], abs=0.05)
+            density, edges = monitored["prod_hist_data"][0]
+            assert np.sum(np.array(density) * np.diff(edges)) == pytest.approx(1.0)
+        np.testing.assert_allclose(
+            monitored["ref_hist_data"][0], info["ref_hist_data"][0]
+        )
+
+    assert result["data_summary"] == expected["data_summary"]
+    for feature, stats in expected["feature_stats"]["production"].items():
+        monitored = result["feature_stats"]["production"][feature]
+        for key in ("count", "missing", "unique", "mean", "std"):
+            if key in stats:
+                assert monitored[key] == pytest.approx(stats[key])
+    for kind, matrix in expected["correlations"]["production"].items():
+        # The sample holds every row, so the rank correlations are exact too.
+        pd.testing.assert_frame_equal(
+            result["correlations"]["production"][kind], matrix, atol=1e-10
+        )
@@ -0,0 +1,328 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import gzip
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from explainit import compute_report
+from explainit import create_app
+from explainit import create_server
+from explainit import load_bundle
+from explainit import Report
+from explainit import save_bundle
+from explainit.budget import MemoryBudget
+from explainit.budget import MIN_ROWS
+from explainit.budget import sketch_correlator
+from explainit.budget import stratified_sample
+from explainit.graphs.payloads import decode_figure
+from explainit.report import REPORT_STAGES
+from explainit.stages import StageRunner
+from plotly.utils import PlotlyJSONEncoder
+
+
+def _frame(n: int, shift: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(int(shift * 10))
+    return pd.DataFrame(
+        {
+            "a": rng.normal(shift, size=n),
+            "b": rng.exponential(size=n),
+            "s": rng.choice(["x", "y", "z"], n),
+            "target": rng.choice(["yes", "no"], n),
+        }
+    )
+
+
+def test_report_round_trip(tmp_path) -> None:
+    report = compute_report(_frame(300), _frame(200, 0.5), "target", "cat")
+    assert report.feature_names == ["a", "b", "s", "target"]
+    assert report.target_drift == report.statistical_data["target"]
+
+    path = tmp_path / "report.json"
+    report.save(str(path))
+    loaded = Report.load(str(path))
+
+    assert loaded.statistical_data == json.loads(
+        json.dumps(report.statistical_data, cls=PlotlyJSONEncoder)
+    )
+    pd.testing.assert_frame_equal(loaded.data_summary, report.data_summary)
+    pd.testing.assert_frame_equal(
+        loaded.correlations["reference"]["pearson"],
+        report.correlations["reference"]["pearson"],
+    )
+    for kind in ["feature_stats", "target_behaviour"]:
+        assert json.dumps(
+            loaded.figure(kind, "a"), cls=PlotlyJSONEncoder
+        ) == json.dumps(report.figure(kind, "a"), cls=PlotlyJSONEncoder)
+    assert len(create_app(loaded).callback_map) > 0
+
+
+def test_bundle_serves_figures_from_the_mapped_file(tmp_path) -> None:
+    report = compute_report(_frame(300), _frame(200, 0.5), "a", "num")
+    path = str(tmp_path / "report.bundle")
+    save_bundle(report, path)
+
+    loaded = load_bundle(path, max_cached_figures=0)
+    assert loaded.statistical_data == json.loads(
+        json.dumps(report.statistical_data, cls=PlotlyJSONEncoder)
+    )
+    for kind in ["additional", "feature_stats", "target_behaviour"]:
+        assert json.dumps(
+            loaded.figure(kind, "s"), cls=PlotlyJSONEncoder
+        ) == json.dumps(report.figure(kind, "s"), cls=PlotlyJSONEncoder)
+    assert json.dumps(loaded.figure("correlation", "pearson")) == json.dumps(
+        report.figure("correlation", "pearson"), cls=PlotlyJSONEncoder
+    )
+    for side, matrices in report.correlations.items():
+        for kind, matrix in matrices.items():
+            pd.testing.assert_frame_equal(
+                loaded.correlations[side][kind], matrix.astype(float)
+            )
+    # Matrices are viewed in the mapped file rather than decoded.
+    assert not loaded.correlations["reference"]["pearson"].to_numpy().flags.writeable
+
+    server = create_server(path)
+    response = server.test_client().get("/_dash-layout")
+    assert response.status_code == 200
+    # Figures are served as the bytes stored in the bundle.
+    response = server.test_client().get("/_explainit/figures/additional/s")
+    assert response.data == loaded.figures.serialized["additional"]("s")
+    assert json.dumps(decode_figure(response.data), cls=PlotlyJSONEncoder) == (
+        json.dumps(report.figure("additional", "s"), cls=PlotlyJSONEncoder)
+    )
+
+
+def test_app_serves_figures_encoded_once() -> None:
+    report = compute_report(_frame(300), _frame(200, 0.5), "target", "cat")
+    client = create_app(report).server.test_client()
+    first = client.get("/_explainit/figures/target_behaviour/a")
+    assert first.status_code == 200
+    assert first.mimetype == "application/json"
+    assert json.dumps(decode_figure(first.data), cls=PlotlyJSONEncoder) == json.dumps(
+        report.figure("target_behaviour", "a"), cls=PlotlyJSONEncoder
+    )
+    compressed = client.get(
+        "/_explainit/figures/target_behaviour/a", headers={"Accept-Encoding": "gzip"}
+    )
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == first.data
+    blob = report.figures.get_json("target_behaviour", "a")
+    assert blob == first.data
+    assert report.figures.get_json("target_behaviour", "a") is blob
+    assert client.get("/_explainit/figures/additional/missing").status_code == 404
+    # The feature summary and correlation figures are served the same way.
+    for kind, key in [("feature_stats", "a"), ("correlation", "pearson")]:
+        response = client.get(f"/_explainit/figures/{kind}/{key}")
+        assert response.data == report.figures.get_json(kind, key)
+        assert json.dumps(
+            decode_figure(response.data), cls=PlotlyJSONEncoder
+        ) == json.dumps(report.figure(kind, key), cls=PlotlyJSONEncoder)
+
+
+def test_stages_run_in_dependency_order() -> None:
+    order = []
+    release = threading.Event()
+
+    def stage(name, wait=False):
+        def run():
+            if wait:
+                release.wait(5)
+            order.append(name)
+
+        return run
+
+    def fail():
+        raise RuntimeError("broken")
+
+    runner = StageRunner(
+        {
+            "first": (stage("first"), []),
+            "slow": (stage("slow", wait=True), ["first"]),
+            "fast": (stage("fast"), ["first"]),
+            "last": (stage("last"), ["slow", "fast"]),
+            "broken": (fail, ["first"]),
+            "skipped": (stage("skipped"), ["broken"]),
+        }
+    ).start()
+    while not runner.done("fast"):
+        time.sleep(0.01)
+    assert not runner.done("slow", "last")
+    release.set()
+    with pytest.raises(RuntimeError):
+        runner.wait(5)
+    assert order == ["first", "fast", "slow", "last"]
+    assert runner.status("skipped") == "failed"
+    assert str(runner.error("skipped")) == "broken"
+
+
+def test_background_report_fills_in_and_reports_failures(monkeypatch) -> None:
+    reference, production = _frame(300), _frame(200, 0.5)
+    report = compute_report(reference, production, "target", "cat", background=True)
+    expected = compute_report(reference, production, "target", "cat")
+    assert report.wait(30).statistical_data == expected.statistical_data
+    assert report.finished_stages() == list(REPORT_STAGES)
+
+    # Invalid columns raise before any stage starts.
+    with pytest.raises(ValueError, match="does not exist"):
+        compute_report(
+            reference.drop(columns="target"),
+            production,
+            "target",
+            "cat",
+            background=True,
+        )
+    with pytest.raises(ValueError, match="must be 'cat'"):
+        compute_report(
+            reference,
+            production,
+            "target",
+            "num",
+            background=True,
+        )
+
+    def fail(*args, **kwargs):
+        raise ValueError("drift failed")
+
+    monkeypatch.setattr("explainit.report.get_statistical_info", fail)
+    broken = compute_report(reference, production, "target", "cat", background=True)
+    with pytest.raises(ValueError):
+        broken.wait(30)
+    assert not broken.ready("drift")
+    app = create_app(broken)
+    for key, value in app.callback_map.items():
+        if "app-content" in key:
+            content = value["callback"].__wrapped__(
+                "tab1", {"finished": [], "changed": []}
+            )
+    assert content.id == "stage-progress"
+
+
+def test_window_drift_matches_tests_on_each_window(tmp_path) -> None:
+    reference, production = _frame(1500), _frame(600, 0.5)
+    production["date"] = pd.date_range("2022-01-01", periods=600, freq="H")
+    report = compute_report(
+        reference, production, "target", "cat", datetime_col_name="date"
+    )
+    scores = report.window_drift
+    assert scores.index.tolist() == report.feature_names
+    assert scores.columns[0] == "2022-01-01" and len(scores.columns) == 25
+
+    days = production["date"].dt.strftime("%Y-%m-%d")
+    for window in scores.columns[:3]:
+        expected = compute_report(
+            reference, production[days == window], "target", "cat"
+        ).statistical_data
+        for feature in report.feature_names:
+            # Numerical features are counted on reference quantile bins.
+            tolerance = 0.05 if feature in ("a", "b") else 1e-9
+            assert scores.loc[feature, window] == pytest.approx(
+                expected[feature]["p_value"], abs=tolerance
+            )
+    assert report.window_drift_figure["data"][0]["type"] == "heatmap"
+
+    path = tmp_path / "report.json"
+    report.save(str(path))
+    pd.testing.assert_frame_equal(Report.load(str(path)).window_drift, scores)
+
+
+def test_slice_drift_is_saved_with_the_report(tmp_path) -> None:
+    report = compute_report(
+        _frame(600), _frame(400, 0.5), "target", "cat", slice_columns=["s"]
+    )
+    assert set(report.slice_drift["slice"]) == {"s=x", "s=y", "s=z"}
+    assert set(report.slice_drift["feature"]) == {"a", "b", "target"}
+
+    path = tmp_path / "report.json"
+    report.save(str(path))
+    pd.testing.assert_frame_equal(
+        Report.load(str(path)).slice_drift, report.slice_drift
+    )
+
+    with pytest.raises(ValueError):
+        compute_report(_frame(600), _frame(400), "target", "cat", slice_columns=["x"])
+
+
+def test_memory_budget_switches_stages_to_sketches(tmp_path) -> None:
+    reference, production = _frame(3000), _frame(2000, 0.5)
+    expected = compute_report(reference, production, "target", "cat")
+    roomy = compute_report(
+        reference, production, "target", "cat", memory_budget_mb=10_000
+    )
+    assert not any(plan.approximate for plan in roomy.memory_plan.values())
+    assert roomy.statistical_data == expected.statistical_data
+
+    report = compute_report(
+        reference, production, "target", "cat", memory_budget_mb=0.5
+    )
+    modes = {stage: plan.mode for stage, plan in report.memory_plan.items()}
+    assert modes == {
+        "drift": "sketch",
+        "summary": "sketch",
+        "correlations": "sketch",
+        "figures": "sample",
+    }
+    # Categorical tests and Pearson correlations are exact from the sketches.
+    for feature in ("s", "target"):
+        assert report.statistical_data[feature]["p_value"] == pytest.approx(
+            expected.statistical_data[feature]["p_value"]
+        )
+    pd.testing.assert_frame_equal(
+        report.correlations["production"]["pearson"],
+        expected.correlations["production"]["pearson"],
+    )
+
+    path = tmp_path / "report.json"
+    report.save(str(path))
+    loaded = Report.load(str(path))
+    assert loaded.approximation_notes("tab1", "drift") == report.approximation_notes(
+        "drift"
+    )
+    app = create_app(loaded)
+    for key, value in app.callback_map.items():
+        if "app-content" in key:
+            stages = list(REPORT_STAGES)
+            content = value["callback"].__wrapped__(
+                "tab1", {"finished": stages, "changed": stages}
+            )
+    assert content[0].children[0].className == "approximation-notes"
+
+    sample = stratified_sample(reference, 300, "target")
+    assert len(sample) == 300 and sample.index.is_monotonic_increasing
+    assert sample["target"].value_counts(normalize=True)["yes"] == pytest.approx(
+        reference["target"].value_counts(normalize=True)["yes"], abs=0.01
+    )
+
+
+def test_memory_budget_warns_when_the_fewest_rows_do_not_fit(capsys) -> None:
+    frames = [_frame(3000), _frame(2000, 0.5)]
+    feature_types = {"a": "num", "b": "num", "s": "cat", "target": "cat"}
+    plan = MemoryBudget(1).plan("drift", frames, feature_types)
+    assert plan.mode == "sketch" and plan.rows == MIN_ROWS
+    assert "exceed the budget" in capsys.readouterr().err
+    MemoryBudget(1_000).plan("drift", frames, feature_types)
+    assert capsys.readouterr().err == ""
+
+
+def test_sketch_correlator_reads_one_dataset() -> None:
+    reference, production = _frame(300), _frame(200, 0.5)
+    correlate = sketch_correlator(100)
+    pd.testing.assert_frame_equal(
+        correlate(reference, ["a", "b"], [], "pearson"),
+        reference[["a", "b"]].corr("pearson"),
+    )
+    with pytest.raises(ValueError):
+        correlate(production, ["a", "b"], [], "pearson")
@@ -0,0 +1,125 @@
+# Copyright 2022 The Explainit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+import pandas as pd
+import pytest
+from explainit import compute_report
+from explainit.sources import compact_frame
+from explainit.sources import read_source
+from explainit.sources import source_columns
+from explainit.sources import source_schema
+
+
+def _frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "a": rng.normal(size=n),
+            "s": rng.choice(["x", "y", "z"], n),
+            "target": rng.choice(["yes", "no"], n),
+        }
+    )
+
+
+def test_csv_sources_match_dataframes(tmp_path) -> None:
+    reference, production = _frame(300, 0), _frame(200, 1)
+    reference.to_csv(tmp_path / "reference.csv", index=False)
+    # Production arrives in two files with a column the report never uses.
+    production.assign(request_id=np.arange(200)).iloc[:120].to_csv(
+        tmp_path / "production-1.csv", index=False
+    )
+    production.assign(request_id=np.arange(200)).iloc[120:].to_csv(
+        tmp_path / "production-2.csv", index=False
+    )
+
+    assert source_columns(str(tmp_path / "production-1.csv")) == [
+        "a",
+        "s",
+        "target",
+        "request_id",
+    ]
+    pruned = read_source(str(tmp_path / "production-*.csv"), columns=["a", "target"])
+    assert pruned.columns.tolist() == ["a", "target"]
+    pd.testing.assert_frame_equal(pruned, production[["a", "target"]])
+
+    from_files = compute_report(
+        str(tmp_path / "reference.csv"),
+        str(tmp_path / "production-*.csv"),
+        "target",
+        "cat",
+    )
+    from_frames = compute_report(reference, production, "target", "cat")
+    # CSV parsing may round floats in the last digit.
+    for feature, expected in from_frames.statistical_data.items():
+        actual = from_files.statistical_data[feature]
+        assert actual["stattest"] == expected["stattest"]
+        assert actual["drift"] == expected["drift"]
+        assert actual["p_value"] == pytest.approx(expected["p_value"])
+    pd.testing.assert_frame_equal(from_files.data_summary, from_frames.data_summary)
+
+
+def test_csv_date_columns_are_read_as_dates(tmp_path) -> None:
+    data = _frame(300, 2).assign(
+        day=pd.date_range("2022-01-01", periods=300, freq="H"),
+        version=np.resize(["v1", "v2"], 300),
+    )
+    data.to_csv(tmp_path / "data.csv", index=False)
+    path = str(tmp_path / "data.csv")
+
+    # As from Parquet, date columns are left out unless asked for.
+    assert read_source(path).columns.tolist() == ["a", "s", "target", "version"]
+    pd.testing.assert_series_equal(
+        read_source(path, columns=["day"])["day"], data["day"]
+    )
+    assert source_schema(path).dtypes["day"].kind == "M"
+
+    report = compute_report(path, path, "target", "cat", datetime_col_name="day")
+    assert report.feature_names == ["a", "s", "target", "version"]
+
+
+def test_unknown_sources_are_rejected(tmp_path) -> None:
+    with pytest.raises(ValueError):
+        read_source(str(tmp_path / "missing-*.csv"))
+    with pytest.raises(ValueError):
+        read_source(str(tmp_path / "data.json"))
+
+
+def test_compact_loading_leaves_the_report_unchanged() -> None:
+    rng = np.random.default_rng(2)
+    reference, production = (
+        _frame(n, seed).assign(
+            age=rng.integers(18, 90, n), half=rng.integers(0, 8, n) / 2
+        )
+        for n, seed in ((400, 0), (300, 1))
+    )
+    compact = compact_frame(reference)
+    assert compact.dtypes.astype(str).to_dict() == {
+        "a": "float64",
+        "s": "category",
+        "target": "category",
+        "age": "int8",
+        "half": "float32",
+    }
+    assert compact_frame(reference, float32=True)["a"].dtype == np.float32
+
+    expected = compute_report(reference, production, "target", "cat")
+    report = compute_report(reference, production, "target", "cat", compact="lossless")
+    assert report.to_json() == expected.to_json()
+    assert (
+        report.memory_usage["reference_compact_mb"]
+        < report.memory_usage["reference_mb"]
+    )
+    assert report.memory_usage["saved_mb"] > 0
+    with pytest.raises(ValueError):
+        compute_report(reference, production, "target", "cat", compact="float16")
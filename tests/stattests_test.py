@@ -11,11 +11,30 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY aIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
+import subprocess
+import sys
+import textwrap
+
 import numpy as np
 import pandas as pd
+from explainit.binning import HistogramCache
+from explainit.encoding import CategoricalEncoding
+from explainit.encoding import EncodingCache
 from explainit.stattests.chi2_test import chi_stat_test
+from explainit.stattests.chi2_test import chi_stat_test_from_counts
+from explainit.stattests.jensenshannon_test import jensenshannon_stat_test
+from explainit.stattests.ks_test import ks_sketch_statistic
+from explainit.stattests.sketches import HyperLogLog
+from explainit.stattests.sketches import KLLSketch
+from explainit.stattests.slice_test import slice_statistical_info
+from explainit.stattests.slice_test import top_drifted_slices
+from explainit.stattests.stat_test import get_statistical_info
+from explainit.stattests.wasserstein_distance_test import wasserstein_distance_sketch
 from explainit.stattests.z_test import z_stat_test
 from pytest import approx
+from scipy.stats import ks_2samp
+from scipy.stats import wasserstein_distance
 
 
 def test_freq_obs_eq_freq_exp() -> None:
@@ -70,3 +89,263 @@ def test_freq_obs_not_eq_freq_exp() -> None:
         False,
         0.5,
     )
+
+
+def test_batch_statistical_info_matches_per_feature() -> None:
+    rng = np.random.default_rng(0)
+    reference = pd.DataFrame(
+        {
+            "wasserstein": rng.normal(size=1500),
+            "jensenshannon": rng.integers(0, 4, 1500),
+            "ks": rng.normal(size=1500),
+        }
+    )
+    production = pd.DataFrame(
+        {
+            "wasserstein": rng.normal(0.5, size=700),
+            "jensenshannon": rng.integers(0, 5, 700),
+            "ks": rng.normal(size=700),
+        }
+    )
+    reference.iloc[::7, 0] = np.nan
+    production.iloc[::5, 0] = np.inf
+    feature_test = {
+        "wasserstein": ["wasserstein_stat_test", "num"],
+        "jensenshannon": ["jensenshannon_stat_test", "num"],
+        "ks": ["ks_stat_test", "num"],
+    }
+    batch = get_statistical_info(feature_test, reference, production)
+    serial = get_statistical_info(feature_test, reference, production, vectorized=False)
+    for feature in ["wasserstein", "jensenshannon", "ks"]:
+        assert batch[feature]["p_value"] == approx(serial[feature]["p_value"])
+        assert batch[feature]["drift"] == serial[feature]["drift"]
+        assert batch[feature]["ref_hist_data"] == serial[feature]["ref_hist_data"]
+        assert batch[feature]["prod_hist_data"] == serial[feature]["prod_hist_data"]
+    # Kolmogorov-Smirnov p-values are exact at these sizes, as ks_2samp's default.
+    assert batch["ks"]["p_value"] == approx(
+        ks_2samp(reference["ks"], production["ks"])[1], rel=1e-12
+    )
+
+
+def test_slice_statistical_info_matches_tests_on_each_slice() -> None:
+    rng = np.random.default_rng(3)
+
+    def frame(n: int, shift: float) -> pd.DataFrame:
+        data = pd.DataFrame(
+            {
+                "region": rng.choice(["eu", "us", "apac"], n),
+                "version": rng.choice([1, 2], n),
+                "ks": rng.normal(size=n),
+                "wasserstein": rng.normal(size=n),
+                "chi": rng.choice(["a", "b", "c"], n),
+                "z": rng.choice(["x", "y"], n),
+            }
+        )
+        drifted = (data["region"] == "eu") & (data["version"] == 2)
+        data.loc[drifted, "wasserstein"] += shift
+        data.iloc[::9, 2] = np.nan
+        return data
+
+    reference, production = frame(3000, 0.0), frame(2000, 1.0)
+    feature_test = {
+        "ks": ["ks_stat_test", "num"],
+        "wasserstein": ["wasserstein_stat_test", "num"],
+        "chi": ["chi_stat_test", "cat"],
+        "z": ["z_stat_test", "cat"],
+        "region": ["chi_stat_test", "cat"],
+    }
+    slice_info = slice_statistical_info(
+        feature_test, reference, production, ["region", "version"]
+    )
+    assert len(slice_info) == 6 * 4
+    assert slice_info["severity"].is_monotonic_decreasing
+
+    for (region, version), part in production.groupby(["region", "version"]):
+        in_slice = (reference["region"] == region) & (reference["version"] == version)
+        expected = get_statistical_info(
+            {
+                feature: feature_test[feature]
+                for feature in ["ks", "wasserstein", "chi", "z"]
+            },
+            reference[in_slice],
+            part,
+        )
+        rows = slice_info[slice_info["slice"] == f"region={region}, version={version}"]
+        for feature, info in expected.items():
+            row = rows[rows["feature"] == feature].iloc[0]
+            assert row["p_value"] == approx(info["p_value"])
+            assert row["drift"] == info["drift"]
+            assert row["production_rows"] == len(part)
+
+    top = top_drifted_slices(slice_info, k=2)
+    assert top["slice"].tolist()[0] == "region=eu, version=2"
+    assert top["worst_feature"].tolist()[0] == "wasserstein"
+
+
+def test_parallel_statistical_info_matches_serial() -> None:
+    rng = np.random.default_rng(1)
+    reference = pd.DataFrame(
+        {
+            "num": rng.normal(size=1200),
+            "count": rng.integers(0, 50, 1200),
+            "cat": rng.choice(["a", "b", "c", None], 1200),
+        }
+    )
+    production = pd.DataFrame(
+        {
+            "num": rng.normal(0.2, size=400),
+            "count": rng.integers(0, 60, 400),
+            "cat": rng.choice(["a", "b", "c"], 400),
+        }
+    )
+    feature_test = {
+        "num": ["wasserstein_stat_test", "num"],
+        "count": ["ks_stat_test", "num"],
+        "cat": ["chi_stat_test", "cat"],
+    }
+    serial = get_statistical_info(feature_test, reference, production)
+    encodings = EncodingCache(reference, production)
+    encodings["cat"]
+    histograms = HistogramCache(reference, production)
+    parallel = get_statistical_info(
+        feature_test,
+        reference,
+        production,
+        n_jobs=2,
+        encodings=encodings,
+        histograms=histograms,
+    )
+    assert list(parallel) == list(serial)
+    assert parallel == serial
+    # Histograms the workers built fill the caller's cache.
+    get_statistical_info(
+        feature_test,
+        reference,
+        production,
+        vectorized=False,
+        n_jobs=2,
+        histograms=histograms,
+    )
+    assert set(histograms.built(["num", "count"])) == {
+        (feature, kind)
+        for feature in ("num", "count")
+        for kind in ("reference", "production")
+    }
+
+
+def test_parallel_statistical_info_without_main_guard(tmp_path) -> None:
+    script = tmp_path / "script.py"
+    script.write_text(
+        textwrap.dedent(
+            """
+            import numpy as np
+            import pandas as pd
+            from explainit.stattests.stat_test import get_statistical_info
+
+            rng = np.random.default_rng(0)
+            reference = pd.DataFrame({"a": rng.normal(size=200), "b": rng.normal(size=200)})
+            production = pd.DataFrame({"a": rng.normal(size=200), "b": rng.normal(size=200)})
+            feature_test = {"a": ["ks_stat_test", "num"], "b": ["ks_stat_test", "num"]}
+            print(sorted(get_statistical_info(feature_test, reference, production, n_jobs=2)))
+            """
+        )
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, str(script)],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": root},
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    # The workers stop on the unguarded script, and the tests run serially instead.
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "['a', 'b']"
+    assert "the tests run in this process instead" in result.stderr
+
+
+def test_sketch_stat_tests_within_error_bounds() -> None:
+    rng = np.random.default_rng(2)
+    reference = rng.normal(size=200_000)
+    production = rng.normal(0.1, 1.2, size=100_000)
+    reference_sketch = KLLSketch(seed=0)
+    for chunk in np.array_split(reference, 20):
+        reference_sketch.update(chunk)
+    production_sketch = KLLSketch(seed=1)
+    for chunk in np.array_split(production, 10):
+        production_sketch.merge(KLLSketch(seed=2).update(chunk))
+
+    assert reference_sketch.count == reference.size
+    assert reference_sketch.retained <= 3 * reference_sketch.k + 32
+    statistic, error = ks_sketch_statistic(reference_sketch, production_sketch)
+    assert abs(statistic - ks_2samp(reference, production).statistic) <= error
+    distance, error = wasserstein_distance_sketch(reference_sketch, production_sketch)
+    exact = wasserstein_distance(reference, production) / np.std(reference)
+    assert abs(distance - exact) <= error
+
+
+def test_hyperloglog_within_error_bounds() -> None:
+    values = np.arange(300_000)
+    merged = HyperLogLog()
+    for chunk in np.array_split(values, 6):
+        merged.merge(HyperLogLog().update(chunk))
+    # Three standard errors.
+    assert abs(merged.count() - values.size) <= 3 * merged.relative_error * values.size
+    # Small counts are exact, and integers count the same as equal floats.
+    small = (
+        HyperLogLog().update(pd.Series([1, 2, 2, None])).update(np.array([2.0, 3.0]))
+    )
+    assert small.count() == 3
+
+
+def test_categorical_encoding_shares_categories() -> None:
+    reference = pd.Series(["b", "a", None, "c", "b"])
+    production = pd.Series(["c", "b", "b", np.nan])
+    encoding = CategoricalEncoding.from_series(reference, production)
+    assert encoding.hist_data(encoding.ref_counts) == [[1, 2, 1], ["a", "b", "c"]]
+    assert encoding.hist_data(encoding.prod_counts) == [[0, 2, 1], ["a", "b", "c"]]
+    assert encoding.value_counts(encoding.prod_counts) == [[2, 1], ["b", "c"]]
+    assert chi_stat_test_from_counts(
+        encoding.ref_counts, encoding.prod_counts, 0.05
+    ) == chi_stat_test(reference, production, 0.05)
+
+
+def test_histogram_cache_bins_every_edge_set_once() -> None:
+    rng = np.random.default_rng(3)
+    reference = pd.DataFrame({"x": rng.normal(size=2000)})
+    production = pd.DataFrame({"x": np.append(rng.normal(0.5, size=1500), np.inf)})
+    histograms = HistogramCache(reference, production)
+
+    sturges = histograms.histogram("x", "sturges")
+    assert histograms.histogram("x", "sturges") is sturges
+    pooled = np.concatenate([reference["x"], production["x"][:-1]])
+    edges = np.histogram_bin_edges(pooled, bins="sturges")
+    np.testing.assert_array_equal(sturges.edges, edges)
+    np.testing.assert_array_equal(
+        sturges.prod_counts, np.histogram(production["x"][:-1], edges)[0]
+    )
+    js, _, _ = jensenshannon_stat_test(
+        reference["x"], production["x"][:-1], "num", 0.1, histogram=sturges
+    )
+    assert js == approx(
+        jensenshannon_stat_test(reference["x"], production["x"][:-1], "num", 0.1)[0]
+    )
+
+    # Histograms of the per-feature path come from the cache, as np.histogram's.
+    info = get_statistical_info(
+        {"x": ["wasserstein_stat_test", "num"]},
+        reference,
+        production,
+        vectorized=False,
+        histograms=histograms,
+    )["x"]
+    density, edges = np.histogram(production["x"][:-1], bins=10, density=True)
+    np.testing.assert_allclose(info["prod_hist_data"][0][0], density)
+    np.testing.assert_allclose(info["prod_hist_data"][0][1], edges)
+    assert histograms.histogram("x", "reference").prod_counts is None
+    # Only edges and counts stay cached, never the values.
+    cached = sum(
+        histogram.edges.nbytes for histogram in histograms._histograms.values()
+    )
+    assert cached < reference["x"].nbytes / 10